@@ -1,13 +1,15 @@
 from flask import Flask, redirect, url_for
-from .extensions import db, login_manager, mail
+from .extensions import db, login_manager, mail, image_queue
 import os
 from .cli import init_cli
 from flask_migrate import Migrate
 from markdown import markdown
 from pathlib import Path
 from dotenv import load_dotenv
-from app.config import Config
+from app.config import Config, config_by_name
 from .utils.filters import local_time
+from .utils.static_cache import init_static_cache
+from .utils.database import configure_engine_options, init_database
 from flask_login import current_user
 
 # Importe todos os modelos aqui para o Alembic detectá-los
@@ -18,14 +20,20 @@ from .models.like import Like
 from .models.tag import Tag
 from .models.visibility import Visibility
 from .models.timeline_preference import TimelinePreference
+from .models.pdf_document import PdfDocument
+from .models import counters  # noqa: registra a atualização dos contadores
 
 load_dotenv()
 
-def create_app(config_class=Config):
+def create_app(config_class=None):
     """
     Função factory para criar a aplicação Flask
     Permite múltiplas instâncias da aplicação e facilita os testes
+    Sem config_class, usa o perfil definido em APP_ENV (development ou production)
     """
+    if config_class is None:
+        config_class = config_by_name.get(os.environ.get('APP_ENV', 'development'), Config)
+
     app = Flask(__name__,
         static_folder='static',
         static_url_path='/static',
@@ -40,10 +48,14 @@ def create_app(config_class=Config):
     Path(app.config.get('UPLOAD_FOLDER', 'uploads')).mkdir(exist_ok=True)
 
     # Inicializa as extensões com a app
+    configure_engine_options(app)
     db.init_app(app)
+    init_database(app)
     login_manager.init_app(app)
     login_manager.login_view = 'auth.login'
     mail.init_app(app)
+    image_queue.init_app(app)
+    init_static_cache(app)
 
     migrate = Migrate(app, db)
 
@@ -8,125 +8,54 @@ from .models.like import Like
 from .models.tag import Tag
 from .models.visibility import Visibility
 from .models.timeline_preference import TimelinePreference
+from .models.pdf_document import PdfDocument
+from .models.counters import recount_counters
 from .extensions import db
-from sqlalchemy import text
+from .utils.backup import dump_database, load_database
+from .utils.sql import insert_ignore, reset_id_sequences
+from sqlalchemy import inspect
 import os
-import sqlite3
 from datetime import datetime
 import shutil
+import sqlite3
 
 def init_db():
-    """Inicializa o banco de dados com todas as tabelas"""
+    """
+    Inicializa o banco de dados com todas as tabelas
+    Funciona com qualquer banco suportado: um banco vazio é criado a partir dos
+    modelos e marcado com a última migração; um banco existente é atualizado
+    pelas migrações do Alembic
+    """
+    from flask_migrate import stamp, upgrade
     print("Iniciando criação do banco de dados...")
     try:
         # Garante que o diretório instance existe
         instance_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'instance')
         os.makedirs(instance_path, exist_ok=True)
         
-        print(f"Usando banco de dados em: {db.engine.url}")
-        
-        # Cria cada tabela separadamente
-        statements = [
-            """
-            CREATE TABLE IF NOT EXISTS user (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                username VARCHAR(80) NOT NULL UNIQUE,
-                password_hash VARCHAR(120) NOT NULL,
-                reset_code VARCHAR(8) UNIQUE,
-                reset_code_expiry DATETIME,
-                is_admin BOOLEAN DEFAULT FALSE
-            )
-            """,
-            """
-            CREATE TABLE IF NOT EXISTS post (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                image_path VARCHAR(255) NOT NULL,
-                caption TEXT,
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                user_id INTEGER NOT NULL,
-                FOREIGN KEY(user_id) REFERENCES user(id)
-            )
-            """,
-            """
-            CREATE TABLE IF NOT EXISTS comment (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                text TEXT NOT NULL,
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                user_id INTEGER NOT NULL,
-                post_id INTEGER NOT NULL,
-                FOREIGN KEY(user_id) REFERENCES user(id),
-                FOREIGN KEY(post_id) REFERENCES post(id)
-            )
-            """,
-            """
-            CREATE TABLE IF NOT EXISTS like (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER NOT NULL,
-                post_id INTEGER NOT NULL,
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY(user_id) REFERENCES user(id),
-                FOREIGN KEY(post_id) REFERENCES post(id),
-                UNIQUE(user_id, post_id)
-            )
-            """,
-            """
-            CREATE TABLE IF NOT EXISTS tag (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER NOT NULL,
-                post_id INTEGER NOT NULL,
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY(user_id) REFERENCES user(id),
-                FOREIGN KEY(post_id) REFERENCES post(id),
-                UNIQUE(user_id, post_id)
-            )
-            """,
-            """
-            CREATE TABLE IF NOT EXISTS visibility (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER NOT NULL,
-                post_id INTEGER NOT NULL,
-                is_visible BOOLEAN DEFAULT TRUE,
-                FOREIGN KEY(user_id) REFERENCES user(id),
-                FOREIGN KEY(post_id) REFERENCES post(id),
-                UNIQUE(user_id, post_id)
-            )
-            """,
-            """
-            CREATE TABLE IF NOT EXISTS timeline_preference (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER NOT NULL UNIQUE,
-                sort_by VARCHAR(20) DEFAULT 'recent',
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY(user_id) REFERENCES user(id)
-            )
-            """
-        ]
-
-        print("Criando tabelas...")
-        for stmt in statements:
-            print(f"Executando: {stmt.strip().split('(')[0]}")
-            db.session.execute(text(stmt))
-            db.session.commit()
+        print(f"Usando banco de dados em: {db.engine.url.render_as_string(hide_password=True)}")
         
-        # Verifica se as tabelas foram criadas
-        result = db.session.execute(text("SELECT name FROM sqlite_master WHERE type='table';"))
-        tables = result.fetchall()
+        migrations = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'migrations')
+        if not inspect(db.engine).get_table_names():
+            print("Criando tabelas...")
+            db.create_all()
+            stamp(directory=migrations)
+        else:
+            print("Banco existente: aplicando migrações pendentes...")
+            upgrade(directory=migrations)
         
         print("\nTabelas criadas:")
-        for table in tables:
-            print(f"- {table[0]}")
+        for table in inspect(db.engine).get_table_names():
+            print(f"- {table}")
         
         # Cria um usuário admin se não existir
         print("\nVerificando usuário admin...")
-        result = db.session.execute(text("SELECT * FROM user WHERE username = 'admin'"))
-        admin = result.fetchone()
-        
-        if not admin:
-            db.session.execute(text("""
-                INSERT INTO user (username, password_hash, is_admin)
-                VALUES ('admin', :password_hash, TRUE)
-            """), {'password_hash': generate_password_hash('admin')})
+        if not User.query.filter_by(username='admin').first():
+            db.session.add(User(
+                username='admin',
+                password_hash=generate_password_hash('admin'),
+                is_admin=True
+            ))
             db.session.commit()
             print("✅ Usuário admin criado com sucesso!")
         else:
@@ -162,8 +91,8 @@ def create_backup():
                 # Nome do arquivo de backup
                 backup_file = os.path.join(backup_dir, f'{db_name}.{timestamp}.backup')
                 
-                # Faz uma cópia direta do arquivo do banco
-                shutil.copy2(db_path, backup_file)
+                # Copia o banco pela API de backup do SQLite (inclui o -wal)
+                copy_sqlite_database(db_path, backup_file)
                 
                 size = os.path.getsize(backup_file) / (1024*1024)  # Converte para MB
                 print(f"✅ {db_name} salvo com sucesso")
@@ -183,10 +112,38 @@ def create_backup():
     except Exception as e:
         print(f"\n❌ Erro durante o backup: {str(e)}")
 
+def sqlite_database_path():
+    """Caminho do arquivo quando o banco é SQLite em arquivo (None nos demais casos)"""
+    url = db.engine.url
+    if url.get_backend_name() != 'sqlite' or not url.database or url.database == ':memory:':
+        return None
+    return url.database
+
+def copy_sqlite_database(source_path, target_path):
+    """
+    Copia um banco SQLite pela API de backup do sqlite3
+    Com journal_mode=WAL as últimas transações podem estar só no arquivo
+    -wal; copiar apenas o .db perderia esses dados
+    """
+    source = sqlite3.connect(source_path)
+    target = sqlite3.connect(target_path)
+    try:
+        source.backup(target)
+    finally:
+        target.close()
+        source.close()
+
+def remove_sqlite_journal(db_path):
+    """Apaga os arquivos -wal e -shm, que o SQLite aplicaria sobre um banco restaurado"""
+    for suffix in ('-wal', '-shm'):
+        if os.path.exists(db_path + suffix):
+            os.remove(db_path + suffix)
+
 @click.command('backup')
+@click.option('--portable', is_flag=True, help='Gera um JSON que pode ser restaurado em qualquer banco')
 @with_appcontext
-def backup():
-    """Cria backup dos bancos de dados"""
+def backup(portable):
+    """Cria backup do banco de dados"""
     try:
         # Define o timestamp para o nome do backup
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
@@ -195,32 +152,26 @@ def backup():
         # Cria o diretório de backup se não existir
         os.makedirs(backup_dir, exist_ok=True)
         
-        # Lista de bancos para fazer backup
-        dbs = ['app.db']
+        db_path = sqlite_database_path()
+        if db_path and not portable:
+            # SQLite: cópia do arquivo do banco (incluindo o que está no -wal)
+            backup_path = os.path.join(backup_dir, f'app.db.{timestamp}.backup')
+            copy_sqlite_database(db_path, backup_path)
+        else:
+            # Outros bancos (ou --portable): exporta as tabelas em JSON
+            backup_path = os.path.join(backup_dir, f'app.{timestamp}.json')
+            counts = dump_database(backup_path)
+            print(f"\n📦 {sum(counts.values())} registros em {len(counts)} tabelas")
         
-        for db_name in dbs:
-            db_path = os.path.join('instance', db_name)
-            if not os.path.exists(db_path):
-                print(f"\n⚠️ Banco {db_name} não encontrado, pulando...")
-                continue
-                
-            backup_path = os.path.join(backup_dir, f'{db_name}.{timestamp}.backup')
-            
-            # Faz uma cópia direta do arquivo do banco
-            shutil.copy2(db_path, backup_path)
-            
-            size = os.path.getsize(backup_path) / (1024*1024)  # Converte para MB
-            print(f"\n✅ Backup de {db_name} criado: {backup_path} ({size:.1f}MB)")
+        size = os.path.getsize(backup_path) / (1024*1024)  # Converte para MB
+        print(f"\n✅ Backup criado: {backup_path} ({size:.1f}MB)")
         
         # Lista os últimos 5 backups
         print("\n📋 Últimos backups:")
-        for db_name in dbs:
-            backups = sorted([f for f in os.listdir(backup_dir) if f.startswith(db_name)], reverse=True)
-            if backups:
-                print(f"\n{db_name}:")
-                for backup in backups[:5]:
-                    size = os.path.getsize(os.path.join(backup_dir, backup)) / (1024*1024)
-                    print(f"- {backup} ({size:.1f}MB)")
+        backups = sorted([f for f in os.listdir(backup_dir) if f.startswith('app.')], reverse=True)
+        for backup_name in backups[:5]:
+            size = os.path.getsize(os.path.join(backup_dir, backup_name)) / (1024*1024)
+            print(f"- {backup_name} ({size:.1f}MB)")
         
     except Exception as e:
         print(f"\n❌ Erro durante o backup: {str(e)}")
@@ -237,6 +188,10 @@ def init_cli(app):
     app.cli.add_command(restore)
     app.cli.add_command(list_users)
     app.cli.add_command(create_admin)
+    app.cli.add_command(sync_pdfs)
+    app.cli.add_command(process_pending_images)
+    app.cli.add_command(backfill_derivatives)
+    app.cli.add_command(recount_counters_command)
 
 @click.command('reset-user-password')
 @click.argument('username')
@@ -276,25 +231,9 @@ def create_timeline_pref():
     try:
         # Verifica se a tabela existe
         print("Verificando se a tabela existe...")
-        result = db.session.execute(text("""
-            SELECT name FROM sqlite_master 
-            WHERE type='table' AND name='timeline_preference';
-        """))
-        
-        if not result.fetchone():
+        if not inspect(db.engine).has_table(TimelinePreference.__tablename__):
             print("Tabela não encontrada. Criando...")
-            # Cria a tabela
-            db.session.execute(text("""
-                CREATE TABLE timeline_preference (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER NOT NULL UNIQUE,
-                    sort_by VARCHAR(20) DEFAULT 'recent',
-                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY(user_id) REFERENCES user(id)
-                );
-            """))
-            db.session.commit()
+            TimelinePreference.__table__.create(db.engine)
             print("✅ Tabela timeline_preference criada com sucesso!")
         else:
             print("✅ Tabela timeline_preference já existe!")
@@ -316,6 +255,13 @@ def sync_db():
     db.create_all()
     print('Banco de dados sincronizado!')
 
+def old_datetime(value):
+    """Datas do banco antigo vêm como texto do SQLite"""
+    return datetime.fromisoformat(value) if isinstance(value, str) else value
+
+def old_bool(value):
+    return None if value is None else bool(value)
+
 @click.command('migrate-old-db')
 @with_appcontext
 def migrate_old_db():
@@ -350,17 +296,14 @@ def migrate_old_db():
         old_cur.execute("SELECT * FROM user")
         users = old_cur.fetchall()
         for user in users:
-            db.session.execute(text("""
-                INSERT OR IGNORE INTO user (id, username, password_hash, reset_code, reset_code_expiry, is_admin)
-                VALUES (:id, :username, :password_hash, :reset_code, :reset_code_expiry, :is_admin)
-            """), {
+            db.session.execute(insert_ignore(User.__table__).values({
                 'id': user[0],
                 'username': user[1],
                 'password_hash': user[2],
                 'reset_code': user[3],
-                'reset_code_expiry': user[4],
-                'is_admin': user[5]
-            })
+                'reset_code_expiry': old_datetime(user[4]),
+                'is_admin': old_bool(user[5])
+            }))
         print(f"✅ {len(users)} usuários migrados")
         
         # Migra posts
@@ -368,16 +311,13 @@ def migrate_old_db():
         old_cur.execute("SELECT * FROM post")
         posts = old_cur.fetchall()
         for post in posts:
-            db.session.execute(text("""
-                INSERT OR IGNORE INTO post (id, image_path, caption, created_at, user_id)
-                VALUES (:id, :image_path, :caption, :created_at, :user_id)
-            """), {
+            db.session.execute(insert_ignore(Post.__table__).values({
                 'id': post[0],
                 'image_path': post[1],
                 'caption': post[2],
-                'created_at': post[3],
+                'created_at': old_datetime(post[3]),
                 'user_id': post[4]
-            })
+            }))
         print(f"✅ {len(posts)} posts migrados")
         
         # Migra comentários
@@ -385,16 +325,13 @@ def migrate_old_db():
         old_cur.execute("SELECT * FROM comment")
         comments = old_cur.fetchall()
         for comment in comments:
-            db.session.execute(text("""
-                INSERT OR IGNORE INTO comment (id, text, created_at, user_id, post_id)
-                VALUES (:id, :text, :created_at, :user_id, :post_id)
-            """), {
+            db.session.execute(insert_ignore(Comment.__table__).values({
                 'id': comment[0],
                 'text': comment[1],
-                'created_at': comment[2],
+                'created_at': old_datetime(comment[2]),
                 'user_id': comment[3],
                 'post_id': comment[4]
-            })
+            }))
         print(f"✅ {len(comments)} comentários migrados")
         
         # Migra curtidas
@@ -402,15 +339,12 @@ def migrate_old_db():
         old_cur.execute("SELECT * FROM like")
         likes = old_cur.fetchall()
         for like in likes:
-            db.session.execute(text("""
-                INSERT OR IGNORE INTO like (id, user_id, post_id, created_at)
-                VALUES (:id, :user_id, :post_id, :created_at)
-            """), {
+            db.session.execute(insert_ignore(Like.__table__).values({
                 'id': like[0],
                 'user_id': like[1],
                 'post_id': like[2],
-                'created_at': like[3]
-            })
+                'created_at': old_datetime(like[3])
+            }))
         print(f"✅ {len(likes)} curtidas migradas")
         
         # Migra tags
@@ -418,15 +352,12 @@ def migrate_old_db():
         old_cur.execute("SELECT * FROM tag")
         tags = old_cur.fetchall()
         for tag in tags:
-            db.session.execute(text("""
-                INSERT OR IGNORE INTO tag (id, user_id, post_id, created_at)
-                VALUES (:id, :user_id, :post_id, :created_at)
-            """), {
+            db.session.execute(insert_ignore(Tag.__table__).values({
                 'id': tag[0],
                 'user_id': tag[1],
                 'post_id': tag[2],
-                'created_at': tag[3]
-            })
+                'created_at': old_datetime(tag[3])
+            }))
         print(f"✅ {len(tags)} tags migradas")
         
         # Migra visibilidade
@@ -434,17 +365,19 @@ def migrate_old_db():
         old_cur.execute("SELECT * FROM visibility")
         visibilities = old_cur.fetchall()
         for vis in visibilities:
-            db.session.execute(text("""
-                INSERT OR IGNORE INTO visibility (id, user_id, post_id, is_visible)
-                VALUES (:id, :user_id, :post_id, :is_visible)
-            """), {
+            db.session.execute(insert_ignore(Visibility.__table__).values({
                 'id': vis[0],
                 'user_id': vis[1],
                 'post_id': vis[2],
-                'is_visible': vis[3]
-            })
+                'is_visible': old_bool(vis[3])
+            }))
         print(f"✅ {len(visibilities)} configurações de visibilidade migradas")
         
+        # As inserções acima não passam pelo ORM: recalcula os contadores
+        # e, no PostgreSQL, ajusta as sequências dos ids inseridos
+        recount_counters()
+        reset_id_sequences([model.__table__ for model in (User, Post, Comment, Like, Tag, Visibility)])
+        
         db.session.commit()
         old_conn.close()
         
@@ -459,7 +392,7 @@ def migrate_old_db():
 @click.argument('backup_file', required=False)
 @with_appcontext
 def restore(backup_file=None):
-    """Restaura um backup do banco de dados"""
+    """Restaura um backup do banco de dados (.backup do SQLite ou .json portável)"""
     try:
         backup_dir = 'backups/database'
         
@@ -469,15 +402,15 @@ def restore(backup_file=None):
                 print("❌ Nenhum backup encontrado!")
                 return
                 
-            backups = sorted([f for f in os.listdir(backup_dir) if f.endswith('.backup')], reverse=True)
+            backups = sorted([f for f in os.listdir(backup_dir) if f.endswith(('.backup', '.json'))], reverse=True)
             if not backups:
                 print("❌ Nenhum backup encontrado!")
                 return
                 
             print("\n📋 Backups disponíveis:")
-            for i, backup in enumerate(backups, 1):
-                size = os.path.getsize(os.path.join(backup_dir, backup)) / (1024*1024)  # MB
-                print(f"{i}. {backup} ({size:.1f}MB)")
+            for i, backup_name in enumerate(backups, 1):
+                size = os.path.getsize(os.path.join(backup_dir, backup_name)) / (1024*1024)  # MB
+                print(f"{i}. {backup_name} ({size:.1f}MB)")
             
             try:
                 choice = input("\nEscolha o número do backup para restaurar (ou 'q' para sair): ")
@@ -495,27 +428,46 @@ def restore(backup_file=None):
             return
             
         print(f"\n🔄 Restaurando backup: {backup_file}")
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        
+        if backup_file.endswith('.json'):
+            # Backup portável: funciona em qualquer banco
+            pre_restore_backup = os.path.join(backup_dir, f'app.pre_restore.{timestamp}.json')
+            print(f"\n💾 Criando backup de segurança: {os.path.basename(pre_restore_backup)}")
+            dump_database(pre_restore_backup)
+            
+            print("\n🔄 Iniciando restauração...")
+            counts = load_database(backup_path)
+            print(f"\n✅ Backup restaurado com sucesso! ({sum(counts.values())} registros)")
+            return
         
-        # Determina se é app.db ou insta.db baseado no nome do arquivo
+        # Cópia de arquivo do SQLite: app.db (banco atual) ou insta.db (banco antigo)
         if backup_file.startswith('app.db'):
+            current_db_path = sqlite_database_path()
+            if not current_db_path:
+                print("❌ Backups .backup só podem ser restaurados em SQLite; use um backup .json")
+                return
             db_name = 'app.db'
         elif backup_file.startswith('insta.db'):
+            current_db_path = os.path.join('instance', 'insta.db')
             db_name = 'insta.db'
         else:
             print("❌ Nome de arquivo de backup inválido!")
             return
             
         # Cria backup do banco atual antes de restaurar
-        current_db_path = os.path.join('instance', db_name)
         if os.path.exists(current_db_path):
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
             pre_restore_backup = os.path.join(backup_dir, f'{db_name}.pre_restore.{timestamp}.backup')
             print(f"\n💾 Criando backup de segurança: {os.path.basename(pre_restore_backup)}")
-            shutil.copy2(current_db_path, pre_restore_backup)
+            copy_sqlite_database(current_db_path, pre_restore_backup)
         
         print("\n🔄 Iniciando restauração...")
         
-        # Copia o arquivo de backup diretamente para o local do banco de dados
+        # Fecha as conexões abertas e copia o arquivo de backup para o local
+        # do banco, sem o -wal/-shm do banco antigo
+        db.session.remove()
+        db.engine.dispose()
+        remove_sqlite_journal(current_db_path)
         shutil.copy2(backup_path, current_db_path)
         
         print("\n✅ Backup restaurado com sucesso!")
@@ -558,4 +510,120 @@ def create_admin(username, password):
         print(f"\n✅ Usuário administrador '{username}' criado com sucesso!")
     except Exception as e:
         db.session.rollback()
-        print(f"\n❌ Erro ao criar usuário: {str(e)}") 
\ No newline at end of file
+        print(f"\n❌ Erro ao criar usuário: {str(e)}") 
+
+@click.command('sync-pdfs')
+@with_appcontext
+def sync_pdfs():
+    """Sincroniza o catálogo de PDFs com a pasta de uploads"""
+    try:
+        from flask import current_app
+        pdf_folder = os.path.join(current_app.root_path, 'static', 'uploads', 'pdfs')
+        os.makedirs(pdf_folder, exist_ok=True)
+        
+        files = {f for f in os.listdir(pdf_folder) if f.endswith('.pdf')}
+        catalog = {pdf.filename: pdf for pdf in PdfDocument.query.all()}
+        
+        # Adiciona ao catálogo os arquivos que ainda não estão nele
+        added = 0
+        for filename in sorted(files - set(catalog)):
+            file_path = os.path.join(pdf_folder, filename)
+            title = PdfDocument.title_from_filename(filename)
+            db.session.add(PdfDocument(
+                filename=filename,
+                title=title,
+                description=f"Material didático: {title}",
+                size=os.path.getsize(file_path),
+                created_at=datetime.fromtimestamp(os.path.getmtime(file_path))
+            ))
+            added += 1
+        
+        # Remove do catálogo os arquivos que não existem mais
+        removed = 0
+        for filename in set(catalog) - files:
+            db.session.delete(catalog[filename])
+            removed += 1
+        
+        db.session.commit()
+        print(f"\n✅ Catálogo sincronizado: {added} PDFs adicionados, {removed} removidos")
+        
+    except Exception as e:
+        db.session.rollback()
+        print(f"\n❌ Erro ao sincronizar PDFs: {str(e)}")
+
+@click.command('process-pending-images')
+@with_appcontext
+def process_pending_images():
+    """Processa imagens que ficaram pendentes (ex.: servidor reiniciado durante o upload)"""
+    from flask import current_app
+    from .utils.upload_queue import process_post_image
+    
+    pending = [post.id for post in Post.query.filter_by(status='processing').all()]
+    if not pending:
+        print("\n✅ Nenhuma imagem pendente")
+        return
+    
+    print(f"\n🔄 Processando {len(pending)} imagens pendentes...")
+    for post_id in pending:
+        process_post_image(current_app, post_id)
+        post = db.session.get(Post, post_id)
+        print(f"- Post {post_id}: {post.status}")
+
+@click.command('backfill-derivatives')
+@click.option('--workers', default=os.cpu_count() or 1, show_default=True, help='Processos em paralelo')
+@with_appcontext
+def backfill_derivatives(workers):
+    """Gera as versões WebP/JPEG responsivas das imagens antigas"""
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+    from flask import current_app
+    from .utils.image_handler import derivatives_from_file
+    
+    posts = Post.query.filter(
+        Post.image_variants.is_(None),
+        db.or_(Post.status.is_(None), Post.status == 'ready')
+    ).all()
+    if not posts:
+        print("\n✅ Todas as imagens já têm versões responsivas")
+        return
+    
+    derivatives = current_app.config['IMAGE_DERIVATIVES']
+    quality = current_app.config['IMAGE_QUALITY']
+    static_folder = os.path.join(current_app.root_path, 'static')
+    
+    print(f"\n🔄 Gerando versões de {len(posts)} imagens com {workers} processos...")
+    done, failed = 0, 0
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {}
+        for post in posts:
+            source = os.path.join(static_folder, post.static_path)
+            folder = os.path.dirname(source)
+            base_name = os.path.splitext(os.path.basename(source))[0]
+            future = executor.submit(derivatives_from_file, source, folder, base_name, derivatives, quality)
+            futures[future] = post
+        
+        for future in as_completed(futures):
+            post = futures[future]
+            try:
+                post.image_variants = future.result()
+                done += 1
+            except Exception as e:
+                print(f"- Post {post.id}: erro ({str(e)})")
+                failed += 1
+            # Grava em lotes para não perder o progresso se o comando for interrompido
+            if done and done % 50 == 0:
+                db.session.commit()
+    
+    db.session.commit()
+    print(f"\n✅ {done} imagens atualizadas, {failed} com erro")
+
+@click.command('recount-counters')
+@with_appcontext
+def recount_counters_command():
+    """Recalcula os contadores de curtidas e comentários dos posts"""
+    try:
+        updated = recount_counters()
+        db.session.commit()
+        print(f"\n✅ Contadores recalculados em {updated} posts")
+    except Exception as e:
+        db.session.rollback()
+        print(f"\n❌ Erro ao recalcular contadores: {str(e)}")
@@ -1,8 +1,10 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
 from flask_mail import Mail
+from .utils.upload_queue import ImageProcessingQueue
 
 # Inicialização das extensões
 db = SQLAlchemy()
 login_manager = LoginManager()
-mail = Mail() 
\ No newline at end of file
+mail = Mail()
+image_queue = ImageProcessingQueue() 
\ No newline at end of file
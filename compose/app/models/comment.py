@@ -13,6 +13,9 @@ class Comment(db.Model):
     
     author = db.relationship('User', backref='comments')
 
+    # Primeiros comentários de cada post no feed e contagens por post
+    __table_args__ = (db.Index('ix_comment_post_id_created_at', 'post_id', 'created_at', 'id'),)
+
     @property
     def html_text(self):
         """Retorna o texto do comentário formatado como HTML"""
@@ -0,0 +1,93 @@
+"""
+Contadores desnormalizados de curtidas e comentários
+
+Post.like_count e Post.comment_count são atualizados na mesma transação
+que cria ou remove a curtida/comentário. Escritas em SQL puro (migrações,
+importações) não passam por aqui: use `flask recount-counters` depois delas.
+"""
+
+from datetime import datetime
+from sqlalchemy import event, func, select, update
+from ..extensions import db
+from ..utils.sql import insert_ignore
+from .post import Post
+from .like import Like
+from .comment import Comment
+
+post_table = Post.__table__
+
+
+def _change_counter(connection, column, post_id, delta):
+    """Soma delta ao contador e retorna o novo valor (None se o post não existe)"""
+    return connection.execute(
+        update(post_table)
+        .where(post_table.c.id == post_id)
+        .values({column: post_table.c[column] + delta})
+        .returning(post_table.c[column])
+    ).scalar()
+
+
+@event.listens_for(Like, 'after_insert')
+def _like_inserted(mapper, connection, like):
+    _change_counter(connection, 'like_count', like.post_id, 1)
+
+
+@event.listens_for(Like, 'after_delete')
+def _like_deleted(mapper, connection, like):
+    _change_counter(connection, 'like_count', like.post_id, -1)
+
+
+@event.listens_for(Comment, 'after_insert')
+def _comment_inserted(mapper, connection, comment):
+    _change_counter(connection, 'comment_count', comment.post_id, 1)
+
+
+@event.listens_for(Comment, 'after_delete')
+def _comment_deleted(mapper, connection, comment):
+    _change_counter(connection, 'comment_count', comment.post_id, -1)
+
+
+def _current_like_count(post_id):
+    return db.session.execute(
+        select(post_table.c.like_count).where(post_table.c.id == post_id)
+    ).scalar()
+
+
+def like_post(user_id, post_id):
+    """
+    Curte um post de forma idempotente
+    Um único INSERT ... ON CONFLICT DO NOTHING; o contador só muda se a
+    curtida foi criada. Retorna (criada, total de curtidas)
+    """
+    # A curtida criada é detectada pelo RETURNING: no PostgreSQL o rowcount
+    # de um INSERT com RETURNING vem como -1
+    created = db.session.execute(
+        insert_ignore(Like.__table__)
+        .values(user_id=user_id, post_id=post_id, created_at=datetime.utcnow())
+        .returning(Like.__table__.c.id)
+    ).first() is not None
+    if created:
+        return True, _change_counter(db.session.connection(), 'like_count', post_id, 1)
+    return False, _current_like_count(post_id)
+
+
+def unlike_post(user_id, post_id):
+    """
+    Remove a curtida de forma idempotente (um único DELETE)
+    Retorna (removida, total de curtidas)
+    """
+    removed = db.session.execute(
+        Like.__table__.delete().where(Like.user_id == user_id, Like.post_id == post_id)
+    ).rowcount == 1
+    if removed:
+        return True, _change_counter(db.session.connection(), 'like_count', post_id, -1)
+    return False, _current_like_count(post_id)
+
+
+def recount_counters():
+    """Recalcula todos os contadores a partir das tabelas like e comment (um único UPDATE)"""
+    like_total = select(func.count(Like.id)).where(Like.post_id == post_table.c.id).scalar_subquery()
+    comment_total = select(func.count(Comment.id)).where(Comment.post_id == post_table.c.id).scalar_subquery()
+    return db.session.execute(
+        update(post_table).values(like_count=like_total, comment_count=comment_total)
+    ).rowcount
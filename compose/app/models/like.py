@@ -8,4 +8,7 @@ class Like(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     post_id = db.Column(db.Integer, db.ForeignKey('post.id'), nullable=False)
     
-    __table_args__ = (db.UniqueConstraint('user_id', 'post_id', name='unique_user_post_like'),) 
\ No newline at end of file
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'post_id', name='unique_user_post_like'),
+        db.Index('ix_like_post_id', 'post_id'),
+    )
@@ -0,0 +1,44 @@
+from datetime import datetime
+from ..extensions import db
+from flask import url_for
+
+class PdfDocument(db.Model):
+    """Catálogo dos PDFs compartilhados (evita varrer a pasta a cada requisição)"""
+    id = db.Column(db.Integer, primary_key=True)
+    filename = db.Column(db.String(255), nullable=False, unique=True)
+    title = db.Column(db.String(255), nullable=False)
+    description = db.Column(db.Text)
+    size = db.Column(db.Integer, default=0)  # Tamanho em bytes
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
+
+    uploader = db.relationship('User', backref='pdf_documents')
+
+    __table_args__ = (db.Index('ix_pdf_document_created_at_id', 'created_at', 'id'),)
+
+    # Permite que os templates do feed tratem PDFs e fotos da mesma forma
+    type = 'pdf'
+
+    def __repr__(self):
+        return f'<PdfDocument {self.filename}>'
+
+    @property
+    def author(self):
+        return self.uploader
+
+    @property
+    def url(self):
+        """Retorna a URL do arquivo"""
+        return url_for('static', filename=f'uploads/pdfs/{self.filename}')
+
+    @property
+    def size_mb(self):
+        return (self.size or 0) / (1024 * 1024)
+
+    @staticmethod
+    def title_from_filename(filename):
+        """Extrai o título do nome do arquivo (pdf_<timestamp>_<nome>.pdf)"""
+        parts = filename.split('_', 2)
+        if len(parts) >= 3:
+            return parts[2].replace('.pdf', '')
+        return filename.replace('.pdf', '')
@@ -15,31 +15,92 @@ class Post(db.Model):
     likes = db.relationship('Like', backref='post', lazy=True)
     tagged_users = db.relationship('User', secondary='tag', backref='tagged_in')
     visibilities = db.relationship('Visibility', backref='post', lazy=True)
-    is_hidden = db.Column(db.Boolean, default=False)
+    is_hidden = db.Column(db.Boolean, nullable=False, default=False, server_default=db.false())
+    status = db.Column(db.String(20), default='ready', server_default='ready')  # processing, ready, failed
+    filter_name = db.Column(db.String(20))
+    image_variants = db.Column(db.JSON)  # {nome: {width, height, jpeg, webp}}
+    # Contadores desnormalizados, mantidos por app/models/counters.py
+    like_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    comment_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+
+    # Índices da paginação por cursor do feed (ver app/utils/feed.py)
+    __table_args__ = (
+        db.Index('ix_post_is_hidden_created_at', 'is_hidden', 'created_at', 'id'),
+        db.Index('ix_post_user_id_created_at', 'user_id', 'created_at', 'id'),
+        db.Index('ix_post_is_hidden_like_count', 'is_hidden', 'like_count', 'created_at', 'id'),
+        db.Index('ix_post_is_hidden_comment_count', 'is_hidden', 'comment_count', 'created_at', 'id'),
+    )
 
     def __repr__(self):
         return f'<Post {self.id}>'
 
+    @property
+    def is_ready(self):
+        """A imagem já foi processada e pode ser exibida"""
+        return self.status in (None, 'ready')
+
+    def preload_stats(self, liked_by, preview_comments):
+        """Guarda dados já calculados em lote (ver app/utils/feed.py)"""
+        self._preloaded = {
+            'liked_by': liked_by,
+            'preview_comments': preview_comments
+        }
+
+    def _preloaded_value(self, key):
+        preloaded = getattr(self, '_preloaded', None)
+        return preloaded[key] if preloaded else None
+
     def is_liked_by(self, user):
         """Verifica se o post foi curtido pelo usuário"""
         if not user.is_authenticated:
             return False
+        liked_by = self._preloaded_value('liked_by')
+        if liked_by is not None and liked_by[0] == user.id:
+            return liked_by[1]
         return Like.query.filter_by(user_id=user.id, post_id=self.id).first() is not None
 
-    def like_count(self):
-        """Retorna o número de curtidas do post"""
-        return Like.query.filter_by(post_id=self.id).count()
+    @property
+    def preview_comments(self):
+        """Primeiros comentários exibidos no feed"""
+        comments = self._preloaded_value('preview_comments')
+        if comments is not None:
+            return comments
+        return self.comments
 
     def is_visible_to(self, user):
         """Verifica se o post é visível para o usuário"""
         visibility = Visibility.query.filter_by(post_id=self.id, user_id=user.id).first()
         return visibility.is_visible if visibility else True  # Visível por padrão 
 
+    @property
+    def static_path(self):
+        """Caminho da imagem dentro de static/"""
+        if self.image_path:
+            # Garante que o caminho comece com 'uploads/'
+            return self.image_path if self.image_path.startswith('uploads/') else f'uploads/{self.image_path}'
+        return None
+
     @property
     def image_url(self):
         """Retorna a URL completa da imagem"""
         if self.image_path:
-            # Garante que o caminho comece com 'uploads/'
-            path = self.image_path if self.image_path.startswith('uploads/') else f'uploads/{self.image_path}'
-            return url_for('static', filename=path)
-        return None 
\ No newline at end of file
+            return url_for('static', filename=self.static_path)
+        return None
+
+    def srcset(self, image_format='jpeg'):
+        """Retorna o srcset das versões da imagem no formato pedido (jpeg ou webp)"""
+        if not self.image_variants:
+            return None
+        folder = self.static_path.rsplit('/', 1)[0]
+        candidates = {}
+        for variant in self.image_variants.values():
+            filename = variant.get(image_format)
+            if filename:
+                # Versões com a mesma largura (imagem menor que o limite) aparecem uma vez
+                candidates.setdefault(variant['width'], filename)
+        if not candidates:
+            return None
+        return ', '.join(
+            f"{url_for('static', filename=f'{folder}/{filename}')} {width}w"
+            for width, filename in sorted(candidates.items())
+        )
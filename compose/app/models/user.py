@@ -7,7 +7,7 @@ class User(UserMixin, db.Model):
     """Modelo para usuários"""
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False)
-    password_hash = db.Column(db.String(120), nullable=False)
+    password_hash = db.Column(db.String(256), nullable=False)  # scrypt do werkzeug gera ~160 caracteres
     reset_code = db.Column(db.String(8), unique=True, nullable=True)
     reset_code_expiry = db.Column(db.DateTime, nullable=True)
     is_admin = db.Column(db.Boolean, default=False)
@@ -47,17 +47,13 @@ def posts():
     page = request.args.get('page', 1, type=int)
     per_page = 10
     
+    # Os contadores são colunas indexadas do post: posts sem curtidas ou
+    # comentários também aparecem
     if sort_by == 'likes':
-        posts = Post.query\
-            .join(Like)\
-            .group_by(Post.id)\
-            .order_by(func.count(Like.id).desc())
+        posts = Post.query.order_by(Post.like_count.desc(), Post.created_at.desc())
     
     elif sort_by == 'comments':
-        posts = Post.query\
-            .join(Comment)\
-            .group_by(Post.id)\
-            .order_by(func.count(Comment.id).desc())
+        posts = Post.query.order_by(Post.comment_count.desc(), Post.created_at.desc())
     
     else:  # recent
         posts = Post.query.order_by(Post.created_at.desc())
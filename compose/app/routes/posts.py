@@ -1,18 +1,21 @@
-from flask import Blueprint, render_template, request, flash, redirect, url_for, current_app, jsonify
+from flask import Blueprint, render_template, request, flash, redirect, url_for, current_app, jsonify, abort
 from flask_login import login_required, current_user
 from werkzeug.utils import secure_filename
 import os
 import time
-from ..extensions import db
+from ..extensions import db, image_queue
 from ..models.post import Post
 from ..models.comment import Comment
-from ..utils.image_handler import process_image
-from ..models.like import Like
+from ..utils.upload_queue import raw_upload_folder
+from ..utils.feed import get_feed_page, serialize_feed_item
+from ..models.counters import like_post, unlike_post
 from ..models.user import User
 from ..models.tag import Tag
 from ..models.visibility import Visibility
 from ..models.timeline_preference import TimelinePreference
-from sqlalchemy import func, or_
+from ..models.pdf_document import PdfDocument
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import selectinload
 from datetime import datetime
 import pytz  # Adicione esta importação no topo do arquivo
 
@@ -41,66 +44,25 @@ def utc_to_local(utc_dt):
 @bp.route('/feed')
 @login_required
 def feed():
-    """Feed de fotos e PDFs"""
-    # Verifica preferência do usuário
-    preference = TimelinePreference.query.filter_by(user_id=current_user.id).first()
-    sort_by = preference.sort_by if preference else 'recent'
-    admin_first = bool(preference.admin_first) if preference and preference.admin_first is not None else False
+    """Feed de fotos e PDFs (primeira página; as demais vêm de feed_page)"""
+    page = get_feed_page(current_user)
+    return render_template('posts/index.html', posts=page.items, next_cursor=page.next_cursor)
 
-    # Busca todos os posts não ocultos
-    posts = Post.query.filter(
-        or_(Post.is_hidden.is_(None), Post.is_hidden == False)  # noqa
-    ).order_by(Post.created_at.desc()).all()
-
-    # Debug da ordenação admin first
-    if admin_first:
-        admin_posts = [p for p in posts if p.author.is_admin]
-        other_posts = [p for p in posts if not p.author.is_admin]
-        
-        if admin_posts:
-            posts = [admin_posts[0]] + other_posts + admin_posts[1:]
+@bp.route('/feed/page')
+@login_required
+def feed_page():
+    """Página seguinte do feed em JSON, com o fragmento HTML para rolagem infinita"""
+    try:
+        page = get_feed_page(current_user, cursor=request.args.get('cursor'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
 
-    # Busca PDFs
-    UPLOAD_FOLDER, PDF_FOLDER, IMAGE_FOLDER = get_upload_folders()
-    pdf_posts = []
-    
-    for filename in os.listdir(PDF_FOLDER):
-        if filename.endswith('.pdf'):
-            file_path = os.path.join(PDF_FOLDER, filename)
-            # Extrai título e descrição do nome do arquivo
-            parts = filename.split('_', 2)
-            if len(parts) >= 3:
-                title = parts[2].replace('.pdf', '')
-                description = f"Material didático: {title}"
-            else:
-                title = filename.replace('.pdf', '')
-                description = "Material didático compartilhado"
-                
-            file_timestamp = os.path.getmtime(file_path)
-            local_time = datetime.fromtimestamp(file_timestamp)
-            
-            pdf_posts.append({
-                'type': 'pdf',
-                'title': title,
-                'url': url_for('static', filename=f'uploads/pdfs/{filename}'),
-                'created_at': local_time,
-                'author': current_user,
-                'description': description  # Descrição mais informativa
-            })
-    
-    # Combina e ordena todos os posts
-    all_posts = []
-    all_posts.extend(posts)  # Adiciona posts de imagem
-    all_posts.extend(pdf_posts)    # Adiciona PDFs
-    
-    # Ordena PDFs junto com as imagens conforme a preferência
-    if sort_by == 'recent':
-        all_posts.sort(
-            key=lambda x: x['created_at'] if isinstance(x, dict) else x.created_at,
-            reverse=True
-        )
-    
-    return render_template('posts/index.html', posts=all_posts)
+    return jsonify({
+        'posts': [serialize_feed_item(item, current_user) for item in page.items],
+        'html': render_template('posts/_posts_list.html', posts=page.items),
+        'next_cursor': page.next_cursor,
+        'has_next': page.next_cursor is not None
+    })
 
 @bp.route('/upload', methods=['GET', 'POST'])
 @login_required
@@ -124,17 +86,13 @@ def upload():
             flash('Tipo de arquivo não permitido', 'error')
             return redirect(url_for('posts.upload'))
             
-        # Processa upload de imagem
+        # Grava o original; o processamento acontece em segundo plano
         filter_name = request.form.get('filter', 'normal')
-        processed_image = process_image(file, filter_name)
         
         filename = secure_filename(file.filename)
         base, ext = os.path.splitext(filename)
         filename = f"{base}_{int(time.time())}.jpg"
-        filepath = os.path.join(IMAGE_FOLDER, filename)
-        
-        with open(filepath, 'wb') as f:
-            f.write(processed_image.getvalue())
+        file.save(os.path.join(raw_upload_folder(current_app), filename))
         
         # Cria o post com o horário local
         local_tz = pytz.timezone('America/Sao_Paulo')
@@ -144,12 +102,33 @@ def upload():
             image_path=f'uploads/images/{filename}',
             caption=request.form.get('caption', ''),
             user_id=current_user.id,
-            created_at=local_time
+            created_at=local_time,
+            status='processing',
+            filter_name=filter_name
         )
         db.session.add(post)
         db.session.commit()
         
-        flash('Imagem enviada com sucesso!', 'success')
+        if not image_queue.submit(post.id):
+            # Fila cheia: descarta o post para o usuário tentar de novo
+            os.remove(os.path.join(raw_upload_folder(current_app), filename))
+            db.session.delete(post)
+            db.session.commit()
+            message = 'Servidor ocupado processando outras imagens. Tente novamente em instantes.'
+            if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+                return jsonify({'error': message}), 503
+            flash(message, 'error')
+            return redirect(url_for('posts.upload'))
+        
+        if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+            return jsonify({
+                'success': True,
+                'post_id': post.id,
+                'status': post.status,
+                'status_url': url_for('posts.post_status', post_id=post.id)
+            }), 202
+        
+        flash('Imagem enviada! Ela aparecerá no feed assim que for processada.', 'success')
         return redirect(url_for('posts.feed'))
         
     except Exception as e:
@@ -158,6 +137,20 @@ def upload():
         flash(f'Erro ao fazer upload: {str(e)}', 'error')
         return redirect(url_for('posts.upload'))
 
+@bp.route('/post/<int:post_id>/status')
+@login_required
+def post_status(post_id):
+    """Status do processamento da imagem, consultado pelo autor do post"""
+    post = Post.query.get_or_404(post_id)
+    if post.user_id != current_user.id and not current_user.is_admin:
+        return jsonify({'error': 'Post não encontrado'}), 404
+    
+    return jsonify({
+        'post_id': post.id,
+        'status': post.status or 'ready',
+        'image_url': post.image_url if post.is_ready else None
+    })
+
 @bp.route('/post/<int:post_id>/comment', methods=['POST'])
 @login_required
 def add_comment(post_id):
@@ -189,24 +182,39 @@ def add_comment(post_id):
 @bp.route('/post/<int:post_id>/like', methods=['POST'])
 @login_required
 def toggle_like(post_id):
-    """Alterna curtida em um post"""
-    post = Post.query.get_or_404(post_id)
-    like = Like.query.filter_by(user_id=current_user.id, post_id=post_id).first()
+    """
+    Curte ou descurte um post
+    Com {"action": "like"|"unlike"} a operação é idempotente (repetir não muda
+    nada); sem action, alterna a curtida atual
+    """
+    data = request.get_json(silent=True) or {}
+    action = data.get('action')
+    if action not in (None, 'like', 'unlike'):
+        return jsonify({'error': 'Ação inválida'}), 400
     
-    if like:
-        db.session.delete(like)
-        action = 'unliked'
-    else:
-        like = Like(user_id=current_user.id, post_id=post_id)
-        db.session.add(like)
-        action = 'liked'
+    try:
+        if action == 'unlike':
+            _, like_count = unlike_post(current_user.id, post_id)
+            liked = False
+        else:
+            liked, like_count = like_post(current_user.id, post_id)
+            if action is None and not liked:
+                # Já estava curtido: alterna para descurtir
+                _, like_count = unlike_post(current_user.id, post_id)
+            liked = liked or action == 'like'
+    except IntegrityError:
+        # Chave estrangeira: o post não existe
+        like_count = None
     
+    if like_count is None:
+        db.session.rollback()
+        abort(404)
     db.session.commit()
     
     return jsonify({
         'success': True,
-        'action': action,
-        'likeCount': post.like_count()
+        'action': 'liked' if liked else 'unliked',
+        'likeCount': like_count
     })
 
 @bp.route('/post/<int:post_id>/tag', methods=['POST'])
@@ -267,26 +275,15 @@ def notifications():
 @login_required
 def list_pdfs():
     """Lista todos os PDFs compartilhados"""
-    pdfs = []
-    pdf_folder = os.path.join(current_app.root_path, 'static', 'uploads', 'pdfs')
-    
-    for filename in os.listdir(pdf_folder):
-        if filename.endswith('.pdf'):
-            file_path = os.path.join(pdf_folder, filename)
-            title = filename.split('_', 2)[-1].replace('.pdf', '')
-            pdfs.append({
-                'title': title,
-                'url': url_for('static', filename=f'uploads/pdfs/{filename}'),
-                'date': time.ctime(os.path.getmtime(file_path)),
-                'size': os.path.getsize(file_path) / (1024 * 1024)  # Tamanho em MB
-            })
+    page = request.args.get('page', 1, type=int)
     
-    # Ordena por data, mais recente primeiro
-    pdfs.sort(key=lambda x: os.path.getmtime(
-        os.path.join(pdf_folder, x['url'].split('/')[-1])), 
-        reverse=True)
+    # Lê do catálogo, mais recentes primeiro
+    pdfs = PdfDocument.query\
+        .options(selectinload(PdfDocument.uploader))\
+        .order_by(PdfDocument.created_at.desc(), PdfDocument.id.desc())\
+        .paginate(page=page, per_page=current_app.config['PDFS_PER_PAGE'])
     
-    return render_template('posts/pdfs.html', pdfs=pdfs)
+    return render_template('posts/pdfs.html', pdfs=pdfs.items, pagination=pdfs)
 
 @bp.route('/upload_pdf', methods=['POST'])
 @login_required
@@ -312,11 +309,26 @@ def upload_pdf():
         
         file.save(file_path)
         
+        # Registra no catálogo com os dados já conhecidos no upload
+        title = request.form.get('title', '').strip() or PdfDocument.title_from_filename(unique_filename)
+        description = request.form.get('description', '').strip() or f"Material didático: {title}"
+        pdf = PdfDocument(
+            filename=unique_filename,
+            title=title,
+            description=description,
+            size=os.path.getsize(file_path),
+            created_at=datetime.now(pytz.timezone('America/Sao_Paulo')),
+            user_id=current_user.id
+        )
+        db.session.add(pdf)
+        db.session.commit()
+        
         flash('PDF enviado com sucesso!', 'success')
         return redirect(url_for('posts.list_pdfs'))
         
     except Exception as e:
         print(f"Erro no upload do PDF: {str(e)}")
+        db.session.rollback()
         flash(f'Erro ao fazer upload do PDF: {str(e)}', 'error')
         return redirect(url_for('posts.upload'))
 
@@ -113,10 +113,14 @@ document.addEventListener('DOMContentLoaded', function() {
             try {
                 const response = await fetch('/upload', {
                     method: 'POST',
+                    headers: {
+                        'X-Requested-With': 'XMLHttpRequest'
+                    },
                     body: formData
                 });
 
                 if (response.ok) {
+                    // A imagem é processada em segundo plano e aparece no feed quando estiver pronta
                     window.location.href = '/';  // Redireciona para a página inicial
                 } else {
                     const data = await response.json();
@@ -0,0 +1,79 @@
+"""
+Backup portável do banco de dados
+
+Exporta todas as tabelas para um arquivo JSON e importa de volta em
+qualquer banco suportado (SQLite ou PostgreSQL). Também serve para levar
+os dados de uma instalação SQLite para o PostgreSQL.
+"""
+
+import json
+from datetime import date, datetime
+from sqlalchemy import Date, DateTime, select
+from ..extensions import db
+from .sql import reset_id_sequences
+
+FORMAT_VERSION = 1
+
+
+def _encode(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f'Tipo não serializável: {type(value).__name__}')
+
+
+def _decode_row(table, row):
+    """Converte as datas de volta e ignora colunas que não existem mais no modelo"""
+    decoded = {}
+    for column in table.columns:
+        if column.name not in row:
+            continue
+        value = row[column.name]
+        if isinstance(value, str) and isinstance(column.type, DateTime):
+            value = datetime.fromisoformat(value)
+        elif isinstance(value, str) and isinstance(column.type, Date):
+            value = date.fromisoformat(value)
+        decoded[column.name] = value
+    return decoded
+
+
+def dump_database(path):
+    """Grava todas as tabelas do modelo em JSON; retorna {tabela: linhas}"""
+    tables = {}
+    for table in db.metadata.sorted_tables:
+        rows = db.session.execute(select(table).order_by(*table.primary_key.columns)).mappings()
+        tables[table.name] = [dict(row) for row in rows]
+
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'version': FORMAT_VERSION, 'tables': tables}, f, default=_encode, ensure_ascii=False)
+    return {name: len(rows) for name, rows in tables.items()}
+
+
+def load_database(path, batch_size=500):
+    """
+    Substitui o conteúdo das tabelas pelo backup em uma única transação
+    Retorna {tabela: linhas}
+    """
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+    if data.get('version') != FORMAT_VERSION:
+        raise ValueError('Formato de backup não suportado')
+
+    tables = db.metadata.sorted_tables
+    try:
+        # Apaga na ordem inversa das chaves estrangeiras e insere na ordem direta
+        for table in reversed(tables):
+            db.session.execute(table.delete())
+
+        counts = {}
+        for table in tables:
+            rows = [_decode_row(table, row) for row in data['tables'].get(table.name, [])]
+            for start in range(0, len(rows), batch_size):
+                db.session.execute(table.insert(), rows[start:start + batch_size])
+            counts[table.name] = len(rows)
+
+        reset_id_sequences(tables)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return counts
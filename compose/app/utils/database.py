@@ -0,0 +1,81 @@
+"""
+Configuração das conexões com o banco de dados
+
+O banco vem de DATABASE_URL (SQLite por padrão, PostgreSQL em produção com
+vários workers). Fora do SQLite, o pool de conexões usa DB_POOL_SIZE,
+DB_MAX_OVERFLOW, DB_POOL_TIMEOUT e DB_POOL_RECYCLE, com pre_ping para
+descartar conexões derrubadas pelo servidor.
+
+No SQLite, cada conexão nova recebe os PRAGMAs de SQLITE_PRAGMAS:
+- journal_mode=WAL: leituras não bloqueiam a escrita (e vice-versa)
+- synchronous=NORMAL: seguro com WAL e bem mais rápido que FULL
+- busy_timeout: espera o lock em vez de falhar com "database is locked"
+- mmap_size / cache_size: leituras direto da memória
+- foreign_keys: o SQLite só verifica chaves estrangeiras se pedido
+"""
+
+import re
+from sqlalchemy import event
+from ..extensions import db
+
+_PRAGMA_NAME = re.compile(r'^[a-z_]+$')
+
+
+def apply_sqlite_pragmas(dbapi_connection, pragmas):
+    """Executa os PRAGMAs em uma conexão do sqlite3"""
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in pragmas.items():
+            if not _PRAGMA_NAME.match(name):
+                raise ValueError(f'PRAGMA inválido: {name}')
+            cursor.execute(f'PRAGMA {name} = {value}')
+    finally:
+        cursor.close()
+
+
+def sqlite_pragmas(connection, names):
+    """Lê os valores atuais dos PRAGMAs (usado nos testes e no diagnóstico)"""
+    return {
+        name: connection.exec_driver_sql(f'PRAGMA {name}').scalar()
+        for name in names if _PRAGMA_NAME.match(name)
+    }
+
+
+def normalize_database_url(url):
+    """Aceita o formato postgres:// (Heroku, Render etc.), que o SQLAlchemy não reconhece"""
+    if url and url.startswith('postgres://'):
+        return 'postgresql://' + url[len('postgres://'):]
+    return url
+
+
+def configure_engine_options(app):
+    """Monta SQLALCHEMY_ENGINE_OPTIONS conforme o banco (chamar antes de db.init_app)"""
+    uri = normalize_database_url(app.config['SQLALCHEMY_DATABASE_URI'])
+    app.config['SQLALCHEMY_DATABASE_URI'] = uri
+    if uri.startswith('sqlite'):
+        return
+
+    options = {
+        'pool_size': app.config.get('DB_POOL_SIZE', 5),
+        'max_overflow': app.config.get('DB_MAX_OVERFLOW', 10),
+        'pool_timeout': app.config.get('DB_POOL_TIMEOUT', 30),
+        'pool_recycle': app.config.get('DB_POOL_RECYCLE', 1800),
+        'pool_pre_ping': True
+    }
+    # Opções definidas explicitamente na configuração têm prioridade
+    options.update(app.config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+
+
+def init_database(app):
+    """Registra a configuração das conexões no engine da aplicação"""
+    with app.app_context():
+        engine = db.engine
+
+    pragmas = app.config.get('SQLITE_PRAGMAS') or {}
+    if engine.dialect.name != 'sqlite' or not pragmas:
+        return
+
+    @event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        apply_sqlite_pragmas(dbapi_connection, pragmas)
@@ -0,0 +1,331 @@
+import base64
+import binascii
+import json
+from collections import defaultdict, namedtuple
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import func, or_, select, tuple_
+from sqlalchemy.orm import joinedload, selectinload
+from ..extensions import db
+from ..models.post import Post
+from ..models.comment import Comment
+from ..models.like import Like
+from ..models.user import User
+from ..models.timeline_preference import TimelinePreference
+from ..models.pdf_document import PdfDocument
+
+# Uma página do feed: itens (posts e PDFs) e o cursor da próxima página
+FeedPage = namedtuple('FeedPage', ['items', 'next_cursor'])
+
+
+def visible_posts_query(viewer=None):
+    """
+    Query base com todos os posts não ocultos e já processados
+    Posts ainda em processamento aparecem apenas para o próprio autor
+    """
+    ready = or_(Post.status.is_(None), Post.status == 'ready')
+    if viewer is not None and viewer.is_authenticated:
+        ready = or_(ready, Post.user_id == viewer.id)
+    return Post.query.filter(Post.is_hidden == False, ready)  # noqa
+
+
+def preload_feed_stats(posts, user, comments_limit=None):
+    """
+    Pré-carrega curtidas do usuário e primeiros comentários de uma lista de posts:
+    - posts curtidos pelo usuário (1 consulta)
+    - primeiros N comentários de cada post com autor (1 consulta)
+    Os totais de curtidas e comentários já vêm nas colunas do próprio post
+    """
+    if not posts:
+        return posts
+
+    if comments_limit is None:
+        comments_limit = current_app.config.get('FEED_COMMENTS_PREVIEW', 3)
+
+    post_ids = [post.id for post in posts]
+
+    liked = set()
+    if user.is_authenticated:
+        liked = {
+            post_id for (post_id,) in db.session.query(Like.post_id)
+            .filter(Like.user_id == user.id, Like.post_id.in_(post_ids))
+        }
+
+    # Numera os comentários de cada post para buscar só os primeiros N
+    ranked = select(
+        Comment.id,
+        func.row_number().over(
+            partition_by=Comment.post_id,
+            order_by=(Comment.created_at, Comment.id)
+        ).label('position')
+    ).where(Comment.post_id.in_(post_ids)).subquery()
+
+    comments = Comment.query\
+        .join(ranked, Comment.id == ranked.c.id)\
+        .filter(ranked.c.position <= comments_limit)\
+        .options(joinedload(Comment.author))\
+        .order_by(Comment.post_id, ranked.c.position)\
+        .all()
+
+    comments_by_post = defaultdict(list)
+    for comment in comments:
+        comments_by_post[comment.post_id].append(comment)
+
+    user_id = user.id if user.is_authenticated else None
+    for post in posts:
+        post.preload_stats(
+            liked_by=(user_id, post.id in liked),
+            preview_comments=comments_by_post.get(post.id, [])
+        )
+
+    return posts
+
+
+def get_timeline_preference(user):
+    """Retorna (sort_by, admin_first) das preferências do usuário"""
+    preference = TimelinePreference.query.filter_by(user_id=user.id).first()
+    sort_by = preference.sort_by if preference else 'recent'
+    admin_first = bool(preference.admin_first) if preference and preference.admin_first is not None else False
+    return sort_by, admin_first
+
+
+# Ordenações por contador: sort_by -> coluna desnormalizada do post
+COUNTER_COLUMNS = {
+    'likes': Post.like_count,
+    'comments': Post.comment_count
+}
+
+
+def encode_cursor(segment, key=None, pdf_key=None):
+    """
+    Codifica a posição do último item entregue: segmento e chave
+    (created_at, id) ou (contador, created_at, id). No feed por data,
+    pdf_key é a posição nos PDFs: (created_at, id) do último PDF entregue
+    ou () se nenhum PDF foi entregue ainda
+    """
+    data = {'s': segment}
+    if key is not None:
+        if len(key) == 3:
+            data['c'] = key[0]
+            key = key[1:]
+        data['t'] = key[0].isoformat()
+        data['i'] = key[1]
+    if pdf_key is not None:
+        data['p'] = [pdf_key[0].isoformat(), pdf_key[1]] if pdf_key else []
+    return base64.urlsafe_b64encode(json.dumps(data).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    Decodifica um cursor em (segmento, chave, chave dos PDFs); levanta
+    ValueError se for inválido. Sem posição nos PDFs, a chave dos PDFs é ()
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        segment = int(data['s'])
+        key = None
+        if 't' in data:
+            key = (datetime.fromisoformat(data['t']), int(data['i']))
+            if 'c' in data:
+                key = (int(data['c']),) + key
+        pdf_key = ()
+        if data.get('p'):
+            pdf_key = (datetime.fromisoformat(data['p'][0]), int(data['p'][1]))
+        return segment, key, pdf_key
+    except (binascii.Error, ValueError, KeyError, TypeError, AttributeError, IndexError):
+        raise ValueError('Cursor inválido')
+
+
+def _item_key(item, order_column=None):
+    """Chave de ordenação (created_at, id) de um post ou PDF, precedida do contador se houver"""
+    if order_column is not None:
+        return getattr(item, order_column.key), item.created_at, item.id
+    return item.created_at, item.id
+
+
+def _after(query, model, key, order_column=None):
+    """
+    Filtra os itens que vêm depois de `key` na ordem decrescente da chave
+    A comparação por tupla permite ao banco começar a leitura direto no índice
+    """
+    if key is None:
+        return query
+    if order_column is not None and len(key) != 3:
+        raise ValueError('Cursor inválido')
+    if order_column is None:
+        return query.filter(tuple_(model.created_at, model.id) < tuple_(*key[-2:]))
+    return query.filter(tuple_(order_column, model.created_at, model.id) < tuple_(*key))
+
+
+class PostSegment:
+    """
+    Trecho do feed formado por posts em ordem decrescente de
+    (created_at, id) ou, com order_column, de (contador, created_at, id)
+    """
+
+    def __init__(self, query, order_column=None, max_items=None, exclude=None):
+        self.query = query
+        self.order_column = order_column
+        self.max_items = max_items
+        self.exclude = exclude
+
+    def key(self, item):
+        return _item_key(item, self.order_column)
+
+    def fetch(self, key, limit):
+        if self.max_items is not None:
+            if key is not None:
+                return []
+            limit = min(limit, self.max_items)
+        query = self.query
+        if self.exclude is not None:
+            excluded_id = self.exclude()
+            if excluded_id is not None:
+                query = query.filter(Post.id != excluded_id)
+        order = [Post.created_at.desc(), Post.id.desc()]
+        if self.order_column is not None:
+            order.insert(0, self.order_column.desc())
+        return _after(query, Post, key, self.order_column)\
+            .order_by(*order)\
+            .options(selectinload(Post.author), selectinload(Post.tagged_users))\
+            .limit(limit)\
+            .all()
+
+
+class PdfSegment:
+    """Trecho do feed formado pelos PDFs do catálogo"""
+
+    def key(self, item):
+        return _item_key(item)
+
+    def fetch(self, key, limit):
+        return _after(PdfDocument.query, PdfDocument, key)\
+            .order_by(PdfDocument.created_at.desc(), PdfDocument.id.desc())\
+            .options(selectinload(PdfDocument.uploader))\
+            .limit(limit)\
+            .all()
+
+
+def _feed_segments(viewer, sort_by, admin_first):
+    """
+    Monta os trechos do feed quando a ordenação não é por data:
+    - likes/comments ordenam pelo contador do post (desempate por data)
+    - admin_first (ordenação) traz todos os posts de administradores antes dos demais
+    - com a opção admin_first, o post mais recente de administrador vem primeiro,
+      seguido dos posts dos demais usuários e dos outros posts de administradores
+    - os PDFs vêm depois de todas as imagens
+    """
+    order_column = COUNTER_COLUMNS.get(sort_by)
+    if sort_by != 'admin_first' and not admin_first:
+        return [PostSegment(visible_posts_query(viewer), order_column), PdfSegment()]
+
+    base = visible_posts_query(viewer).join(User, Post.user_id == User.id)
+    admin_posts = base.filter(User.is_admin == True)  # noqa
+    other_posts = base.filter(or_(User.is_admin.is_(None), User.is_admin == False))  # noqa
+
+    if sort_by == 'admin_first':
+        return [PostSegment(admin_posts), PostSegment(other_posts), PdfSegment()]
+
+    def pinned_id():
+        pinned = admin_posts.with_entities(Post.id)\
+            .order_by(Post.created_at.desc(), Post.id.desc())\
+            .first()
+        return pinned[0] if pinned else None
+
+    return [
+        PostSegment(admin_posts, max_items=1),
+        PostSegment(other_posts, order_column),
+        PostSegment(admin_posts, order_column, exclude=pinned_id),
+        PdfSegment()
+    ]
+
+
+def _recent_page(viewer, key, pdf_key, per_page):
+    """
+    Página do feed por data: posts e PDFs intercalados por created_at
+    Cada tipo é buscado com o seu próprio cursor e LIMIT, e a página fica
+    com os per_page itens mais recentes dos dois (posts antes dos PDFs com
+    a mesma data)
+    """
+    if key is not None:
+        key = key[-2:]
+
+    posts = PostSegment(visible_posts_query(viewer)).fetch(key, per_page + 1)
+    pdfs = PdfSegment().fetch(pdf_key or None, per_page + 1)
+    merged = sorted(posts + pdfs, key=lambda item: (item.created_at, isinstance(item, Post), item.id),
+                    reverse=True)
+    items = merged[:per_page]
+    if len(merged) <= per_page:
+        return items, None
+
+    last_post = next((item for item in reversed(items) if isinstance(item, Post)), None)
+    last_pdf = next((item for item in reversed(items) if isinstance(item, PdfDocument)), None)
+    next_cursor = encode_cursor(0, _item_key(last_post) if last_post else key,
+                                _item_key(last_pdf) if last_pdf else pdf_key)
+    return items, next_cursor
+
+
+def get_feed_page(user, cursor=None, per_page=None):
+    """
+    Retorna uma página do feed usando paginação por cursor (keyset)
+
+    O custo de cada página não depende da quantidade de posts já exibidos:
+    cada trecho é buscado com WHERE (created_at, id) < cursor e LIMIT
+    (ou (contador, created_at, id) < cursor nas ordenações por curtidas e
+    comentários), usando os índices compostos do post.
+    """
+    if per_page is None:
+        per_page = current_app.config.get('FEED_PER_PAGE', 10)
+
+    segment_index, key, pdf_key = decode_cursor(cursor) if cursor else (0, None, ())
+    sort_by, admin_first = get_timeline_preference(user)
+
+    # Ordenação por data desfaz o admin_first, como no feed original
+    if sort_by == 'recent':
+        items, next_cursor = _recent_page(user, key, pdf_key, per_page)
+    else:
+        segments = _feed_segments(user, sort_by, admin_first)
+        items, next_cursor = [], None
+        while segment_index < len(segments):
+            remaining = per_page - len(items)
+            fetched = segments[segment_index].fetch(key, remaining + 1)
+            if len(fetched) > remaining:
+                items.extend(fetched[:remaining])
+                # Página cheia no fim de um trecho: continua no início do próximo
+                last_key = segments[segment_index].key(items[-1]) if remaining else None
+                next_cursor = encode_cursor(segment_index, last_key)
+                break
+            items.extend(fetched)
+            segment_index, key = segment_index + 1, None
+
+    preload_feed_stats([item for item in items if isinstance(item, Post)], user)
+    return FeedPage(items, next_cursor)
+
+
+def serialize_feed_item(item, user):
+    """Representação JSON de um item do feed"""
+    if isinstance(item, PdfDocument):
+        return {
+            'type': 'pdf',
+            'id': item.id,
+            'title': item.title,
+            'description': item.description,
+            'url': item.url,
+            'author': item.uploader.username if item.uploader else None,
+            'created_at': item.created_at.isoformat()
+        }
+    return {
+        'type': 'image',
+        'id': item.id,
+        'status': item.status,
+        'author': item.author.username,
+        'caption': item.caption,
+        'image_url': item.image_url,
+        'srcset': item.srcset('jpeg'),
+        'webp_srcset': item.srcset('webp'),
+        'created_at': item.created_at.isoformat(),
+        'like_count': item.like_count,
+        'liked': item.is_liked_by(user),
+        'comment_count': item.comment_count
+    }
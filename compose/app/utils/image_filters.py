@@ -0,0 +1,126 @@
+"""
+Motor de filtros de imagem
+
+Cada filtro é uma lista de operações executadas em código nativo do Pillow
+(matriz de cor, tabela de consulta por canal, realce ou convolução), sem
+laços em Python por pixel. Para adicionar um filtro basta registrá-lo:
+
+    register_filter('meu-filtro', Enhance(ImageEnhance.Color, 1.5), Convolve(ImageFilter.SMOOTH))
+"""
+
+from PIL import ImageEnhance, ImageFilter
+
+FILTERS = {}
+
+
+def lut(function):
+    """Pré-calcula uma tabela de consulta de 256 posições para um canal"""
+    return [max(0, min(int(function(i)), 255)) for i in range(256)]
+
+
+IDENTITY = lut(lambda i: i)
+
+
+def _rgb(image):
+    return image if image.mode == 'RGB' else image.convert('RGB')
+
+
+class ColorMatrix:
+    """Combinação linear dos canais RGB (uma única passada em C)"""
+
+    def __init__(self, matrix, truncate=False):
+        # O Pillow arredonda o resultado; com truncate=True o deslocamento
+        # de -0.5 reproduz o int() usado nas fórmulas originais
+        offset = -0.5 if truncate else 0.0
+        self.matrix = tuple(
+            value for row in matrix for value in (*row, offset)
+        )
+
+    def __call__(self, image):
+        return _rgb(image).convert('RGB', self.matrix)
+
+
+class ChannelCurves:
+    """Aplica uma tabela de consulta pré-calculada em cada canal RGB"""
+
+    def __init__(self, red=IDENTITY, green=IDENTITY, blue=IDENTITY):
+        self.table = red + green + blue
+
+    def __call__(self, image):
+        return _rgb(image).point(self.table)
+
+
+class Enhance:
+    """Realce do ImageEnhance (cor, brilho, contraste, nitidez)"""
+
+    def __init__(self, enhancer, factor, mode=None):
+        self.enhancer = enhancer
+        self.factor = factor
+        self.mode = mode
+
+    def __call__(self, image):
+        if self.mode:
+            image = image.convert(self.mode)
+        return self.enhancer(image).enhance(self.factor)
+
+
+class Convolve:
+    """Filtro de convolução do ImageFilter"""
+
+    def __init__(self, image_filter):
+        self.image_filter = image_filter
+
+    def __call__(self, image):
+        return image.filter(self.image_filter)
+
+
+class Grayscale:
+    """Converte para tons de cinza mantendo três canais"""
+
+    def __call__(self, image):
+        return image.convert('L').convert('RGB')
+
+
+def register_filter(name, *steps):
+    """Registra um filtro como sequência de operações"""
+    FILTERS[name] = steps
+
+
+def apply_registered_filter(image, filter_name):
+    """Aplica um filtro registrado; filtros desconhecidos não alteram a imagem"""
+    for step in FILTERS.get(filter_name, ()):
+        image = step(image)
+    return image
+
+
+register_filter('normal')
+register_filter('grayscale', Grayscale())
+register_filter('sepia', ColorMatrix((
+    (0.393, 0.769, 0.189),
+    (0.349, 0.686, 0.168),
+    (0.272, 0.534, 0.131),
+), truncate=True))
+register_filter(
+    'warm',
+    Enhance(ImageEnhance.Color, 1.2, mode='RGB'),
+    ChannelCurves(red=lut(lambda i: float(i) * 1.1))
+)
+register_filter(
+    'cool',
+    Enhance(ImageEnhance.Color, 1.2, mode='RGB'),
+    ChannelCurves(blue=lut(lambda i: float(i) * 1.1))
+)
+register_filter('bright', Enhance(ImageEnhance.Brightness, 1.2))
+register_filter('contrast', Enhance(ImageEnhance.Contrast, 1.3))
+register_filter('blur', Convolve(ImageFilter.GaussianBlur(2)))
+register_filter('sharpen', Convolve(ImageFilter.SHARPEN))
+
+# Filtros oferecidos na tela de upload (mesmos valores do preview em CSS)
+register_filter('brightness', Enhance(ImageEnhance.Brightness, 1.3))
+register_filter('saturate', Enhance(ImageEnhance.Color, 2.0, mode='RGB'))
+register_filter('hue-rotate', ColorMatrix((
+    # Matriz do hue-rotate(90deg) da especificação de filtros CSS
+    (0.0, 0.0, 1.0),
+    (0.356, 0.855, -0.211),
+    (-0.574, 1.430, 0.144),
+)))
@@ -1,109 +1,63 @@
-from PIL import Image, ExifTags, ImageEnhance, ImageFilter
+from PIL import Image, ExifTags, ImageEnhance, ImageFilter, features
 from io import BytesIO
 import os
+from .image_filters import apply_registered_filter
 
 def apply_filter(image, filter_name):
-    """Aplica filtros na imagem"""
+    """Aplica filtros na imagem usando o motor de filtros (image_filters.py)"""
     try:
-        if filter_name == "normal":
-            return image
-        
-        elif filter_name == "grayscale":
-            return image.convert('L').convert('RGB')
-        
-        elif filter_name == "sepia":
-            # Converte para RGB primeiro
-            image = image.convert('RGB')
-            width, height = image.size
-            pixels = image.load()
-            for x in range(width):
-                for y in range(height):
-                    r, g, b = pixels[x, y]
-                    tr = int(0.393 * float(r) + 0.769 * float(g) + 0.189 * float(b))
-                    tg = int(0.349 * float(r) + 0.686 * float(g) + 0.168 * float(b))
-                    tb = int(0.272 * float(r) + 0.534 * float(g) + 0.131 * float(b))
-                    pixels[x, y] = (min(tr, 255), min(tg, 255), min(tb, 255))
-            return image
-        
-        elif filter_name == "warm":
-            image = image.convert('RGB')
-            enhancer = ImageEnhance.Color(image)
-            image = enhancer.enhance(1.2)
-            r, g, b = image.split()
-            r = r.point(lambda i: min(int(float(i) * 1.1), 255))
-            return Image.merge('RGB', (r, g, b))
-        
-        elif filter_name == "cool":
-            image = image.convert('RGB')
-            enhancer = ImageEnhance.Color(image)
-            image = enhancer.enhance(1.2)
-            r, g, b = image.split()
-            b = b.point(lambda i: min(int(float(i) * 1.1), 255))
-            return Image.merge('RGB', (r, g, b))
-        
-        elif filter_name == "bright":
-            enhancer = ImageEnhance.Brightness(image)
-            return enhancer.enhance(1.2)
-        
-        elif filter_name == "contrast":
-            enhancer = ImageEnhance.Contrast(image)
-            return enhancer.enhance(1.3)
-        
-        elif filter_name == "blur":
-            return image.filter(ImageFilter.GaussianBlur(2))
-        
-        elif filter_name == "sharpen":
-            return image.filter(ImageFilter.SHARPEN)
-        
-        return image
-        
+        return apply_registered_filter(image, filter_name)
     except Exception as e:
         print(f"Erro ao aplicar filtro {filter_name}: {str(e)}")
         return image
 
-def process_image(file, filter_name="normal"):
+def prepare_image(file, filter_name="normal", max_size=(800, 800)):
     """
-    Processa a imagem:
+    Prepara a imagem:
     - Mantém a orientação original
     - Aplica filtro selecionado
     - Redimensiona mantendo proporção
-    - Comprime para reduzir tamanho
     - Converte para RGB se necessário
     """
+    # Abre a imagem
+    image = Image.open(file)
+    
+    # Corrige a orientação baseada nos dados EXIF
     try:
-        # Abre a imagem
-        image = Image.open(file)
-        
-        # Corrige a orientação baseada nos dados EXIF
-        try:
-            for orientation in ExifTags.TAGS.keys():
-                if ExifTags.TAGS[orientation] == 'Orientation':
-                    break
-            
-            exif = image._getexif()
-            if exif is not None:
-                if orientation in exif:
-                    if exif[orientation] == 3:
-                        image = image.rotate(180, expand=True)
-                    elif exif[orientation] == 6:
-                        image = image.rotate(270, expand=True)
-                    elif exif[orientation] == 8:
-                        image = image.rotate(90, expand=True)
-        except (AttributeError, KeyError, IndexError):
-            # Casos onde não há dados EXIF ou não é possível processá-los
-            pass
-        
-        # Converte para RGB se necessário
-        if image.mode in ('RGBA', 'P'):
-            image = image.convert('RGB')
-        
-        # Redimensiona mantendo proporção se a imagem for muito grande
-        max_size = (800, 800)
-        if image.size[0] > max_size[0] or image.size[1] > max_size[1]:
-            image.thumbnail(max_size, Image.Resampling.LANCZOS)
-        
-        # Aplica o filtro selecionado
-        image = apply_filter(image, filter_name)
+        for orientation in ExifTags.TAGS.keys():
+            if ExifTags.TAGS[orientation] == 'Orientation':
+                break
+        
+        exif = image._getexif()
+        if exif is not None:
+            if orientation in exif:
+                if exif[orientation] == 3:
+                    image = image.rotate(180, expand=True)
+                elif exif[orientation] == 6:
+                    image = image.rotate(270, expand=True)
+                elif exif[orientation] == 8:
+                    image = image.rotate(90, expand=True)
+    except (AttributeError, KeyError, IndexError):
+        # Casos onde não há dados EXIF ou não é possível processá-los
+        pass
+    
+    # Converte para RGB se necessário
+    if image.mode in ('RGBA', 'P'):
+        image = image.convert('RGB')
+    
+    # Redimensiona mantendo proporção se a imagem for muito grande
+    if image.size[0] > max_size[0] or image.size[1] > max_size[1]:
+        image.thumbnail(max_size, Image.Resampling.LANCZOS)
+    
+    # Aplica o filtro selecionado
+    return apply_filter(image, filter_name)
+
+def process_image(file, filter_name="normal"):
+    """
+    Processa a imagem e comprime em um único JPEG de até 800px
+    """
+    try:
+        image = prepare_image(file, filter_name)
         
         # Converte a imagem processada para bytes
         img_io = BytesIO()
@@ -115,6 +69,42 @@ def process_image(file, filter_name="normal"):
         print(f"Erro ao processar imagem: {str(e)}")
         raise
 
+def save_derivatives(image, folder, base_name, derivatives, quality=80):
+    """
+    Gera as versões da imagem em cada largura, em WebP (se suportado) e JPEG
+    
+    derivatives: sequência de (nome, largura), ex.: (('thumb', 320), ('full', 1080))
+    Retorna {nome: {'width', 'height', 'jpeg', 'webp'}} com os nomes dos arquivos
+    """
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+    
+    webp = features.check('webp')
+    variants = {}
+    for name, width in derivatives:
+        # Nunca amplia: usa a largura original se for menor
+        if image.width > width:
+            height = max(1, round(image.height * width / image.width))
+            resized = image.resize((width, height), Image.Resampling.LANCZOS)
+        else:
+            resized = image
+        
+        variant = {'width': resized.width, 'height': resized.height, 'webp': None}
+        variant['jpeg'] = f'{base_name}_{name}.jpg'
+        resized.save(os.path.join(folder, variant['jpeg']), 'JPEG', quality=quality, optimize=True, progressive=True)
+        if webp:
+            variant['webp'] = f'{base_name}_{name}.webp'
+            resized.save(os.path.join(folder, variant['webp']), 'WEBP', quality=quality, method=4)
+        variants[name] = variant
+    
+    return variants
+
+def derivatives_from_file(source_path, folder, base_name, derivatives, quality=80):
+    """Gera as versões a partir de uma imagem já processada (usado pelo backfill)"""
+    with Image.open(source_path) as image:
+        image.load()
+        return save_derivatives(image, folder, base_name, derivatives, quality)
+
 def process_image_old(file, filter_name='normal'):
     """
     Processa a imagem aplicando o filtro especificado
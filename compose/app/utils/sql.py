@@ -0,0 +1,28 @@
+"""Construções SQL que variam conforme o banco em uso"""
+
+from sqlalchemy import text
+from sqlalchemy.dialects import postgresql, sqlite
+from ..extensions import db
+
+
+def insert_ignore(table):
+    """INSERT que não faz nada se violar uma restrição única (ON CONFLICT DO NOTHING)"""
+    if db.session.get_bind().dialect.name == 'postgresql':
+        return postgresql.insert(table).on_conflict_do_nothing()
+    return sqlite.insert(table).on_conflict_do_nothing()
+
+
+def reset_id_sequences(tables):
+    """
+    Ajusta as sequências dos ids após inserções com id explícito
+    (no PostgreSQL o próximo id não acompanha o maior id inserido)
+    """
+    if db.session.get_bind().dialect.name != 'postgresql':
+        return
+    for table in tables:
+        if 'id' not in table.c:
+            continue
+        db.session.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('\"{table.name}\"', 'id'), "
+            f"COALESCE((SELECT MAX(id) FROM \"{table.name}\"), 0) + 1, false)"
+        ))
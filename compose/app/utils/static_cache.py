@@ -0,0 +1,64 @@
+"""
+Cache de longa duração para arquivos estáticos e uploads
+
+Com STATIC_URL_HASHING ativo, todo url_for('static', ...) recebe o hash do
+conteúdo do arquivo (?v=...). Como a URL muda quando o arquivo muda, a
+resposta pode ser marcada como imutável e o navegador não precisa nem
+revalidar. URLs sem hash (ou com hash antigo) continuam usando ETag e
+Last-Modified, respondendo 304 quando o arquivo não mudou.
+"""
+
+import hashlib
+import os
+from functools import lru_cache
+from flask import request
+from werkzeug.security import safe_join
+
+
+@lru_cache(maxsize=4096)
+def _file_hash(path, mtime_ns, size):
+    """Hash do conteúdo; a chave inclui mtime e tamanho, então arquivos alterados são recalculados"""
+    digest = hashlib.blake2b(digest_size=8)
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def static_file_hash(app, filename):
+    """Retorna o hash de um arquivo em static/ ou None se ele não existir"""
+    path = safe_join(app.static_folder, filename)
+    if path is None:
+        return None
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return _file_hash(path, stat.st_mtime_ns, stat.st_size)
+
+
+def init_static_cache(app):
+    """Registra o versionamento das URLs e os cabeçalhos de cache"""
+    if not app.config.get('STATIC_URL_HASHING'):
+        return
+
+    max_age = app.config.get('STATIC_IMMUTABLE_MAX_AGE', 31536000)
+
+    @app.url_defaults
+    def add_static_hash(endpoint, values):
+        if endpoint == 'static' and 'filename' in values and 'v' not in values:
+            file_hash = static_file_hash(app, values['filename'])
+            if file_hash:
+                values['v'] = file_hash
+
+    @app.after_request
+    def immutable_static(response):
+        if request.endpoint != 'static' or response.status_code not in (200, 304):
+            return response
+        version = request.args.get('v')
+        filename = request.view_args.get('filename') if request.view_args else None
+        if version and filename and version == static_file_hash(app, filename):
+            response.cache_control.public = True
+            response.cache_control.max_age = max_age
+            response.cache_control.immutable = True
+        return response
@@ -0,0 +1,153 @@
+"""
+Fila de processamento de imagens em segundo plano
+
+O upload só grava o arquivo original e cria o Post com status 'processing';
+a rotação EXIF, o filtro e a geração das versões em WebP/JPEG de cada
+largura (IMAGE_DERIVATIVES) rodam em um pool limitado de threads (o Pillow
+libera o GIL nessas operações). Posts que ficaram em 'processing' quando o
+servidor parou voltam para a fila na primeira requisição depois de subir.
+"""
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+def raw_upload_folder(app):
+    """Pasta (fora de static/) onde ficam os originais aguardando processamento"""
+    return os.path.join(app.instance_path, 'raw_uploads')
+
+
+class ImageProcessingQueue:
+    """Pool de workers com limite de tarefas pendentes"""
+
+    def __init__(self, app=None):
+        self.app = None
+        self.executor = None
+        self.slots = None
+        self._recovered = False
+        self._recover_lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        workers = app.config.get('IMAGE_WORKERS', 2)
+        queue_size = app.config.get('IMAGE_QUEUE_SIZE', 20)
+
+        self.app = app
+        self.executor = None
+        if workers > 0:
+            self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='image-worker')
+        # Cada tarefa ocupa uma vaga até terminar (em execução ou na fila)
+        self.slots = threading.BoundedSemaphore(max(workers, 1) + queue_size)
+
+        os.makedirs(raw_upload_folder(app), exist_ok=True)
+        app.extensions['image_queue'] = self
+
+        # Com IMAGE_WORKERS = 0 cada imagem é processada no próprio upload:
+        # nada fica para trás. Fora de uma requisição (CLI, migrações) o
+        # banco pode nem existir ainda
+        self._recovered = False
+        if self.executor is not None:
+            app.before_request(self._recover_pending)
+
+    def submit(self, post_id, block=False):
+        """
+        Enfileira o processamento de um post
+        Retorna None se a fila estiver cheia (com block, espera uma vaga);
+        com IMAGE_WORKERS = 0 processa na hora
+        """
+        if not self.slots.acquire(blocking=block):
+            return None
+
+        if self.executor is None:
+            try:
+                self._run(post_id)
+            finally:
+                self.slots.release()
+            return True
+
+        future = self.executor.submit(self._run_in_context, post_id)
+        future.add_done_callback(lambda _: self.slots.release())
+        return future
+
+    def _run_in_context(self, post_id):
+        from ..extensions import db
+        with self.app.app_context():
+            try:
+                self._run(post_id)
+            finally:
+                db.session.remove()
+
+    def _run(self, post_id):
+        process_post_image(self.app, post_id)
+
+    def _recover_pending(self):
+        """
+        Na primeira requisição, reenfileira os posts que ficaram em 'processing'
+        A consulta termina antes de qualquer requisição seguir (nenhum upload
+        novo entra na lista); a espera por vagas fica numa thread
+        """
+        if self._recovered:
+            return
+        with self._recover_lock:
+            if self._recovered:
+                return
+            from ..extensions import db
+            from ..models.post import Post
+            try:
+                pending = db.session.scalars(db.select(Post.id).filter_by(status='processing')).all()
+            except Exception as e:
+                print(f"Erro ao buscar imagens pendentes: {str(e)}")
+                db.session.rollback()
+                pending = []
+            self._recovered = True
+
+        if pending:
+            print(f"🔄 {len(pending)} imagens pendentes voltaram para a fila")
+            threading.Thread(target=self._resubmit, args=(pending,), name='image-recovery', daemon=True).start()
+
+    def _resubmit(self, post_ids):
+        for post_id in post_ids:
+            self.submit(post_id, block=True)
+
+    def shutdown(self, wait=True):
+        if self.executor is not None:
+            self.executor.shutdown(wait=wait)
+
+
+def process_post_image(app, post_id):
+    """Processa o original de um post e marca o resultado como pronto ou falho"""
+    from ..extensions import db
+    from ..models.post import Post
+    from .image_handler import prepare_image, save_derivatives
+
+    post = db.session.get(Post, post_id)
+    if post is None or post.status != 'processing':
+        return
+
+    derivatives = app.config['IMAGE_DERIVATIVES']
+    max_width = max(width for _, width in derivatives)
+
+    folder, filename = post.image_path.rsplit('/', 1)
+    raw_path = os.path.join(raw_upload_folder(app), filename)
+    output_folder = os.path.join(app.root_path, 'static', folder)
+
+    try:
+        with open(raw_path, 'rb') as raw:
+            image = prepare_image(raw, post.filter_name or 'normal', (max_width, max_width))
+
+        base_name = os.path.splitext(filename)[0]
+        variants = save_derivatives(image, output_folder, base_name, derivatives, app.config['IMAGE_QUALITY'])
+
+        # A maior versão em JPEG é a imagem principal do post
+        largest = max(variants.values(), key=lambda variant: variant['width'])
+        post.image_path = f"{folder}/{largest['jpeg']}"
+        post.image_variants = variants
+        post.status = 'ready'
+        os.remove(raw_path)
+    except Exception as e:
+        print(f"Erro ao processar imagem do post {post_id}: {str(e)}")
+        post.status = 'failed'
+
+    db.session.commit()
@@ -0,0 +1,111 @@
+"""
+Benchmark da paginação do feed
+Mede o tempo da primeira página e de uma página no meio do feed em cada
+ordenação, com quantidades crescentes de posts. Com a paginação por cursor
+e os índices compostos, os tempos devem ficar estáveis.
+Uso: python bench_feed.py [quantidades separadas por vírgula] [repetições]
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from app import create_app
+from app.config import Config
+from app.extensions import db
+from app.models.post import Post
+from app.models.user import User
+from app.models.timeline_preference import TimelinePreference
+from app.utils.feed import COUNTER_COLUMNS, encode_cursor, get_feed_page
+
+SORT_MODES = ['recent', 'likes', 'comments', 'admin_first']
+
+
+def populate(total, users):
+    """Insere posts em lote (sem passar pelo ORM) com contadores aleatórios"""
+    start = datetime(2024, 1, 1)
+    rows = [{
+        'image_path': f'uploads/images/foto_{i}.jpg',
+        'caption': f'Post {i}',
+        'created_at': start + timedelta(seconds=i),
+        'user_id': users[i % len(users)].id,
+        'is_hidden': False,
+        'status': 'ready',
+        'like_count': random.randint(0, 50),
+        'comment_count': random.randint(0, 20)
+    } for i in range(total)]
+    db.session.execute(Post.__table__.insert(), rows)
+    db.session.commit()
+
+
+def middle_cursor(sort_by, total):
+    """Cursor que aponta para o meio do feed na ordenação dada"""
+    column = COUNTER_COLUMNS.get(sort_by)
+    order = [Post.created_at.desc(), Post.id.desc()]
+    if column is not None:
+        order.insert(0, column.desc())
+    post = Post.query.order_by(*order).offset(total // 2).first()
+    key = (post.created_at, post.id)
+    if column is not None:
+        key = (getattr(post, column.key),) + key
+    # Na ordenação admin_first o meio cai no trecho dos demais usuários
+    return encode_cursor(1 if sort_by == 'admin_first' else 0, key)
+
+
+def measure(user, cursor, repeat):
+    """Melhor tempo (em ms) entre as repetições"""
+    best = float('inf')
+    for _ in range(repeat):
+        db.session.expire_all()
+        start = time.perf_counter()
+        get_feed_page(user, cursor=cursor)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def run(total, repeat):
+    folder = tempfile.mkdtemp()
+
+    class BenchConfig(Config):
+        SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.join(folder, 'bench.db')
+        IMAGE_WORKERS = 0
+
+    app = create_app(BenchConfig)
+    with app.app_context(), app.test_request_context():
+        db.create_all()
+        users = [User(username=f'aluno{i}', password_hash='-', is_admin=i == 0) for i in range(20)]
+        db.session.add_all(users)
+        db.session.commit()
+        populate(total, users)
+
+        reader = users[1]
+        preference = TimelinePreference(user_id=reader.id)
+        db.session.add(preference)
+
+        results = {}
+        for sort_by in SORT_MODES:
+            preference.sort_by = sort_by
+            db.session.commit()
+            results[sort_by] = (
+                measure(reader, None, repeat),
+                measure(reader, middle_cursor(sort_by, total), repeat)
+            )
+        db.session.remove()
+    return results
+
+
+def main():
+    totals = [int(n) for n in sys.argv[1].split(',')] if len(sys.argv) > 1 else [1000, 10000, 100000]
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    print(f"Tempo por página do feed (ms), melhor de {repeat} execuções\n")
+    print(f"{'posts':>8} " + ' '.join(f"{mode + ' 1ª':>16} {mode + ' meio':>16}" for mode in SORT_MODES))
+    for total in totals:
+        results = run(total, repeat)
+        print(f"{total:>8} " + ' '.join(f"{first:>16.1f} {middle:>16.1f}" for first, middle in results.values()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+import os
+import pytest
+from alembic.script import ScriptDirectory
+from sqlalchemy import inspect, text
+from conftest import TestConfig, create_user, database_uri, requires_sqlite
+from app import create_app
+from app.extensions import db
+from app.models.post import Post
+from app.models.like import Like
+from app.models.user import User
+from app.models.timeline_preference import TimelinePreference
+
+
+@pytest.fixture
+def empty_app(tmp_path, monkeypatch):
+    """Aplicação com um banco vazio (sem tabelas) e backups em uma pasta temporária"""
+    class CliConfig(TestConfig):
+        SQLALCHEMY_DATABASE_URI = database_uri(tmp_path)
+
+    monkeypatch.chdir(tmp_path)
+    app = create_app(CliConfig)
+    with app.app_context():
+        yield app
+        db.session.remove()
+        db.drop_all()
+        db.session.execute(text('DROP TABLE IF EXISTS alembic_version'))
+        db.session.commit()
+
+
+def run(app, *args, input=None):
+    result = app.test_cli_runner().invoke(args=list(args), input=input)
+    assert result.exception is None, result.output
+    return result.output
+
+
+def test_init_db_creates_schema_and_stamps_migrations(empty_app):
+    output = run(empty_app, 'init-db')
+
+    assert 'Banco de dados inicializado com sucesso' in output
+    tables = set(inspect(db.engine).get_table_names())
+    assert {'user', 'post', 'like', 'comment', 'pdf_document', 'alembic_version'} <= tables
+    migrations = os.path.join(os.path.dirname(empty_app.root_path), 'migrations')
+    script = ScriptDirectory.from_config(empty_app.extensions['migrate'].migrate.get_config(migrations))
+    version = db.session.execute(text('SELECT version_num FROM alembic_version')).scalar()
+    assert version == script.get_current_head()
+    assert User.query.filter_by(username='admin', is_admin=True).count() == 1
+
+    # Rodar de novo só aplica migrações pendentes e não duplica o admin
+    assert 'aplicando migrações pendentes' in run(empty_app, 'init-db')
+    assert User.query.filter_by(username='admin').count() == 1
+
+
+def test_create_timeline_pref_creates_missing_table(empty_app):
+    # Banco antigo: todas as tabelas menos a de preferências
+    db.metadata.create_all(db.engine, tables=[table for table in db.metadata.sorted_tables
+                                              if table.name != 'timeline_preference'])
+    assert 'criada com sucesso' in run(empty_app, 'create-timeline-pref')
+    assert inspect(db.engine).has_table('timeline_preference')
+    assert 'já existe' in run(empty_app, 'create-timeline-pref')
+
+
+def test_portable_backup_round_trip(empty_app):
+    db.create_all()
+    author = create_user('professor')
+    post = Post(image_path='uploads/images/foto.jpg', caption='Aula 1', user_id=author.id)
+    db.session.add(post)
+    db.session.flush()
+    db.session.add(Like(user_id=author.id, post_id=post.id))
+    db.session.add(TimelinePreference(user_id=author.id, sort_by='likes'))
+    db.session.commit()
+
+    run(empty_app, 'backup', '--portable')
+    backups = os.listdir('backups/database')
+    assert len(backups) == 1 and backups[0].endswith('.json')
+
+    # Altera os dados e restaura o backup
+    post.caption = 'Alterado'
+    db.session.add(User(username='intruso', password_hash='-'))
+    db.session.commit()
+    output = run(empty_app, 'restore', backups[0])
+    assert 'Backup restaurado com sucesso' in output
+
+    db.session.expire_all()
+    assert [user.username for user in User.query.all()] == ['professor']
+    restored = Post.query.one()
+    assert restored.caption == 'Aula 1'
+    assert restored.like_count == 1
+    assert restored.created_at == post.created_at
+
+    # Os ids continuam sendo gerados depois dos restaurados
+    new_user = create_user('aluno')
+    assert new_user.id > author.id
+
+
+@requires_sqlite
+def test_sqlite_backup_and_restore_under_wal(empty_app):
+    db.create_all()
+    db_path = db.engine.url.database
+    assert db.session.execute(text('PRAGMA journal_mode')).scalar() == 'wal'
+    author = create_user('professor')
+    db.session.add(Post(image_path='uploads/images/foto.jpg', caption='Aula 1', user_id=author.id))
+    db.session.commit()
+    # Com a conexão aberta as páginas novas ainda estão no -wal, não no app.db
+    assert os.path.getsize(db_path + '-wal') > 0
+
+    run(empty_app, 'backup')
+    backup_name = os.listdir('backups/database')[0]
+
+    db.session.add(User(username='intruso', password_hash='-'))
+    Post.query.one().caption = 'Alterado'
+    db.session.commit()
+    output = run(empty_app, 'restore', backup_name)
+    assert 'Backup restaurado com sucesso' in output
+    # O -wal antigo não pode ser aplicado por cima do banco restaurado
+    assert not os.path.exists(db_path + '-wal') or os.path.getsize(db_path + '-wal') == 0
+
+    db.session.remove()
+    assert [user.username for user in User.query.all()] == ['professor']
+    assert Post.query.one().caption == 'Aula 1'
@@ -0,0 +1,105 @@
+import random
+import threading
+import time
+from sqlalchemy import func
+from sqlalchemy.exc import OperationalError
+from conftest import TestConfig, create_user, login, database_uri, requires_sqlite
+from app import create_app
+from app.extensions import db
+from app.models.post import Post
+from app.models.comment import Comment
+from app.models.like import Like
+from app.utils.database import sqlite_pragmas
+
+STUDENTS = 30
+OPERATIONS = 20  # Por aluno
+
+
+def file_app(tmp_path, **config):
+    class FileConfig(TestConfig):
+        SQLALCHEMY_DATABASE_URI = database_uri(tmp_path)
+    for name, value in config.items():
+        setattr(FileConfig, name, value)
+    return create_app(FileConfig)
+
+
+def stress(clients, post_ids):
+    """Curte/descurte e comenta de várias threads ao mesmo tempo; retorna o relatório"""
+    report = {'requests': 0, 'lock_errors': 0, 'errors': 0}
+    lock = threading.Lock()
+    start_line = threading.Barrier(len(clients))
+
+    def student(client, seed):
+        rng = random.Random(seed)
+        start_line.wait()
+        for i in range(OPERATIONS):
+            post_id = rng.choice(post_ids)
+            try:
+                if i % 2:
+                    response = client.post(f'/post/{post_id}/like')
+                else:
+                    response = client.post(f'/post/{post_id}/comment', data={'text': f'Comentário {i}'},
+                                           headers={'X-Requested-With': 'XMLHttpRequest'})
+                outcome = 'requests' if response.status_code == 200 else 'errors'
+            except OperationalError as e:
+                outcome = 'lock_errors' if 'locked' in str(e) else 'errors'
+            with lock:
+                report[outcome] += 1
+
+    threads = [threading.Thread(target=student, args=(client, seed)) for seed, client in enumerate(clients)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    report['seconds'] = time.perf_counter() - started
+    report['throughput'] = report['requests'] / report['seconds']
+    return report
+
+
+@requires_sqlite
+def test_connections_use_configured_pragmas(tmp_path):
+    app = file_app(tmp_path)
+    with app.app_context():
+        with db.engine.connect() as connection:
+            values = sqlite_pragmas(connection, ['journal_mode', 'synchronous', 'busy_timeout', 'foreign_keys'])
+    # synchronous: 1 = NORMAL
+    assert values == {'journal_mode': 'wal', 'synchronous': 1, 'busy_timeout': 5000, 'foreign_keys': 1}
+
+
+def test_concurrent_likes_and_comments_do_not_lock(tmp_path):
+    app = file_app(tmp_path)
+    with app.app_context():
+        db.create_all()
+        author = create_user('professor')
+        posts = [Post(image_path=f'uploads/images/foto_{i}.jpg', user_id=author.id) for i in range(5)]
+        db.session.add_all(posts)
+        db.session.commit()
+        post_ids = [post.id for post in posts]
+
+        clients = []
+        for i in range(STUDENTS):
+            client = app.test_client()
+            login(client, create_user(f'aluno{i}'))
+            clients.append(client)
+        db.session.remove()
+
+        report = stress(clients, post_ids)
+        print(f"\n{report['requests']} requisições em {report['seconds']:.2f}s "
+              f"({report['throughput']:.0f}/s), {report['lock_errors']} erros de lock, "
+              f"{report['errors']} outros erros")
+
+        assert report['lock_errors'] == 0
+        assert report['errors'] == 0
+        assert report['requests'] == STUDENTS * OPERATIONS
+
+        # Os contadores desnormalizados continuam consistentes
+        likes = dict(db.session.query(Like.post_id, func.count(Like.id)).group_by(Like.post_id))
+        comments = dict(db.session.query(Comment.post_id, func.count(Comment.id)).group_by(Comment.post_id))
+        for post in Post.query.all():
+            assert post.like_count == likes.get(post.id, 0)
+            assert post.comment_count == comments.get(post.id, 0)
+        assert sum(comments.values()) == STUDENTS * OPERATIONS // 2
+
+        db.session.remove()
+        db.drop_all()
@@ -0,0 +1,114 @@
+from sqlalchemy import text
+from conftest import create_user, login, QueryCounter
+from app.extensions import db
+from app.models.post import Post
+from app.models.comment import Comment
+from app.models.like import Like
+
+
+def create_post(author, caption='Foto'):
+    post = Post(image_path='uploads/images/foto.jpg', caption=caption, user_id=author.id)
+    db.session.add(post)
+    db.session.commit()
+    return post
+
+
+def like(client, post_id, action=None):
+    return client.post(f'/post/{post_id}/like', json={'action': action} if action else None)
+
+
+def test_like_and_unlike_are_idempotent(app, client):
+    author, reader = create_user('autor'), create_user('leitor')
+    post = create_post(author)
+    login(client, reader)
+
+    for _ in range(3):
+        data = like(client, post.id, 'like').get_json()
+        assert (data['action'], data['likeCount']) == ('liked', 1)
+    assert Like.query.count() == 1
+
+    for _ in range(3):
+        data = like(client, post.id, 'unlike').get_json()
+        assert (data['action'], data['likeCount']) == ('unliked', 0)
+    assert Like.query.count() == 0
+
+    db.session.refresh(post)
+    assert post.like_count == 0
+
+
+def test_toggle_without_action_alternates(app, client):
+    author = create_user('autor')
+    post = create_post(author)
+    login(client, author)
+
+    assert like(client, post.id).get_json() == {'success': True, 'action': 'liked', 'likeCount': 1}
+    assert like(client, post.id).get_json() == {'success': True, 'action': 'unliked', 'likeCount': 0}
+
+
+def test_like_uses_no_select_before_writing(app, client):
+    author = create_user('autor')
+    post = create_post(author)
+    login(client, author)
+    client.get('/feed')  # Carrega o usuário da sessão fora da contagem
+
+    statements = []
+    db.event.listen(db.engine, 'before_cursor_execute',
+                    lambda conn, cursor, statement, *args: statements.append(statement.split()[0]))
+    like(client, post.id, 'like')
+
+    writes = [s for s in statements if s in ('INSERT', 'UPDATE', 'DELETE')]
+    assert writes == ['INSERT', 'UPDATE']
+    assert 'SELECT' not in statements[statements.index('INSERT'):]
+
+
+def test_like_on_missing_post_returns_404(app, client):
+    login(client, create_user('autor'))
+    assert like(client, 999, 'like').status_code == 404
+    assert Like.query.count() == 0
+
+
+def test_orm_changes_keep_counters_in_sync(app):
+    author = create_user('autor')
+    post = create_post(author)
+
+    comment = Comment(text='Oi', user_id=author.id, post_id=post.id)
+    db.session.add_all([comment, Like(user_id=author.id, post_id=post.id)])
+    db.session.commit()
+    db.session.refresh(post)
+    assert (post.like_count, post.comment_count) == (1, 1)
+
+    db.session.delete(comment)
+    db.session.commit()
+    db.session.refresh(post)
+    assert post.comment_count == 0
+
+
+def test_recount_command_fixes_counters(app):
+    author = create_user('autor')
+    post = create_post(author)
+    # Escrita direta em SQL não atualiza os contadores
+    db.session.execute(text('INSERT INTO "like" (user_id, post_id) VALUES (:u, :p)'),
+                       {'u': author.id, 'p': post.id})
+    db.session.commit()
+    db.session.refresh(post)
+    assert post.like_count == 0
+
+    result = app.test_cli_runner().invoke(args=['recount-counters'])
+    assert 'Contadores recalculados em 1 posts' in result.output
+    db.session.refresh(post)
+    assert post.like_count == 1
+
+
+def test_admin_sort_by_likes_keeps_posts_without_likes(app, client):
+    admin, reader = create_user('professor', is_admin=True), create_user('leitor')
+    popular = create_post(reader, 'Popular')
+    unliked = create_post(reader, 'Sem curtidas')
+    db.session.add(Like(user_id=admin.id, post_id=popular.id))
+    db.session.commit()
+    login(client, admin)
+
+    with QueryCounter(db.engine) as counter:
+        html = client.get('/admin/posts?sort=likes').get_data(as_text=True)
+
+    assert html.index(f'id="post-{popular.id}"') < html.index(f'id="post-{unliked.id}"')
+    assert counter.count < 10
@@ -0,0 +1,277 @@
+from datetime import datetime, timedelta
+import pytest
+from conftest import create_user, login, QueryCounter
+from app.extensions import db
+from app.models.post import Post
+from app.models.comment import Comment
+from app.models.like import Like
+from app.models.tag import Tag
+from app.models.timeline_preference import TimelinePreference
+from app.models.pdf_document import PdfDocument
+
+
+def create_posts(authors, total, start=None):
+    """Cria posts com curtidas, comentários e marcações de vários autores"""
+    start = start or datetime(2024, 1, 1)
+    for i in range(total):
+        author = authors[i % len(authors)]
+        post = Post(
+            image_path=f'uploads/images/foto_{i}.jpg',
+            caption=f'Post {i}',
+            user_id=author.id,
+            created_at=start + timedelta(minutes=i)
+        )
+        db.session.add(post)
+        db.session.flush()
+        for j, user in enumerate(authors):
+            if (i + j) % 2 == 0:
+                db.session.add(Like(user_id=user.id, post_id=post.id))
+            db.session.add(Comment(text=f'Comentário {j}', user_id=user.id, post_id=post.id))
+        db.session.add(Tag(user_id=authors[(i + 1) % len(authors)].id, post_id=post.id))
+    db.session.commit()
+
+
+def count_feed_queries(client):
+    with QueryCounter(db.engine) as counter:
+        response = client.get('/feed')
+    assert response.status_code == 200
+    return counter.count
+
+
+def test_feed_query_count_does_not_grow_with_posts(app, client):
+    users = [create_user(f'aluno{i}') for i in range(5)]
+    login(client, users[0])
+
+    create_posts(users, 3)
+    small = count_feed_queries(client)
+
+    create_posts(users, 40, start=datetime(2024, 2, 1))
+    large = count_feed_queries(client)
+
+    assert small == large
+
+
+def test_feed_shows_preloaded_counts(app, client):
+    users = [create_user(f'aluno{i}') for i in range(5)]
+    login(client, users[0])
+    create_posts(users, 1)
+    app.config['FEED_COMMENTS_PREVIEW'] = 2
+
+    html = client.get('/feed').get_data(as_text=True)
+
+    post = Post.query.one()
+    assert f'<span class="like-count">{Like.query.count()}</span>' in html
+    assert 'Comentário 1' in html
+    assert 'Comentário 2' not in html
+    assert '+ 3 comentários' in html
+    assert post.is_liked_by(users[0]) == ('like-button liked' in html)
+
+
+def walk_feed(client):
+    """Percorre todas as páginas do feed e devolve as legendas na ordem"""
+    data = client.get('/feed/page').get_json()
+    captions = [item.get('caption') or item.get('title') for item in data['posts']]
+    while data['has_next']:
+        data = client.get('/feed/page', query_string={'cursor': data['next_cursor']}).get_json()
+        captions.extend(item.get('caption') or item.get('title') for item in data['posts'])
+    return captions
+
+
+def test_feed_pages_cover_every_post_once(app, client):
+    users = [create_user(f'aluno{i}') for i in range(3)]
+    login(client, users[0])
+    create_posts(users, 25)
+    app.config['FEED_PER_PAGE'] = 10
+
+    captions = walk_feed(client)
+
+    assert captions == [f'Post {i}' for i in reversed(range(25))]
+
+
+def test_feed_pages_keep_admin_first_order(app, client):
+    admin = create_user('professor', is_admin=True)
+    users = [admin] + [create_user(f'aluno{i}') for i in range(2)]
+    login(client, users[1])
+    create_posts(users, 12)
+    db.session.add(TimelinePreference(user_id=users[1].id, sort_by='likes', admin_first=True))
+    db.session.commit()
+    app.config['FEED_PER_PAGE'] = 5
+
+    captions = walk_feed(client)
+
+    # Cada post i tem 2 curtidas se i for par e 1 se for ímpar
+    def by_likes(posts):
+        return [f'Post {i}' for i in sorted(posts, key=lambda i: (2 - i % 2, i), reverse=True)]
+
+    admin_posts = [i for i in reversed(range(12)) if i % 3 == 0]
+    other_posts = [i for i in reversed(range(12)) if i % 3 != 0]
+    assert captions == [f'Post {admin_posts[0]}'] + by_likes(other_posts) + by_likes(admin_posts[1:])
+
+
+def test_feed_pages_sort_by_counters(app, client):
+    users = [create_user(f'aluno{i}') for i in range(3)]
+    login(client, users[0])
+    create_posts(users, 13)
+    # Comentários extras em alguns posts
+    for i, post in enumerate(Post.query.order_by(Post.id)):
+        for _ in range(i % 4):
+            db.session.add(Comment(text='Mais um', user_id=users[0].id, post_id=post.id))
+    db.session.commit()
+    preference = TimelinePreference(user_id=users[0].id, sort_by='likes')
+    db.session.add(preference)
+    db.session.commit()
+    app.config['FEED_PER_PAGE'] = 4
+
+    by_likes = sorted(range(13), key=lambda i: (2 - i % 2, i), reverse=True)
+    assert walk_feed(client) == [f'Post {i}' for i in by_likes]
+
+    preference.sort_by = 'comments'
+    db.session.commit()
+    by_comments = sorted(range(13), key=lambda i: (3 + i % 4, i), reverse=True)
+    assert walk_feed(client) == [f'Post {i}' for i in by_comments]
+
+
+def test_feed_pages_sort_admin_posts_first(app, client):
+    admin = create_user('professor', is_admin=True)
+    users = [admin] + [create_user(f'aluno{i}') for i in range(2)]
+    login(client, users[1])
+    create_posts(users, 9)
+    db.session.add(TimelinePreference(user_id=users[1].id, sort_by='admin_first'))
+    db.session.commit()
+    app.config['FEED_PER_PAGE'] = 2
+
+    captions = walk_feed(client)
+
+    admin_posts = [f'Post {i}' for i in reversed(range(9)) if i % 3 == 0]
+    other_posts = [f'Post {i}' for i in reversed(range(9)) if i % 3 != 0]
+    assert captions == admin_posts + other_posts
+
+
+@pytest.mark.parametrize('sort_by', ['recent', 'likes', 'comments'])
+def test_feed_page_cost_does_not_depend_on_depth(app, client, sort_by):
+    users = [create_user(f'aluno{i}') for i in range(3)]
+    login(client, users[0])
+    create_posts(users, 60)
+    db.session.add(TimelinePreference(user_id=users[0].id, sort_by=sort_by))
+    db.session.commit()
+    app.config['FEED_PER_PAGE'] = 10
+
+    first = client.get('/feed/page').get_json()
+    cursor = first['next_cursor']
+    for _ in range(3):
+        cursor = client.get('/feed/page', query_string={'cursor': cursor}).get_json()['next_cursor']
+
+    with QueryCounter(db.engine) as first_page:
+        client.get('/feed/page')
+    with QueryCounter(db.engine) as deep_page:
+        client.get('/feed/page', query_string={'cursor': cursor})
+
+    assert first_page.count == deep_page.count
+
+
+def test_feed_page_rejects_invalid_cursor(app, client):
+    login(client, create_user('aluno'))
+
+    response = client.get('/feed/page', query_string={'cursor': 'nao-e-um-cursor'})
+
+    assert response.status_code == 400
+
+
+def test_feed_interleaves_catalogued_pdfs_by_date(app, client):
+    users = [create_user(f'aluno{i}') for i in range(3)]
+    login(client, users[0])
+    create_posts(users, 12)
+    for minute in (0.5, 5.5, 11.5):
+        db.session.add(PdfDocument(
+            filename=f'pdf_{minute}_apostila.pdf',
+            title=f'Apostila {minute}',
+            size=1024,
+            created_at=datetime(2024, 1, 1) + timedelta(minutes=minute),
+            user_id=users[1].id
+        ))
+    db.session.commit()
+    app.config['FEED_PER_PAGE'] = 4
+
+    captions = walk_feed(client)
+
+    expected = [f'Post {i}' for i in reversed(range(12))]
+    for minute in (11.5, 5.5, 0.5):
+        expected.insert(expected.index(f'Post {int(minute)}'), f'Apostila {minute}')
+    assert captions == expected
+
+
+def test_pdf_list_reads_from_catalogue(app, client):
+    user = create_user('professor')
+    login(client, user)
+    for i in range(25):
+        db.session.add(PdfDocument(
+            filename=f'pdf_{i}_aula.pdf',
+            title=f'Aula {i}',
+            size=2 * 1024 * 1024,
+            created_at=datetime(2024, 1, 1) + timedelta(days=i),
+            user_id=user.id
+        ))
+    db.session.commit()
+
+    first = client.get('/pdfs').get_data(as_text=True)
+    second = client.get('/pdfs?page=2').get_data(as_text=True)
+
+    assert 'Aula 24' in first and 'Aula 5' in first and 'Aula 4' not in first
+    assert 'Aula 4' in second and 'Aula 0' in second
+    assert '2.00 MB' in first
+
+
+def add_pdfs(user, minutes):
+    for minute in minutes:
+        db.session.add(PdfDocument(
+            filename=f'pdf_{minute}_apostila.pdf',
+            title=f'Apostila {minute}',
+            size=1024,
+            created_at=datetime(2024, 1, 1) + timedelta(minutes=minute),
+            user_id=user.id
+        ))
+    db.session.commit()
+
+
+def test_feed_pages_limit_posts_and_pdfs_together(app, client):
+    users = [create_user(f'aluno{i}') for i in range(2)]
+    login(client, users[0])
+    create_posts(users, 6)
+    add_pdfs(users[1], [i + 0.5 for i in range(6)] + [2, 2.25])  # Um PDF com a mesma data de um post
+    app.config['FEED_PER_PAGE'] = 3
+
+    sizes, captions = [], []
+    data = {'has_next': True, 'next_cursor': None}
+    while data['has_next']:
+        query = {'cursor': data['next_cursor']} if data['next_cursor'] else {}
+        data = client.get('/feed/page', query_string=query).get_json()
+        sizes.append(len(data['posts']))
+        captions.extend(item.get('caption') or item.get('title') for item in data['posts'])
+
+    expected = []
+    for i in reversed(range(6)):
+        expected += [f'Apostila {i + 0.5}', f'Post {i}']
+    expected.insert(expected.index('Post 2'), 'Apostila 2.25')
+    expected.insert(expected.index('Post 2') + 1, 'Apostila 2')
+    assert captions == expected
+    assert sizes == [3, 3, 3, 3, 2]
+
+
+@pytest.mark.parametrize('sort_by', ['recent', 'likes'])
+def test_pdfs_behind_last_post_are_paged(app, client, sort_by):
+    users = [create_user(f'aluno{i}') for i in range(2)]
+    login(client, users[0])
+    create_posts(users, 3, start=datetime(2024, 2, 1))
+    add_pdfs(users[1], range(25))  # Todos mais antigos que o último post
+    db.session.add(TimelinePreference(user_id=users[0].id, sort_by=sort_by))
+    db.session.commit()
+    app.config['FEED_PER_PAGE'] = 10
+
+    pages, data = [], {'has_next': True, 'next_cursor': None}
+    while data['has_next']:
+        query = {'cursor': data['next_cursor']} if data['next_cursor'] else {}
+        data = client.get('/feed/page', query_string=query).get_json()
+        pages.append([item.get('caption') or item.get('title') for item in data['posts']])
+
+    assert [len(page) for page in pages] == [10, 10, 8]
+    assert sum(pages, [])[3:] == [f'Apostila {minute}' for minute in reversed(range(25))]
@@ -0,0 +1,54 @@
+import os
+import pytest
+from PIL import Image, ImageChops
+from app.utils.image_handler import apply_filter
+from bench_filters import apply_filter_old
+from app.utils.image_filters import FILTERS, register_filter, Enhance
+from PIL import ImageEnhance
+
+LEGACY_FILTERS = ['normal', 'grayscale', 'sepia', 'warm', 'cool', 'bright', 'contrast', 'blur', 'sharpen']
+
+
+def random_image(mode='RGB', size=(97, 64)):
+    return Image.frombytes(mode, size, os.urandom(size[0] * size[1] * len(mode)))
+
+
+def max_difference(a, b):
+    assert a.size == b.size
+    assert a.mode == b.mode
+    return max(high for low, high in ImageChops.difference(a, b).getextrema())
+
+
+@pytest.mark.parametrize('filter_name', LEGACY_FILTERS)
+def test_filter_matches_legacy_implementation(filter_name):
+    image = random_image()
+
+    expected = apply_filter_old(image.copy(), filter_name)
+    result = apply_filter(image.copy(), filter_name)
+
+    # O sépia usa matriz em ponto flutuante de precisão simples no Pillow:
+    # alguns pixels podem diferir em 1 nível
+    tolerance = 1 if filter_name == 'sepia' else 0
+    assert max_difference(expected, result) <= tolerance
+
+
+def test_filters_accept_grayscale_images():
+    image = random_image(mode='L')
+
+    for filter_name in ('sepia', 'warm', 'cool'):
+        assert apply_filter(image, filter_name).mode == 'RGB'
+
+
+def test_unknown_filter_returns_image_unchanged():
+    image = random_image()
+
+    assert apply_filter(image, 'nao-existe') is image
+
+
+def test_register_filter_adds_new_filter():
+    register_filter('teste-escuro', Enhance(ImageEnhance.Brightness, 0.0))
+    try:
+        result = apply_filter(random_image(), 'teste-escuro')
+        assert result.getextrema() == ((0, 0), (0, 0), (0, 0))
+    finally:
+        del FILTERS['teste-escuro']
@@ -0,0 +1,104 @@
+import os
+import re
+import pytest
+from PIL import Image
+from conftest import TestConfig, create_user, login
+from app import create_app
+from app.extensions import db
+from app.models.post import Post
+
+
+class HashedConfig(TestConfig):
+    STATIC_URL_HASHING = True
+    SEND_FILE_MAX_AGE_DEFAULT = 3600
+    TEMPLATES_AUTO_RELOAD = False
+
+
+@pytest.fixture
+def hashed_app():
+    app = create_app(HashedConfig)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def feed_image(hashed_app):
+    folder = os.path.join(hashed_app.root_path, 'static', 'uploads', 'images')
+    os.makedirs(folder, exist_ok=True)
+    path = os.path.join(folder, 'cache_teste.jpg')
+    Image.new('RGB', (64, 48), (10, 200, 30)).save(path, 'JPEG')
+    yield path
+    os.remove(path)
+
+
+def static_urls(html):
+    """URLs de static/ referenciadas pela página (src, href e srcset)"""
+    return set(re.findall(r'/static/[^\s"\']+', html))
+
+
+def test_warm_feed_reload_transfers_no_image_bytes(hashed_app, feed_image):
+    user = create_user('leitor')
+    db.session.add(Post(image_path='uploads/images/cache_teste.jpg', user_id=user.id))
+    db.session.commit()
+
+    client = hashed_app.test_client()
+    login(client, user)
+
+    # Primeira visita: baixa tudo e guarda o cache como um navegador faria
+    cold = static_urls(client.get('/feed').get_data(as_text=True))
+    image_urls = {url for url in cold if '/uploads/images/' in url}
+    assert image_urls
+
+    cache = {}
+    for url in cold:
+        response = client.get(url)
+        assert response.status_code == 200
+        assert response.cache_control.immutable
+        assert response.cache_control.max_age == HashedConfig.STATIC_IMMUTABLE_MAX_AGE
+        cache[url] = response.headers['ETag']
+
+    # Segunda visita: mesmas URLs, então o navegador nem faz a requisição
+    warm = static_urls(client.get('/feed').get_data(as_text=True))
+    assert warm == cold
+
+    # Mesmo revalidando, nenhum byte de imagem é transferido
+    transferred = 0
+    for url in image_urls:
+        response = client.get(url, headers={'If-None-Match': cache[url]})
+        assert response.status_code == 304
+        transferred += len(response.get_data())
+    assert transferred == 0
+
+
+def test_url_changes_when_file_content_changes(hashed_app, feed_image):
+    with hashed_app.test_request_context():
+        from flask import url_for
+        before = url_for('static', filename='uploads/images/cache_teste.jpg')
+
+        Image.new('RGB', (64, 48), (250, 0, 0)).save(feed_image, 'JPEG')
+        stat = os.stat(feed_image)
+        os.utime(feed_image, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+        after = url_for('static', filename='uploads/images/cache_teste.jpg')
+
+    assert before != after
+    assert '?v=' in before and '?v=' in after
+
+
+def test_stale_or_missing_version_is_revalidated(hashed_app, feed_image):
+    client = hashed_app.test_client()
+
+    response = client.get('/static/uploads/images/cache_teste.jpg?v=antigo')
+    assert response.status_code == 200
+    assert not response.cache_control.immutable
+
+    response = client.get('/static/uploads/images/cache_teste.jpg')
+    assert not response.cache_control.immutable
+    assert response.cache_control.max_age == HashedConfig.SEND_FILE_MAX_AGE_DEFAULT
+    last_modified = response.headers['Last-Modified']
+
+    revalidated = client.get('/static/uploads/images/cache_teste.jpg',
+                             headers={'If-Modified-Since': last_modified})
+    assert revalidated.status_code == 304
@@ -0,0 +1,161 @@
+import os
+import time
+from io import BytesIO
+from PIL import Image
+from conftest import TestConfig, create_user, login, database_uri
+from app import create_app
+from app.extensions import db
+from app.models.post import Post
+from app.utils.upload_queue import raw_upload_folder
+
+
+def image_file(name='foto.png'):
+    data = BytesIO()
+    Image.new('RGB', (1200, 900), (200, 120, 40)).save(data, 'PNG')
+    data.seek(0)
+    return data, name
+
+
+def upload(client, **form):
+    return client.post(
+        '/upload',
+        data={'file': image_file(), 'filter': 'sepia', 'caption': 'Minha foto', **form},
+        headers={'X-Requested-With': 'XMLHttpRequest'},
+        content_type='multipart/form-data'
+    )
+
+
+def remove_processed(app, post):
+    folder = os.path.join(app.root_path, 'static', 'uploads', 'images')
+    for variant in (post.image_variants or {}).values():
+        for filename in (variant['jpeg'], variant['webp']):
+            if filename and os.path.exists(os.path.join(folder, filename)):
+                os.remove(os.path.join(folder, filename))
+
+
+def test_upload_returns_before_processing_and_reports_status(tmp_path):
+    class AsyncConfig(TestConfig):
+        SQLALCHEMY_DATABASE_URI = database_uri(tmp_path)
+        IMAGE_WORKERS = 1
+
+    app = create_app(AsyncConfig)
+    with app.app_context():
+        db.create_all()
+        author, other = create_user('autor'), create_user('colega')
+        client = app.test_client()
+        login(client, author)
+
+        response = upload(client)
+        assert response.status_code == 202
+        data = response.get_json()
+        assert data['status'] == 'processing'
+
+        # O autor acompanha o processamento pelo endpoint de status
+        deadline = time.time() + 10
+        status = client.get(data['status_url']).get_json()
+        while status['status'] == 'processing' and time.time() < deadline:
+            time.sleep(0.05)
+            status = client.get(data['status_url']).get_json()
+
+        assert status['status'] == 'ready'
+        post = db.session.get(Post, data['post_id'])
+        db.session.refresh(post)
+        path = os.path.join(app.root_path, 'static', post.image_path)
+        assert Image.open(path).size == (1080, 810)
+        remove_processed(app, post)
+
+        # Outros usuários não consultam o status de posts alheios
+        other_client = app.test_client()
+        login(other_client, other)
+        assert other_client.get(data['status_url']).status_code == 404
+
+        app.extensions['image_queue'].shutdown()
+        db.session.remove()
+        db.drop_all()
+
+
+def test_pending_images_are_resubmitted_after_restart(tmp_path):
+    class AsyncConfig(TestConfig):
+        SQLALCHEMY_DATABASE_URI = database_uri(tmp_path)
+        IMAGE_WORKERS = 1
+
+    app = create_app(AsyncConfig)
+    with app.app_context():
+        db.create_all()
+        author = create_user('autor')
+        # Original gravado e post criado, mas o servidor parou antes de processar
+        data, _ = image_file()
+        with open(os.path.join(raw_upload_folder(app), 'pendente.png'), 'wb') as raw:
+            raw.write(data.getvalue())
+        post = Post(image_path='uploads/images/pendente.png', user_id=author.id,
+                    caption='Ficou pendente', status='processing', filter_name='normal')
+        db.session.add(post)
+        db.session.commit()
+
+        # Servidor reiniciado: a primeira requisição devolve o post para a fila
+        client = app.test_client()
+        login(client, author)
+        assert client.get('/feed').status_code == 200
+        deadline = time.time() + 10
+        db.session.refresh(post)
+        while post.status == 'processing' and time.time() < deadline:
+            time.sleep(0.05)
+            db.session.refresh(post)
+
+        assert post.status == 'ready'
+        remove_processed(app, post)
+        app.extensions['image_queue'].shutdown()
+        db.session.remove()
+        db.drop_all()
+
+
+def test_processing_posts_are_only_shown_to_their_author(app, client):
+    author, other = create_user('autor'), create_user('colega')
+    db.session.add(Post(image_path='uploads/images/pendente.jpg', user_id=author.id,
+                        caption='Ainda processando', status='processing'))
+    db.session.commit()
+
+    login(client, author)
+    assert 'Processando imagem' in client.get('/feed').get_data(as_text=True)
+
+    login(client, other)
+    assert 'Ainda processando' not in client.get('/feed').get_data(as_text=True)
+
+
+def test_upload_is_rejected_when_queue_is_full(app, client):
+    login(client, create_user('autor'))
+    queue = app.extensions['image_queue']
+    while queue.slots.acquire(blocking=False):
+        pass
+
+    response = upload(client)
+
+    assert response.status_code == 503
+    assert Post.query.count() == 0
+
+
+def test_upload_generates_responsive_derivatives(app, client):
+    author = create_user('autor')
+    login(client, author)
+
+    data = upload(client).get_json()
+    post = db.session.get(Post, data['post_id'])
+    db.session.refresh(post)
+    assert post.status == 'ready'
+
+    try:
+        folder = os.path.join(app.root_path, 'static', 'uploads', 'images')
+        sizes = {name: (variant['width'], variant['height']) for name, variant in post.image_variants.items()}
+        assert sizes == {'thumb': (320, 240), 'feed': (640, 480), 'full': (1080, 810)}
+        for variant in post.image_variants.values():
+            assert Image.open(os.path.join(folder, variant['jpeg'])).format == 'JPEG'
+            assert Image.open(os.path.join(folder, variant['webp'])).format == 'WEBP'
+        assert post.image_path == f"uploads/images/{post.image_variants['full']['jpeg']}"
+
+        html = client.get('/feed').get_data(as_text=True)
+        assert '<source type="image/webp"' in html
+        assert ' 320w, ' in html and ' 1080w"' in html
+        assert 'sizes="(max-width: 600px) 100vw, 600px"' in html
+        assert 'loading="lazy"' in html
+    finally:
+        remove_processed(app, post)
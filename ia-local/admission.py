@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Controle de admissão das conversas do Chatbot de IA Local
+O Ollama roda em uma CPU (ou uma GPU) e divide o processamento entre todas
+as gerações ao mesmo tempo: com 20 alunos mandando mensagens juntos, todas
+ficam lentas e muitas estouram o timeout. Aqui só max_concurrent gerações
+rodam por vez; as outras esperam numa fila por ordem de chegada (com
+tamanho máximo) e cada cliente tem um limite de mensagens por minuto.
+"""
+
+import time
+import threading
+import itertools
+from collections import deque
+from contextlib import contextmanager
+from typing import Deque, Dict
+
+
+class AdmissionRejected(Exception):
+    """Requisição recusada; retry_after sugere quando tentar de novo (segundos)"""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class QueueFull(AdmissionRejected):
+    """A fila de espera está cheia"""
+
+
+class RateLimited(AdmissionRejected):
+    """O cliente passou do limite de mensagens"""
+
+
+class QueueTimeout(AdmissionRejected):
+    """Esperou demais na fila"""
+
+
+class Ticket:
+    __slots__ = ('number', 'client', 'queued_at', 'admitted_at', 'released')
+
+    def __init__(self, number: int, client: str):
+        self.number = number
+        self.client = client
+        self.queued_at = time.monotonic()
+        self.admitted_at = None
+        self.released = False
+
+
+class AdmissionController:
+    def __init__(self, max_concurrent: int = 1, max_queue: int = 20, queue_timeout: float = 120,
+                 rate_limit: int = 10, rate_window: float = 60):
+        """
+        max_concurrent: gerações ao mesmo tempo no Ollama
+        max_queue: requisições esperando; acima disso são recusadas na hora
+        queue_timeout: tempo máximo de espera na fila (segundos)
+        rate_limit: mensagens por cliente a cada rate_window segundos (0 = sem limite)
+        """
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.rate_limit = rate_limit
+        self.rate_window = rate_window
+
+        self._condition = threading.Condition()
+        self._queue: Deque[Ticket] = deque()
+        self._running = 0
+        self._numbers = itertools.count(1)
+        self._requests: Dict[str, Deque[float]] = {}
+        self._stats = {'admitted': 0, 'completed': 0, 'rejected_full': 0, 'rejected_rate': 0,
+                       'timeouts': 0, 'cancelled': 0, 'wait_seconds': 0.0, 'run_seconds': 0.0}
+
+    def check_rate(self, client: str):
+        """Conta uma mensagem do cliente; levanta RateLimited se passou do limite"""
+        if not self.rate_limit:
+            return
+        now = time.monotonic()
+        with self._condition:
+            history = self._requests.setdefault(client, deque())
+            while history and now - history[0] >= self.rate_window:
+                history.popleft()
+            if len(history) >= self.rate_limit:
+                self._stats['rejected_rate'] += 1
+                raise RateLimited('Muitas mensagens seguidas, aguarde um pouco',
+                                  retry_after=self.rate_window - (now - history[0]))
+            history.append(now)
+            # Esquecer clientes que não mandam nada há uma janela inteira
+            if len(self._requests) > 1000:
+                for other in [key for key, times in self._requests.items()
+                              if not times or now - times[-1] >= self.rate_window]:
+                    del self._requests[other]
+
+    def enter(self, client: str = '') -> Ticket:
+        """Entra na fila; levanta QueueFull se não há lugar"""
+        with self._condition:
+            if len(self._queue) >= self.max_queue and not self._has_free_slot():
+                self._stats['rejected_full'] += 1
+                raise QueueFull('Servidor ocupado, tente novamente em instantes',
+                                retry_after=self._estimated_wait(len(self._queue)))
+            ticket = Ticket(next(self._numbers), client)
+            self._queue.append(ticket)
+            self._admit()
+            return ticket
+
+    def _has_free_slot(self) -> bool:
+        return self._running < self.max_concurrent and not self._queue
+
+    def _estimated_wait(self, position: int) -> float:
+        """Espera estimada pelo tempo médio das gerações já concluídas"""
+        completed = self._stats['completed']
+        average = self._stats['run_seconds'] / completed if completed else 30.0
+        return max(1.0, average * (position + 1) / max(1, self.max_concurrent))
+
+    def _admit(self):
+        """Libera as primeiras da fila enquanto houver vaga (ordem de chegada)"""
+        admitted = False
+        while self._queue and self._running < self.max_concurrent:
+            ticket = self._queue.popleft()
+            ticket.admitted_at = time.monotonic()
+            self._running += 1
+            self._stats['admitted'] += 1
+            self._stats['wait_seconds'] += ticket.admitted_at - ticket.queued_at
+            admitted = True
+        if admitted:
+            self._condition.notify_all()
+
+    def position(self, ticket: Ticket) -> int:
+        """Posição na fila (1 = próxima a entrar; 0 = já admitida)"""
+        with self._condition:
+            if ticket.admitted_at is not None:
+                return 0
+            for position, waiting in enumerate(self._queue, 1):
+                if waiting is ticket:
+                    return position
+            return 0
+
+    def wait(self, ticket: Ticket, timeout: float) -> bool:
+        """Espera até timeout segundos pela vez do ticket; True se foi admitido"""
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while ticket.admitted_at is None and not ticket.released:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+            return ticket.admitted_at is not None
+
+    def expired(self, ticket: Ticket) -> bool:
+        """Se o ticket já esperou mais que queue_timeout sem ser admitido"""
+        return ticket.admitted_at is None and time.monotonic() - ticket.queued_at >= self.queue_timeout
+
+    def release(self, ticket: Ticket, timed_out: bool = False):
+        """Libera a vaga (ou sai da fila, se ainda não tinha sido admitido)"""
+        with self._condition:
+            if ticket.released:
+                return
+            ticket.released = True
+            if ticket.admitted_at is not None:
+                self._running -= 1
+                self._stats['completed'] += 1
+                self._stats['run_seconds'] += time.monotonic() - ticket.admitted_at
+            else:
+                self._queue.remove(ticket)
+                self._stats['timeouts' if timed_out else 'cancelled'] += 1
+            self._admit()
+            self._condition.notify_all()
+
+    @contextmanager
+    def slot(self, client: str = ''):
+        """Bloco executado com uma vaga: espera na fila até queue_timeout"""
+        ticket = self.enter(client)
+        if not self.wait(ticket, self.queue_timeout):
+            self.release(ticket, timed_out=True)
+            raise QueueTimeout('Tempo de espera na fila esgotado', retry_after=self._estimated_wait(0))
+        try:
+            yield ticket
+        finally:
+            self.release(ticket)
+
+    def stats(self) -> Dict:
+        with self._condition:
+            stats = dict(self._stats, running=self._running, queued=len(self._queue),
+                         max_concurrent=self.max_concurrent, max_queue=self.max_queue)
+        wait_seconds, run_seconds = stats.pop('wait_seconds'), stats.pop('run_seconds')
+        stats['average_wait'] = round(wait_seconds / stats['admitted'], 3) if stats['admitted'] else 0.0
+        stats['average_run'] = round(run_seconds / stats['completed'], 3) if stats['completed'] else 0.0
+        return stats
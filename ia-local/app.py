@@ -6,13 +6,22 @@ Servidor Flask para interface web do chatbot
 
 import os
 import json
-import requests
 from datetime import datetime
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, render_template, request, jsonify, Response, stream_with_context
 from flask_cors import CORS
 from dotenv import load_dotenv
+import uuid
 from werkzeug.utils import secure_filename
-from pdf_processor import PDFProcessor
+from pdf_processor import PDFProcessor, save_and_hash
+from chat_history import ChatHistory
+from ollama_client import OllamaClient, OllamaError, OllamaTimeout, OllamaUnavailable
+from ttl_cache import TTLCache
+from job_queue import JobFailed, JobQueue
+from retrieval import Retriever, format_context
+from pdf_collections import PDFCollections
+from response_cache import ResponseCache
+from admission import AdmissionController, AdmissionRejected, QueueTimeout
+from conversation import ConversationStore
 
 # Carregar variáveis de ambiente
 load_dotenv()
@@ -23,48 +32,275 @@ CORS(app)
 # Configurações
 OLLAMA_HOST = os.getenv('OLLAMA_HOST', 'http://localhost:11434')
 MODEL_NAME = os.getenv('MODEL_NAME', 'llama2')
-LOG_FILE = 'logs/chat_history.json'
+LOG_FILE = 'logs/chat_history.jsonl'
+LEGACY_LOG_FILE = 'logs/chat_history.json'  # Formato antigo, migrado na primeira execução
+HISTORY_MAX_BYTES = int(os.getenv('HISTORY_MAX_BYTES', str(10 * 1024 * 1024)))
+HISTORY_BACKUPS = int(os.getenv('HISTORY_BACKUPS', '5'))
+HISTORY_PAGE_SIZE = 50
+HISTORY_MAX_PAGE_SIZE = 500
 UPLOAD_FOLDER = 'uploads'
+# OCR de PDFs escaneados: processos em paralelo (padrão: número de núcleos),
+# resolução, tons de cinza e limite de memória para as imagens das páginas
+OCR_WORKERS = int(os.getenv('OCR_WORKERS')) if os.getenv('OCR_WORKERS') else None
+OCR_DPI = int(os.getenv('OCR_DPI', '200'))
+OCR_GRAYSCALE = os.getenv('OCR_GRAYSCALE', 'true').lower() in ('1', 'true', 'yes')
+OCR_MAX_MEMORY_MB = int(os.getenv('OCR_MAX_MEMORY_MB', '512'))
+# PDFs processados ao mesmo tempo em segundo plano (0 = não processar)
+PDF_JOB_WORKERS = int(os.getenv('PDF_JOB_WORKERS', '1'))
+JOBS_DB = 'cache/jobs.db'
+# Contexto dos PDFs: trechos mais relevantes para a pergunta, até este limite
+# de tokens (estimado). EMBEDDING_MODEL (ex.: nomic-embed-text) ativa a busca
+# por embeddings junto com a busca por palavras
+CONTEXT_TOKEN_BUDGET = int(os.getenv('CONTEXT_TOKEN_BUDGET', '1000'))
+RETRIEVAL_TOP_K = int(os.getenv('RETRIEVAL_TOP_K', '8'))
+EMBEDDING_MODEL = os.getenv('EMBEDDING_MODEL', '')
 MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
+# Timeouts de leitura (segundos) das chamadas ao Ollama. No streaming vale
+# entre um token e outro (em CPU o primeiro token pode demorar enquanto o
+# modelo é carregado)
+OLLAMA_TIMEOUTS = {
+    'tags': (2, float(os.getenv('OLLAMA_TAGS_TIMEOUT', '5'))),
+    'generate': (5, float(os.getenv('OLLAMA_GENERATE_TIMEOUT', '60'))),
+    'stream': (5, float(os.getenv('STREAM_READ_TIMEOUT', '120'))),
+    'pull': (5, float(os.getenv('OLLAMA_PULL_TIMEOUT', '300'))),
+    'embed': (5, float(os.getenv('OLLAMA_EMBED_TIMEOUT', '30')))
+}
+OLLAMA_RETRIES = int(os.getenv('OLLAMA_RETRIES', '2'))
+OLLAMA_BREAKER_THRESHOLD = int(os.getenv('OLLAMA_BREAKER_THRESHOLD', '3'))
+OLLAMA_BREAKER_RESET = float(os.getenv('OLLAMA_BREAKER_RESET', '30'))
+# Validade (segundos) da lista de modelos e do estado do Ollama em cache.
+# Vencido o TTL, o valor antigo ainda é usado por CACHE_STALE_TTL enquanto
+# é atualizado em segundo plano
+MODELS_CACHE_TTL = float(os.getenv('MODELS_CACHE_TTL', '60'))
+HEALTH_CACHE_TTL = float(os.getenv('HEALTH_CACHE_TTL', '5'))
+CACHE_STALE_TTL = float(os.getenv('CACHE_STALE_TTL', '300'))
+# Cache das respostas para perguntas repetidas (RESPONSE_CACHE_MAX_ENTRIES=0 desativa)
+RESPONSE_CACHE_TTL = float(os.getenv('RESPONSE_CACHE_TTL', '86400'))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv('RESPONSE_CACHE_MAX_ENTRIES', '500'))
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv('RESPONSE_CACHE_MAX_BYTES', str(5 * 1024 * 1024)))
+# Controle de admissão: gerações ao mesmo tempo no Ollama, tamanho e tempo
+# máximo da fila de espera e mensagens por cliente por minuto (0 = sem limite)
+OLLAMA_MAX_CONCURRENT = int(os.getenv('OLLAMA_MAX_CONCURRENT', '1'))
+CHAT_QUEUE_MAX = int(os.getenv('CHAT_QUEUE_MAX', '20'))
+CHAT_QUEUE_TIMEOUT = float(os.getenv('CHAT_QUEUE_TIMEOUT', '120'))
+CHAT_RATE_LIMIT = int(os.getenv('CHAT_RATE_LIMIT', '10'))
+CHAT_RATE_WINDOW = float(os.getenv('CHAT_RATE_WINDOW', '60'))
+# A cada quantos segundos o streaming avisa a posição na fila
+QUEUE_UPDATE_INTERVAL = 2
+# Memória das conversas (session_id): tokens das últimas trocas enviadas
+# inteiras ao modelo, tamanho do resumo das mais antigas e sessões guardadas.
+# CONVERSATION_SUMMARIZE=false resume sem chamar o modelo (primeira frase de cada troca)
+CONVERSATION_TOKEN_BUDGET = int(os.getenv('CONVERSATION_TOKEN_BUDGET', '1000'))
+CONVERSATION_SUMMARY_TOKENS = int(os.getenv('CONVERSATION_SUMMARY_TOKENS', '200'))
+CONVERSATION_MAX_SESSIONS = int(os.getenv('CONVERSATION_MAX_SESSIONS', '200'))
+CONVERSATION_SUMMARIZE = os.getenv('CONVERSATION_SUMMARIZE', 'true').lower() in ('1', 'true', 'yes')
+SUMMARY_PROMPT = ("Resuma em poucas frases, em português, os assuntos desta conversa entre "
+                  "um usuário e um assistente, mantendo nomes e detalhes importantes:\n\n")
 
 # Configurar upload
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 app.config['MAX_CONTENT_LENGTH'] = MAX_CONTENT_LENGTH
 
+# Cliente do Ollama (conexões reaproveitadas, retries e circuit breaker)
+ollama = OllamaClient(OLLAMA_HOST, timeouts=OLLAMA_TIMEOUTS, retries=OLLAMA_RETRIES,
+                      failure_threshold=OLLAMA_BREAKER_THRESHOLD, reset_timeout=OLLAMA_BREAKER_RESET)
+ollama_cache = TTLCache(stale_ttl=CACHE_STALE_TTL)
+response_cache = ResponseCache(ttl=RESPONSE_CACHE_TTL, max_entries=RESPONSE_CACHE_MAX_ENTRIES,
+                               max_bytes=RESPONSE_CACHE_MAX_BYTES)
+admission = AdmissionController(max_concurrent=OLLAMA_MAX_CONCURRENT, max_queue=CHAT_QUEUE_MAX,
+                                queue_timeout=CHAT_QUEUE_TIMEOUT, rate_limit=CHAT_RATE_LIMIT,
+                                rate_window=CHAT_RATE_WINDOW)
+
+def summarize_conversation(text, model=None):
+    """
+    Resumo das trocas antigas feito pelo modelo da própria conversa (em
+    segundo plano, esperando a vez na fila), sem carregar outro modelo
+    """
+    with admission.slot():
+        return ollama.generate(model or MODEL_NAME, SUMMARY_PROMPT + text).get('response', '')
+
+conversations = ConversationStore(max_sessions=CONVERSATION_MAX_SESSIONS, token_budget=CONVERSATION_TOKEN_BUDGET,
+                                  summary_tokens=CONVERSATION_SUMMARY_TOKENS,
+                                  summarize=summarize_conversation if CONVERSATION_SUMMARIZE else None)
+
 # Inicializar processador de PDF
-pdf_processor = PDFProcessor(upload_dir=UPLOAD_FOLDER, cache_dir='cache')
+pdf_processor = PDFProcessor(upload_dir=UPLOAD_FOLDER, cache_dir='cache', ocr_workers=OCR_WORKERS,
+                             ocr_dpi=OCR_DPI, ocr_grayscale=OCR_GRAYSCALE, ocr_max_memory_mb=OCR_MAX_MEMORY_MB)
 
 # Garantir que os diretórios existem
 os.makedirs('logs', exist_ok=True)
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 os.makedirs('cache', exist_ok=True)
 
-def load_chat_history():
-    """Carrega histórico de conversas"""
-    if os.path.exists(LOG_FILE):
-        try:
-            with open(LOG_FILE, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except:
-            return []
-    return []
+def pdf_summary(result):
+    """Dados do PDF processado retornados pela API"""
+    return {
+        'hash': result['file_hash'],
+        'name': result['file_name'],
+        'size': result['file_size'],
+        'pages': result['pages'],
+        'text_length': result['text_length'],
+        'title': result['title'],
+        'author': result['author']
+    }
 
-def save_chat_history(history):
-    """Salva histórico de conversas"""
-    try:
-        with open(LOG_FILE, 'w', encoding='utf-8') as f:
-            json.dump(history, f, ensure_ascii=False, indent=2)
-    except Exception as e:
-        print(f"Erro ao salvar histórico: {e}")
+def process_pdf_job(job, progress):
+    """Processa um PDF da fila (roda em segundo plano): extrai o texto e indexa os trechos"""
+    result = pdf_processor.extract_text_from_pdf(job['file_path'], progress=progress,
+                                                 file_name=job['file_name'], file_hash=job['file_hash'])
+    if 'error' in result:
+        # Remover arquivo se houver erro
+        if os.path.exists(job['file_path']):
+            os.remove(job['file_path'])
+        raise JobFailed(result['error'])
+    retriever.add_document(result['file_hash'], result['file_name'], result['text'], result.get('page_offsets'))
+    return pdf_summary(result)
+
+def ensure_indexed(file_hash):
+    """Indexa um PDF processado antes da busca por trechos existir"""
+    if retriever.has_document(file_hash):
+        return True
+    data = pdf_processor.cache.load(file_hash)
+    if not data or not data.get('text'):
+        return False
+    retriever.add_document(file_hash, data['file_name'], data['text'], data.get('page_offsets'))
+    return True
+
+# Índice dos trechos dos PDFs
+embed = (lambda text: ollama.embed(EMBEDDING_MODEL, text)) if EMBEDDING_MODEL else None
+retriever = Retriever(index_dir='cache/index', embed=embed)
+
+# Coleções de PDFs (ex.: as apostilas de um curso)
+pdf_collections = PDFCollections('cache/collections.json')
+
+# Fila de processamento de PDFs (SQLite, sobrevive a reinícios)
+pdf_jobs = JobQueue(JOBS_DB, handler=process_pdf_job, workers=PDF_JOB_WORKERS)
+
+def migrate_legacy_hashes():
+    """PDFs processados antes do BLAKE2b passam para o hash novo (índice, coleções e tarefas juntos)"""
+    migrated = pdf_processor.migrate_legacy_hashes()
+    for old_hash, new_hash in migrated.items():
+        retriever.rename_document(old_hash, new_hash)
+        pdf_collections.rename_document(old_hash, new_hash)
+        pdf_jobs.rekey(old_hash, new_hash)
+    if migrated:
+        print(f"🔑 {len(migrated)} PDFs passaram do MD5 para o BLAKE2b")
+    return migrated
+
+migrate_legacy_hashes()
+if PDF_JOB_WORKERS > 0:
+    pdf_jobs.start()
+
+# Histórico de conversas (JSONL com rotação)
+chat_history = ChatHistory(LOG_FILE, max_bytes=HISTORY_MAX_BYTES,
+                           backup_count=HISTORY_BACKUPS, legacy_path=LEGACY_LOG_FILE)
+
+def chat_documents(data):
+    """
+    PDFs usados na conversa: pdf_context (um hash ou uma lista de hashes)
+    e/ou collection (nome de uma coleção). Levanta KeyError se a coleção
+    não existe.
+    """
+    documents = data.get('pdf_context') or []
+    if isinstance(documents, str):
+        documents = [documents]
+    collection = data.get('collection')
+    if collection:
+        members = pdf_collections.get(collection)
+        if members is None:
+            raise KeyError(collection)
+        documents = documents + members
+    return list(dict.fromkeys(documents))
+
+def history_documents(documents, data):
+    """Campos do histórico sobre os PDFs (pdf_context continua sendo um hash quando há um só PDF)"""
+    fields = {'pdf_context': documents[0] if len(documents) == 1 else ''}
+    if len(documents) > 1:
+        fields['pdf_contexts'] = documents
+    if data.get('collection'):
+        fields['collection'] = data['collection']
+    return fields
+
+def build_prompt(message, documents):
+    """
+    Monta o prompt com os trechos dos PDFs mais relevantes para a pergunta
+    A busca é feita de uma vez sobre todos os PDFs, que dividem o mesmo
+    orçamento de tokens. Retorna (prompt, fontes), onde fontes lista
+    arquivo e página dos trechos usados.
+    """
+    documents = [doc_hash for doc_hash in documents if ensure_indexed(doc_hash)]
+    if documents:
+        chunks = retriever.select_chunks(message, documents, CONTEXT_TOKEN_BUDGET, top_k=RETRIEVAL_TOP_K)
+        if chunks:
+            context, sources = format_context(chunks)
+            label = 'dos PDFs' if len(documents) > 1 else 'do PDF'
+            prompt = (f"Trechos {label}:\n{context}\n\n"
+                      f"Pergunta do usuário: {message}\n\nResponda baseado nos trechos {label} fornecidos.")
+            return prompt, sources
+    return message, []
+
+def cached_response(data, message, model, documents, session_id=None):
+    """
+    Chave do cache de respostas e a resposta guardada para a pergunta
+    Com "cache": false na requisição a resposta guardada é ignorada (e
+    substituída pela nova). No meio de uma conversa a resposta depende das
+    mensagens anteriores e o cache não é usado.
+    """
+    if session_id and conversations.has_history(session_id):
+        return None, None
+    key = response_cache.key(message, model, documents)
+    if data.get('cache', True) is False:
+        response_cache.bypass()
+        return key, None
+    return key, response_cache.get(key)
+
+def chat_session(data):
+    """Sessão da conversa (session_id enviado pelo navegador); sem ela cada mensagem vale sozinha"""
+    session_id = data.get('session_id')
+    return str(session_id)[:100] if session_id else None
+
+def generate_answer(model, prompt, session_id):
+    """Gera a resposta; numa sessão o modelo recebe também o resumo e as últimas trocas (/api/chat)"""
+    if not session_id:
+        return ollama.generate(model, prompt)
+    messages = conversations.messages(session_id) + [{'role': 'user', 'content': prompt}]
+    result = ollama.chat(model, messages)
+    if 'message' in result:
+        result['response'] = result['message'].get('content', '')
+    return result
+
+def stream_chunks(model, prompt, session_id):
+    """Como generate_answer, em streaming"""
+    if not session_id:
+        return ollama.generate_stream(model, prompt)
+    messages = conversations.messages(session_id) + [{'role': 'user', 'content': prompt}]
+    return ollama.chat_stream(model, messages)
+
+def chunk_token(chunk):
+    """Texto de um pedaço do streaming (/api/generate ou /api/chat)"""
+    return chunk.get('response') or chunk.get('message', {}).get('content', '')
+
+def client_id():
+    """Identifica o cliente para o limite de mensagens (endereço IP)"""
+    return request.remote_addr or ''
+
+def admission_error(error):
+    """Resposta para uma requisição recusada pelo controle de admissão"""
+    status = 503 if isinstance(error, QueueTimeout) else 429
+    response = jsonify({'error': str(error), 'retry_after': round(error.retry_after),
+                        'queued': admission.stats()['queued']})
+    response.headers['Retry-After'] = str(max(1, round(error.retry_after)))
+    return response, status
+
+def sse_event(event, data):
+    """Formata um evento Server-Sent Events com dados em JSON"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
 
 def get_available_models():
-    """Obtém lista de modelos disponíveis no Ollama"""
+    """Obtém lista de modelos disponíveis no Ollama (em cache)"""
     try:
-        response = requests.get(f"{OLLAMA_HOST}/api/tags")
-        if response.status_code == 200:
-            models = response.json().get('models', [])
-            return [model['name'] for model in models]
-    except Exception as e:
+        return ollama_cache.get('models', ollama.list_models, ttl=MODELS_CACHE_TTL)
+    except OllamaError as e:
         print(f"Erro ao obter modelos: {e}")
     return []
 
@@ -85,61 +321,196 @@ def chat():
         data = request.get_json()
         message = data.get('message', '').strip()
         model = data.get('model', MODEL_NAME)
-        pdf_context = data.get('pdf_context', '')  # Hash do PDF ativo
         
         if not message:
             return jsonify({'error': 'Mensagem vazia'}), 400
         
-        # Adicionar contexto do PDF se especificado
-        full_prompt = message
-        if pdf_context:
-            context = pdf_processor.get_pdf_context(pdf_context)
-            if context:
-                full_prompt = f"{context}Pergunta do usuário: {message}\n\nResponda baseado no contexto do PDF fornecido."
+        try:
+            documents = chat_documents(data)  # Hashes dos PDFs ativos
+        except KeyError:
+            return jsonify({'error': 'Coleção não encontrada'}), 404
+        session_id = chat_session(data)
         
-        # Preparar requisição para o Ollama
-        payload = {
+        # Pergunta repetida: responder do cache, sem chamar o modelo
+        cache_key, cached = cached_response(data, message, model, documents, session_id)
+        if cached:
+            ai_response, sources = cached['response'], cached['sources']
+        else:
+            # Fazer requisição para o Ollama, esperando a vez na fila
+            try:
+                admission.check_rate(client_id())
+                with admission.slot(client_id()):
+                    prompt, sources = build_prompt(message, documents)
+                    result = generate_answer(model, prompt, session_id)
+            except AdmissionRejected as e:
+                return admission_error(e)
+            ai_response = result.get('response', 'Desculpe, não consegui processar sua mensagem.')
+            if 'response' in result:
+                response_cache.put(cache_key, {'response': ai_response, 'sources': sources})
+        
+        # Salvar no histórico
+        chat_entry = {
+            'timestamp': datetime.now().isoformat(),
+            'user_message': message,
+            'ai_response': ai_response,
             'model': model,
-            'prompt': full_prompt,
-            'stream': False
+            **history_documents(documents, data)
         }
+        if cached:
+            chat_entry['cached'] = True
         
-        # Fazer requisição para o Ollama
-        response = requests.post(
-            f"{OLLAMA_HOST}/api/generate",
-            json=payload,
-            timeout=60
-        )
+        chat_history.append(chat_entry)
+        if session_id:
+            # Na memória vai a pergunta sem os trechos dos PDFs, que são buscados de novo a cada mensagem
+            conversations.append(session_id, message, ai_response, model)
         
-        if response.status_code == 200:
-            result = response.json()
-            ai_response = result.get('response', 'Desculpe, não consegui processar sua mensagem.')
+        return jsonify({
+            'response': ai_response,
+            'model': model,
+            'timestamp': chat_entry['timestamp'],
+            'sources': sources,
+            'cached': bool(cached)
+        })
             
-            # Salvar no histórico
+    except OllamaTimeout:
+        return jsonify({'error': 'Timeout - o modelo demorou muito para responder'}), 408
+    except OllamaUnavailable:
+        return jsonify({'error': 'O modelo de IA está indisponível no momento'}), 503
+    except OllamaError:
+        return jsonify({'error': 'Erro na comunicação com o modelo de IA'}), 500
+    except Exception as e:
+        return jsonify({'error': f'Erro interno: {str(e)}'}), 500
+
+@app.route('/api/chat/stream', methods=['POST'])
+def chat_stream():
+    """Endpoint de chat em streaming (Server-Sent Events)
+
+    Repassa os tokens do Ollama (NDJSON) para o navegador assim que são
+    gerados. Eventos: "token" ({"token"}), "done" ({"model", "timestamp",
+    "stats", "sources", "cached"}), "queue" ({"position"}, enquanto espera
+    a vez na fila) e "error" ({"error"}). Se o cliente desconectar, a
+    conexão com o Ollama é fechada e a geração é cancelada (ou a vaga na
+    fila é liberada); a resposta só entra no histórico (e no cache e na
+    memória da conversa) quando termina por completo. Uma resposta em cache
+    é enviada em um único evento "token". Fila cheia ou limite de
+    mensagens: 429.
+    """
+    data = request.get_json(silent=True) or {}
+    message = data.get('message', '').strip()
+    model = data.get('model', MODEL_NAME)
+
+    if not message:
+        return jsonify({'error': 'Mensagem vazia'}), 400
+
+    try:
+        documents = chat_documents(data)
+    except KeyError:
+        return jsonify({'error': 'Coleção não encontrada'}), 404
+    session_id = chat_session(data)
+
+    cache_key, cached = cached_response(data, message, model, documents, session_id)
+    if cached:
+        def replay():
             chat_entry = {
                 'timestamp': datetime.now().isoformat(),
                 'user_message': message,
-                'ai_response': ai_response,
+                'ai_response': cached['response'],
                 'model': model,
-                'pdf_context': pdf_context
+                **history_documents(documents, data),
+                'cached': True
             }
-            
-            history = load_chat_history()
-            history.append(chat_entry)
-            save_chat_history(history)
-            
-            return jsonify({
-                'response': ai_response,
-                'model': model,
-                'timestamp': chat_entry['timestamp']
-            })
-        else:
-            return jsonify({'error': 'Erro na comunicação com o modelo de IA'}), 500
-            
-    except requests.exceptions.Timeout:
-        return jsonify({'error': 'Timeout - o modelo demorou muito para responder'}), 408
-    except Exception as e:
-        return jsonify({'error': f'Erro interno: {str(e)}'}), 500
+            chat_history.append(chat_entry)
+            if session_id:
+                conversations.append(session_id, message, cached['response'], model)
+            yield sse_event('token', {'token': cached['response']})
+            yield sse_event('done', {'model': model, 'timestamp': chat_entry['timestamp'], 'stats': {},
+                                     'sources': cached['sources'], 'cached': True})
+
+        return Response(replay(), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache'})
+
+    try:
+        admission.check_rate(client_id())
+        ticket = admission.enter(client_id())
+    except AdmissionRejected as e:
+        return admission_error(e)
+
+    def generate():
+        try:
+            # Esperar a vez avisando a posição na fila
+            while not admission.wait(ticket, 0):
+                if admission.expired(ticket):
+                    admission.release(ticket, timed_out=True)
+                    yield sse_event('error', {'error': 'Servidor ocupado, tente novamente em instantes'})
+                    return
+                yield sse_event('queue', {'position': admission.position(ticket)})
+                admission.wait(ticket, QUEUE_UPDATE_INTERVAL)
+            yield from stream_answer()
+        finally:
+            admission.release(ticket)
+
+    def stream_answer():
+        chunks = None
+        tokens = []
+        try:
+            # Montar o prompt pode chamar o Ollama (embeddings): erros aqui
+            # também viram um evento "error"
+            prompt, sources = build_prompt(message, documents)
+            chunks = stream_chunks(model, prompt, session_id)
+            for chunk in chunks:
+                if chunk.get('error'):
+                    yield sse_event('error', {'error': chunk['error']})
+                    return
+
+                token = chunk_token(chunk)
+                if token:
+                    tokens.append(token)
+                    yield sse_event('token', {'token': token})
+
+                if chunk.get('done'):
+                    chat_entry = {
+                        'timestamp': datetime.now().isoformat(),
+                        'user_message': message,
+                        'ai_response': ''.join(tokens),
+                        'model': model,
+                        **history_documents(documents, data)
+                    }
+                    chat_history.append(chat_entry)
+                    response_cache.put(cache_key, {'response': chat_entry['ai_response'], 'sources': sources})
+                    if session_id:
+                        conversations.append(session_id, message, chat_entry['ai_response'], model)
+                    stats = {key: chunk[key] for key in ('total_duration', 'load_duration', 'eval_count', 'eval_duration')
+                             if key in chunk}
+                    yield sse_event('done', {'model': model, 'timestamp': chat_entry['timestamp'],
+                                            'stats': stats, 'sources': sources, 'cached': False})
+                    return
+
+            yield sse_event('error', {'error': 'O modelo encerrou a resposta antes do fim'})
+        except OllamaTimeout:
+            yield sse_event('error', {'error': 'Timeout - o modelo demorou muito para responder'})
+        except OllamaUnavailable:
+            yield sse_event('error', {'error': 'O modelo de IA está indisponível no momento'})
+        except (OllamaError, ValueError) as e:
+            yield sse_event('error', {'error': f'Erro na comunicação com o modelo de IA: {str(e)}'})
+        except Exception as e:
+            yield sse_event('error', {'error': f'Erro interno: {str(e)}'})
+        finally:
+            # Executado também quando o cliente desconecta (GeneratorExit):
+            # fechar a conexão faz o Ollama parar de gerar
+            if chunks is not None:
+                chunks.close()
+
+    response = Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'  # Desativa o buffer de proxies como o nginx
+        }
+    )
+    # Se o cliente desconectar antes de o streaming começar, o gerador não
+    # chega a rodar: a vaga é liberada quando a resposta é fechada
+    response.call_on_close(lambda: admission.release(ticket))
+    return response
 
 @app.route('/api/upload-pdf', methods=['POST'])
 def upload_pdf():
@@ -155,36 +526,47 @@ def upload_pdf():
         if not allowed_file(file.filename):
             return jsonify({'error': 'Apenas arquivos PDF são permitidos'}), 400
         
-        # Salvar arquivo
+        # Gravar com um nome temporário calculando o hash durante a gravação
         filename = secure_filename(file.filename)
-        file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        file.save(file_path)
+        upload_folder = app.config['UPLOAD_FOLDER']
+        temp_path = os.path.join(upload_folder, f".upload-{uuid.uuid4().hex}.pdf")
+        file_hash = save_and_hash(file.stream, temp_path)
+        
+        # PDF já processado: responder na hora
+        cached = pdf_processor.cache.get(file_hash)
+        if cached and os.path.exists(cached['file_path']):
+            os.remove(temp_path)
+            return jsonify({
+                'message': f'PDF "{filename}" já foi processado',
+                'pdf': pdf_summary(cached)
+            })
         
-        # Processar PDF
-        result = pdf_processor.extract_text_from_pdf(file_path)
+        # Arquivo guardado pelo hash do conteúdo: nomes iguais não se
+        # sobrescrevem e o mesmo conteúdo nunca é guardado duas vezes
+        file_path = os.path.join(upload_folder, f"{file_hash}.pdf")
         
-        if 'error' in result:
-            # Remover arquivo se houver erro
-            if os.path.exists(file_path):
-                os.remove(file_path)
-            return jsonify({'error': result['error']}), 500
+        # O arquivo vai para o lugar antes de entrar na fila: um worker pode
+        # pegar a tarefa assim que ela é criada. Se o mesmo conteúdo já está
+        # lá (tarefa existente), a troca (atômica) mantém os mesmos bytes
+        os.replace(temp_path, file_path)
+        job, _ = pdf_jobs.submit(file_hash, filename, file_path)
         
         return jsonify({
-            'message': f'PDF "{filename}" processado com sucesso!',
-            'pdf': {
-                'hash': result['file_hash'],
-                'name': result['file_name'],
-                'size': result['file_size'],
-                'pages': result['pages'],
-                'text_length': result['text_length'],
-                'title': result['title'],
-                'author': result['author']
-            }
-        })
+            'message': f'PDF "{filename}" recebido, processando...',
+            'job': job
+        }), 202
         
     except Exception as e:
         return jsonify({'error': f'Erro ao processar PDF: {str(e)}'}), 500
 
+@app.route('/api/jobs/<job_id>')
+def get_job(job_id):
+    """Endpoint para acompanhar o processamento de um PDF"""
+    job = pdf_jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Tarefa não encontrada'}), 404
+    return jsonify({'job': job})
+
 @app.route('/api/pdfs')
 def list_pdfs():
     """Endpoint para listar PDFs processados"""
@@ -200,6 +582,9 @@ def delete_pdf(file_hash):
     try:
         success = pdf_processor.delete_pdf(file_hash)
         if success:
+            pdf_jobs.forget(file_hash)
+            retriever.remove_document(file_hash)
+            pdf_collections.remove_document(file_hash)
             return jsonify({'message': 'PDF removido com sucesso'})
         else:
             return jsonify({'error': 'PDF não encontrado'}), 404
@@ -218,6 +603,36 @@ def get_pdf_context(file_hash):
     except Exception as e:
         return jsonify({'error': f'Erro ao obter contexto: {str(e)}'}), 500
 
+@app.route('/api/collections')
+def list_collections():
+    """Endpoint para listar as coleções de PDFs"""
+    return jsonify({'collections': pdf_collections.all()})
+
+@app.route('/api/collections/<name>', methods=['PUT'])
+def save_collection(name):
+    """Endpoint para criar ou alterar uma coleção ({"documents": [hashes]})"""
+    data = request.get_json(silent=True) or {}
+    documents = data.get('documents')
+    if not isinstance(documents, list) or not documents:
+        return jsonify({'error': 'Informe a lista de PDFs da coleção'}), 400
+    unknown = [doc_hash for doc_hash in documents if doc_hash not in pdf_processor.cache]
+    if unknown:
+        return jsonify({'error': 'PDF não encontrado', 'documents': unknown}), 404
+    return jsonify({'collection': pdf_collections.save(name, documents)})
+
+@app.route('/api/collections/<name>', methods=['DELETE'])
+def delete_collection(name):
+    """Endpoint para remover uma coleção (os PDFs continuam)"""
+    if not pdf_collections.delete(name):
+        return jsonify({'error': 'Coleção não encontrada'}), 404
+    return jsonify({'message': 'Coleção removida com sucesso'})
+
+@app.route('/api/conversations/<session_id>', methods=['DELETE'])
+def forget_conversation(session_id):
+    """Endpoint para esquecer a memória de uma conversa (o histórico continua)"""
+    conversations.clear(session_id)
+    return jsonify({'message': 'Conversa esquecida'})
+
 @app.route('/api/models')
 def models():
     """Endpoint para listar modelos disponíveis"""
@@ -226,26 +641,70 @@ def models():
 
 @app.route('/api/history')
 def history():
-    """Endpoint para obter histórico de conversas"""
-    history = load_chat_history()
-    return jsonify({'history': history})
+    """Endpoint para obter histórico de conversas (paginado, mais recentes primeiro)
+
+    Parâmetros: limit, offset, model, pdf (hash do PDF), q (busca no texto)
+    e since (data ISO). A resposta traz next_offset para a próxima página.
+    """
+    try:
+        limit = min(int(request.args.get('limit', HISTORY_PAGE_SIZE)), HISTORY_MAX_PAGE_SIZE)
+        offset = int(request.args.get('offset', 0))
+        since = request.args.get('since')
+        since = datetime.fromisoformat(since) if since else None
+    except ValueError:
+        return jsonify({'error': 'Parâmetros inválidos'}), 400
+    if limit < 1 or offset < 0:
+        return jsonify({'error': 'Parâmetros inválidos'}), 400
+
+    page = chat_history.page(
+        limit=limit,
+        offset=offset,
+        model=request.args.get('model'),
+        pdf_context=request.args.get('pdf'),
+        query=request.args.get('q'),
+        since=since
+    )
+    return jsonify(page)
+
+@app.route('/api/history/export')
+def export_history():
+    """Endpoint para exportar o histórico completo em texto (gerado aos poucos)"""
+    def generate():
+        for entry in chat_history.entries(newest_first=False):
+            try:
+                timestamp = datetime.fromisoformat(entry['timestamp']).strftime('%d/%m/%Y %H:%M:%S')
+            except (KeyError, ValueError):
+                timestamp = entry.get('timestamp', '')
+            yield (f"[{timestamp}] Usuário: {entry.get('user_message', '')}\n"
+                   f"[{timestamp}] IA: {entry.get('ai_response', '')}\n\n")
+
+    filename = f"chat_history_{datetime.now().strftime('%Y-%m-%d')}.txt"
+    return Response(
+        generate(),
+        mimetype='text/plain',
+        headers={'Content-Disposition': f'attachment; filename={filename}'}
+    )
 
 @app.route('/api/health')
 def health():
     """Endpoint de saúde do sistema"""
-    try:
-        # Verificar se o Ollama está respondendo
-        response = requests.get(f"{OLLAMA_HOST}/api/tags", timeout=5)
-        ollama_status = response.status_code == 200
-    except:
-        ollama_status = False
+    # Verificar se o Ollama está respondendo (em cache; com o circuito
+    # aberto a verificação é imediata)
+    ollama_status = ollama_cache.get('health', ollama.is_healthy, ttl=HEALTH_CACHE_TTL)
     
     return jsonify({
         'status': 'healthy',
         'ollama': 'connected' if ollama_status else 'disconnected',
+        'circuit': ollama.breaker.state,
         'timestamp': datetime.now().isoformat()
     })
 
+@app.route('/api/cache/stats')
+def cache_stats():
+    """Endpoint com os contadores de acerto/erro dos caches"""
+    return jsonify({'ollama': ollama_cache.stats(), 'responses': response_cache.stats(),
+                    'admission': admission.stats(), 'conversations': conversations.stats()})
+
 @app.route('/api/download-model', methods=['POST'])
 def download_model():
     """Endpoint para baixar um modelo"""
@@ -254,18 +713,14 @@ def download_model():
         model_name = data.get('model', MODEL_NAME)
         
         # Requisição para baixar modelo
-        payload = {'name': model_name}
-        response = requests.post(
-            f"{OLLAMA_HOST}/api/pull",
-            json=payload,
-            timeout=300  # 5 minutos para download
-        )
-        
-        if response.status_code == 200:
-            return jsonify({'message': f'Modelo {model_name} baixado com sucesso!'})
-        else:
-            return jsonify({'error': 'Erro ao baixar modelo'}), 500
+        ollama.pull(model_name)
+        ollama_cache.invalidate('models')
+        # O modelo pode ter mudado: as respostas guardadas deixam de valer
+        response_cache.clear()
+        return jsonify({'message': f'Modelo {model_name} baixado com sucesso!'})
             
+    except OllamaError:
+        return jsonify({'error': 'Erro ao baixar modelo'}), 500
     except Exception as e:
         return jsonify({'error': f'Erro interno: {str(e)}'}), 500
 
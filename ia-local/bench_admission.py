@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Benchmark do controle de admissão
+Simula um Ollama em CPU: cada geração precisa de um tempo fixo de
+processamento, dividido igualmente entre as gerações ao mesmo tempo, e é
+cancelada se passar do timeout. Vários alunos mandam mensagens juntos;
+sem controle todas rodam ao mesmo tempo, com controle só uma por vez e as
+outras esperam na fila. Mostra quantas respostas chegaram, a latência e o
+número de respostas por segundo. Tempos em escala: 0,1 s de geração e 1 s
+de timeout equivalem a ~6 s e 60 s de um modelo em CPU.
+Uso: python bench_admission.py [alunos, separados por vírgula] [segundos por geração] [timeout]
+"""
+
+import sys
+import time
+import threading
+from admission import AdmissionController
+
+
+class SharedCPU:
+    """Processador dividido igualmente entre as gerações em andamento"""
+
+    def __init__(self, work: float, timeout: float):
+        self.work = work
+        self.timeout = timeout
+        self.active = 0
+        self.lock = threading.Lock()
+
+    def generate(self) -> bool:
+        with self.lock:
+            self.active += 1
+        start = time.perf_counter()
+        done, step = 0.0, self.work / 50
+        try:
+            while done < self.work:
+                if time.perf_counter() - start > self.timeout:
+                    return False
+                time.sleep(step)
+                with self.lock:
+                    done += step / self.active
+            return True
+        finally:
+            with self.lock:
+                self.active -= 1
+
+
+def run(students: int, work: float, timeout: float, controller=None):
+    cpu = SharedCPU(work, timeout)
+    latencies, failures = [], [0]
+    lock = threading.Lock()
+
+    def student():
+        start = time.perf_counter()
+        if controller:
+            with controller.slot():
+                ok = cpu.generate()
+        else:
+            ok = cpu.generate()
+        with lock:
+            if ok:
+                latencies.append(time.perf_counter() - start)
+            else:
+                failures[0] += 1
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=student) for _ in range(students)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    average = sum(latencies) / len(latencies) if latencies else 0
+    return len(latencies), failures[0], average, len(latencies) / elapsed
+
+
+def main():
+    sizes = [int(size) for size in sys.argv[1].split(',')] if len(sys.argv) > 1 else [5, 10, 20, 40]
+    work = float(sys.argv[2]) if len(sys.argv) > 2 else 0.1
+    timeout = float(sys.argv[3]) if len(sys.argv) > 3 else 1.0
+
+    print(f"Geração de {work}s, timeout de {timeout}s\n")
+    print(f"{'alunos':>7} {'controle':>9} {'respostas':>10} {'timeouts':>9} {'latência (s)':>13} {'resp/s':>7}")
+    for students in sizes:
+        for name, controller in (('não', None),
+                                 ('sim', AdmissionController(max_concurrent=1, max_queue=students,
+                                                             queue_timeout=600, rate_limit=0))):
+            answered, failed, latency, rate = run(students, work, timeout, controller)
+            print(f"{students:>7} {name:>9} {answered:>10} {failed:>9} {latency:>13.2f} {rate:>7.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Benchmark da memória das conversas
+Simula uma conversa longa e mostra quantos tokens (estimados) de histórico
+vão para o modelo a cada pergunta: reenviando a conversa inteira ou com a
+janela por orçamento de tokens e o resumo das trocas antigas. Em CPU o
+tempo de leitura do prompt cresce junto com esses tokens.
+Uso: python bench_conversation.py [trocas] [orçamento de tokens]
+"""
+
+import sys
+import time
+from conversation import ConversationStore
+from retrieval import estimate_tokens
+
+QUESTION = "Como configuro o roteador {i} da rede comunitária para repassar o tráfego dos vizinhos?"
+ANSWER = ("Acesse a interface do OpenWrt, crie uma interface mesh no rádio de 5 GHz, "
+          "ative o protocolo de roteamento e confira se os vizinhos aparecem na tabela. ") * 3
+
+
+def main():
+    turns = int(sys.argv[1]) if len(sys.argv) > 1 else 40
+    budget = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    store = ConversationStore(token_budget=budget)
+    everything = []
+
+    print(f"{'pergunta':>9} {'tudo (tokens)':>14} {'janela (tokens)':>16}")
+    elapsed = 0.0
+    for i in range(1, turns + 1):
+        question = QUESTION.format(i=i)
+        full = sum(estimate_tokens(text) for text in everything) + estimate_tokens(question)
+        start = time.perf_counter()
+        windowed = sum(estimate_tokens(m['content']) for m in store.messages('aluno')) + estimate_tokens(question)
+        store.append('aluno', question, ANSWER)
+        elapsed += time.perf_counter() - start
+        everything += [question, ANSWER]
+        if i == 1 or i % 10 == 0:
+            print(f"{i:>9} {full:>14} {windowed:>16}")
+    print(f"\nMontar a janela e guardar a troca: {elapsed / turns * 1000:.3f} ms por pergunta")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Benchmark do histórico de conversas
+Compara o formato antigo (ler e reescrever todo o chat_history.json a cada
+mensagem) com o ChatHistory em JSONL, medindo o tempo de salvar uma conversa
+e de ler a primeira página com quantidades crescentes de conversas.
+No JSONL os tempos devem ficar estáveis.
+Uso: python bench_history.py [quantidades separadas por vírgula] [repetições]
+"""
+
+import os
+import sys
+import json
+import shutil
+import tempfile
+import time
+from datetime import datetime, timedelta
+from chat_history import ChatHistory
+
+# Acima disso o formato antigo fica lento demais para repetir várias vezes
+LEGACY_LIMIT = 100000
+
+
+def make_entry(i):
+    return {
+        'timestamp': (datetime(2025, 1, 1) + timedelta(seconds=i)).isoformat(),
+        'user_message': f'Pergunta número {i} sobre o documento',
+        'ai_response': 'Resposta do modelo ' * 20,
+        'model': 'llama2',
+        'pdf_context': ''
+    }
+
+
+def best_of(repeat, func):
+    """Melhor tempo (em ms) entre as repetições"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def bench_legacy(folder, total, repeat):
+    path = os.path.join(folder, 'chat_history.json')
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump([make_entry(i) for i in range(total)], f, ensure_ascii=False, indent=2)
+
+    def append():
+        with open(path, 'r', encoding='utf-8') as f:
+            history = json.load(f)
+        history.append(make_entry(total))
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(history, f, ensure_ascii=False, indent=2)
+
+    def first_page():
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)[-50:]
+
+    return best_of(repeat, append), best_of(repeat, first_page)
+
+
+def bench_jsonl(folder, total, repeat):
+    path = os.path.join(folder, 'chat_history.jsonl')
+    # Sem rotação, para medir o pior caso de um arquivo único grande
+    store = ChatHistory(path, max_bytes=2 ** 40)
+    with open(path, 'w', encoding='utf-8') as f:
+        for i in range(total):
+            f.write(json.dumps(make_entry(i), ensure_ascii=False) + '\n')
+
+    append = best_of(repeat, lambda: store.append(make_entry(total)))
+    first_page = best_of(repeat, lambda: store.page(limit=50))
+    filtered = best_of(repeat, lambda: store.page(limit=50, query=f'número {total // 2} '))
+    return append, first_page, filtered
+
+
+def main():
+    totals = [int(n) for n in sys.argv[1].split(',')] if len(sys.argv) > 1 else [1000, 10000, 100000]
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    print(f"Tempo (ms), melhor de {repeat} execuções\n")
+    print(f"{'conversas':>10} {'json salvar':>12} {'json página':>12} "
+          f"{'jsonl salvar':>13} {'jsonl página':>13} {'jsonl busca':>12}")
+    for total in totals:
+        folder = tempfile.mkdtemp()
+        try:
+            if total <= LEGACY_LIMIT:
+                legacy = bench_legacy(folder, total, repeat)
+            else:
+                legacy = (float('nan'), float('nan'))
+            append, first_page, filtered = bench_jsonl(folder, total, repeat)
+        finally:
+            shutil.rmtree(folder)
+        print(f"{total:>10} {legacy[0]:>12.2f} {legacy[1]:>12.2f} "
+              f"{append:>13.3f} {first_page:>13.3f} {filtered:>12.1f}")
+
+
+if __name__ == '__main__':
+    main()
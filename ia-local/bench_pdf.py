@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Benchmark da extração de texto dos PDFs
+Gera (com o reportlab) um conjunto de PDFs de texto, escaneados (páginas só
+com imagem) e mistos, e compara a extração antiga (metadados, detecção e
+extração abrindo o arquivo de novo a cada etapa) com a leitura única do
+PDFProcessor. Mostra também quantas páginas cada uma mandaria para o OCR.
+O OCR em si não é medido (depende do Tesseract), só a leitura dos PDFs.
+Uso: python bench_pdf.py [páginas por PDF] [repetições]
+"""
+
+import os
+import sys
+import shutil
+import tempfile
+import time
+import PyPDF2
+import pdfplumber
+from PIL import Image, ImageDraw
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfgen import canvas
+from pdf_processor import PDFProcessor
+
+LINE = 'A rede comunitária conecta as casas do assentamento à internet e ao servidor local.'
+
+
+def make_pdf(path, page_kinds, title='Documento de teste'):
+    """Cria um PDF com uma página por item de page_kinds: 'text', 'image' ou 'blank'"""
+    width, height = A4
+    pdf = canvas.Canvas(path, pagesize=A4)
+    pdf.setTitle(title)
+    pdf.setAuthor('Rede Comunitária')
+    for number, kind in enumerate(page_kinds, 1):
+        if kind == 'text':
+            for i in range(40):
+                pdf.drawString(40, height - 40 - i * 18, f'{number}.{i} {LINE}')
+        elif kind == 'image':
+            # Página "escaneada": o texto só existe dentro de uma imagem
+            image = Image.new('L', (1240, 1754), 255)
+            draw = ImageDraw.Draw(image)
+            for i in range(40):
+                draw.text((60, 60 + i * 40), f'{number}.{i} {LINE}', fill=0)
+            pdf.drawImage(ImageReader(image), 0, 0, width, height)
+        pdf.showPage()
+    pdf.save()
+
+
+def legacy_extract(file_path):
+    """Fluxo antigo, sem o OCR: retorna as páginas que iriam para o OCR"""
+    def extract_normal():
+        text = ''
+        with open(file_path, 'rb') as file:
+            for page in PyPDF2.PdfReader(file).pages:
+                text += (page.extract_text() or '') + '\n'
+        if not text.strip():
+            with pdfplumber.open(file_path) as pdf:
+                for page in pdf.pages:
+                    text += (page.extract_text() or '') + '\n'
+        return text
+
+    with open(file_path, 'rb') as file:
+        reader = PyPDF2.PdfReader(file)
+        pages = len(reader.pages)
+        reader.metadata
+    is_image_based = len(extract_normal().strip()) < 100
+    if is_image_based:
+        return min(pages, 10)  # O OCR antigo parava em 10 páginas
+    extract_normal()
+    return 0
+
+
+def build_corpus(folder, pages):
+    half = pages // 2
+    corpus = {
+        'texto': ['text'] * pages,
+        'escaneado': ['image'] * pages,
+        'misto': ['text'] * half + ['image'] * (pages - half)
+    }
+    paths = {}
+    for name, kinds in corpus.items():
+        paths[name] = os.path.join(folder, f'{name}.pdf')
+        make_pdf(paths[name], kinds)
+    return paths
+
+
+def best_of(repeat, func):
+    """Melhor tempo (em ms) entre as repetições e o resultado da última"""
+    best, result = float('inf'), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, result
+
+
+def main():
+    pages = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+
+    folder = tempfile.mkdtemp()
+    try:
+        corpus = build_corpus(folder, pages)
+        processor = PDFProcessor(upload_dir=folder, cache_dir=os.path.join(folder, 'cache'), enable_ocr=False)
+
+        print(f"PDFs de {pages} páginas, melhor de {repeat} execuções\n")
+        print(f"{'PDF':>10} {'antigo (ms)':>12} {'OCR antigo':>11} {'novo (ms)':>10} {'OCR novo':>9}")
+        for name, path in corpus.items():
+            legacy_ms, legacy_ocr = best_of(repeat, lambda: legacy_extract(path))
+            new_ms, document = best_of(repeat, lambda: processor._read_pdf(path))
+            new_ocr = sum(1 for page in document['pages'] if page['needs_ocr'])
+            print(f"{name:>10} {legacy_ms:>12.1f} {legacy_ocr:>11} {new_ms:>10.1f} {new_ocr:>9}")
+    finally:
+        shutil.rmtree(folder)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Benchmark do cache de PDFs processados
+Compara o pdf_cache.json antigo (um dicionário com o texto de todos os PDFs,
+regravado inteiro a cada upload) com o PDFStore (SQLite, metadados separados
+do texto): tempo para abrir o cache, listar os PDFs, gravar mais um upload e
+ler o texto de um documento, com bibliotecas cada vez maiores.
+Uso: python bench_pdf_store.py [tamanhos, separados por vírgula] [kB de texto por PDF]
+"""
+
+import os
+import sys
+import json
+import shutil
+import tempfile
+import time
+from pdf_store import PDFStore
+
+
+def make_document(number, text_kb):
+    text = (f'Página da apostila {number} sobre redes comunitárias. ' * 20 + '\n') * (text_kb * 1024 // 1100 + 1)
+    return {
+        'file_hash': f'{number:032x}',
+        'file_path': f'/uploads/apostila-{number}.pdf',
+        'file_name': f'apostila-{number}.pdf',
+        'file_size': 250000,
+        'text': text,
+        'text_length': len(text),
+        'pages': 20,
+        'page_offsets': list(range(0, len(text), max(1, len(text) // 20))),
+        'title': f'Apostila {number}',
+        'author': 'Rede Comunitária',
+        'processed_at': f'2024-01-01T10:{number // 60 % 60:02d}:{number % 60:02d}'
+    }
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return (time.perf_counter() - start) * 1000, result
+
+
+def bench_legacy(folder, documents, extra):
+    path = os.path.join(folder, 'pdf_cache.json')
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({doc['file_hash']: doc for doc in documents}, f, ensure_ascii=False, indent=2)
+
+    def load():
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    open_ms, cache = timed(load)
+    list_ms, _ = timed(lambda: sorted(({'name': data['file_name']} for data in cache.values()),
+                                      key=lambda pdf: pdf['name']))
+
+    def save():
+        cache[extra['file_hash']] = extra
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(cache, f, ensure_ascii=False, indent=2)
+
+    save_ms, _ = timed(save)
+    text_ms, _ = timed(lambda: cache[documents[0]['file_hash']]['text'])
+    return open_ms, list_ms, save_ms, text_ms
+
+
+def bench_store(folder, documents, extra):
+    path = os.path.join(folder, 'pdfs.db')
+    store = PDFStore(path)
+    for doc in documents:
+        store.put(doc['file_hash'], doc)
+
+    open_ms, store = timed(lambda: PDFStore(path))
+    list_ms, _ = timed(store.all)
+    save_ms, _ = timed(lambda: store.put(extra['file_hash'], extra))
+    text_ms, _ = timed(lambda: store.load(documents[0]['file_hash'])['text'])
+    return open_ms, list_ms, save_ms, text_ms
+
+
+def main():
+    sizes = [int(size) for size in sys.argv[1].split(',')] if len(sys.argv) > 1 else [10, 100, 1000]
+    text_kb = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+
+    print(f"{text_kb} kB de texto por PDF, tempos em ms\n")
+    print(f"{'PDFs':>6} {'formato':>8} {'abrir':>9} {'listar':>9} {'upload':>9} {'texto':>9}")
+    for size in sizes:
+        documents = [make_document(number, text_kb) for number in range(size)]
+        extra = make_document(size, text_kb)
+        for name, bench in (('json', bench_legacy), ('sqlite', bench_store)):
+            folder = tempfile.mkdtemp()
+            try:
+                times = bench(folder, documents, extra)
+            finally:
+                shutil.rmtree(folder)
+            print(f"{size:>6} {name:>8} " + ' '.join(f"{ms:>9.1f}" for ms in times))
+
+
+if __name__ == '__main__':
+    main()
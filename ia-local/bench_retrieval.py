@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Benchmark da busca de trechos dos PDFs
+Gera documentos sintéticos com um assunto diferente por página e, para
+perguntas sobre cada assunto, compara o contexto antigo (os primeiros 2000
+caracteres do documento) com os trechos escolhidos pelo Retriever: em
+quantas perguntas o trecho com a resposta chegou ao prompt (recall) e
+quantos tokens foram usados. Mede também o tempo de indexação e de busca
+para documentos cada vez maiores.
+Uso: python bench_retrieval.py [páginas, separadas por vírgula] [orçamento de tokens]
+"""
+
+import sys
+import shutil
+import tempfile
+import time
+from retrieval import Retriever, estimate_tokens
+
+SUBJECTS = ['antena', 'roteador', 'servidor', 'backup', 'energia', 'cabo', 'firewall', 'senha',
+            'horta', 'biblioteca', 'oficina', 'assembleia', 'mapa', 'radio', 'camera', 'bateria']
+FILLER = ('A rede comunitária conecta as casas do assentamento e o trabalho coletivo '
+          'mantém os equipamentos funcionando ao longo do ano')
+
+
+def build_document(pages):
+    """Texto com um assunto (e um código único) por página e as perguntas sobre eles"""
+    text, offsets, questions = '', [], []
+    for page in range(1, pages + 1):
+        subject = f"{SUBJECTS[page % len(SUBJECTS)]}{page}"
+        answer = f"o código do {subject} é {page * 7919}"
+        offsets.append(len(text))
+        text += f"{FILLER}. {FILLER}. Sobre {subject}: {answer}. {FILLER}.\n"
+        questions.append((f"Qual é o código do {subject}?", answer))
+    return text, offsets, questions
+
+
+def main():
+    sizes = [int(size) for size in sys.argv[1].split(',')] if len(sys.argv) > 1 else [50, 200, 1000]
+    budget = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+
+    print(f"Orçamento de contexto: {budget} tokens\n")
+    print(f"{'páginas':>8} {'recall antigo':>14} {'recall novo':>12} {'tokens':>7} "
+          f"{'indexar (ms)':>13} {'busca (ms)':>11}")
+    for pages in sizes:
+        folder = tempfile.mkdtemp()
+        try:
+            text, offsets, questions = build_document(pages)
+            retriever = Retriever(index_dir=folder)
+
+            start = time.perf_counter()
+            retriever.add_document('doc', 'documento.pdf', text, offsets)
+            index_ms = (time.perf_counter() - start) * 1000
+
+            legacy_context = text[:2000]
+            legacy_hits = sum(1 for question, answer in questions if answer in legacy_context)
+
+            hits, tokens = 0, 0
+            start = time.perf_counter()
+            for question, answer in questions:
+                chunks = retriever.select_chunks(question, ['doc'], budget)
+                hits += any(answer in chunk['text'] for chunk in chunks)
+                tokens += sum(estimate_tokens(chunk['text']) for chunk in chunks)
+            query_ms = (time.perf_counter() - start) * 1000 / len(questions)
+
+            print(f"{pages:>8} {legacy_hits / len(questions):>14.0%} {hits / len(questions):>12.0%} "
+                  f"{tokens // len(questions):>7} {index_ms:>13.1f} {query_ms:>11.2f}")
+        finally:
+            shutil.rmtree(folder)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Benchmark do hash dos PDFs enviados
+Compara o fluxo antigo do upload (gravar o arquivo e depois lê-lo de novo
+calculando MD5 em blocos de 4 KiB) com o atual (BLAKE2b calculado durante a
+gravação, em blocos de 1 MiB), para arquivos de alguns tamanhos.
+Uso: python bench_upload_hash.py [tamanhos em MB, separados por vírgula] [repetições]
+"""
+
+import io
+import os
+import sys
+import shutil
+import hashlib
+import tempfile
+import time
+from pdf_processor import save_and_hash
+
+
+def legacy_upload(stream, path):
+    with open(path, 'wb') as f:
+        shutil.copyfileobj(stream, f)  # FileStorage.save()
+    hash_md5 = hashlib.md5()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(4096), b''):
+            hash_md5.update(chunk)
+    return hash_md5.hexdigest()
+
+
+def best_of(repeat, func):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    sizes = [int(size) for size in sys.argv[1].split(',')] if len(sys.argv) > 1 else [1, 4, 16]
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    folder = tempfile.mkdtemp()
+    try:
+        path = os.path.join(folder, 'upload.pdf')
+        print(f"Melhor de {repeat} execuções, tempos em ms\n")
+        print(f"{'MB':>4} {'antigo (MD5)':>13} {'novo (BLAKE2b)':>15}")
+        for size in sizes:
+            content = os.urandom(size * 1024 * 1024)
+            legacy_ms = best_of(repeat, lambda: legacy_upload(io.BytesIO(content), path))
+            new_ms = best_of(repeat, lambda: save_and_hash(io.BytesIO(content), path))
+            print(f"{size:>4} {legacy_ms:>13.1f} {new_ms:>15.1f}")
+    finally:
+        shutil.rmtree(folder)
+
+
+if __name__ == '__main__':
+    main()
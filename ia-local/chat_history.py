@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Histórico de conversas do Chatbot de IA Local
+Armazena as conversas em JSONL (uma por linha), só acrescentando ao fim do
+arquivo, com rotação por tamanho e lock entre threads e processos.
+Salvar uma conversa não depende do tamanho do histórico, e a leitura
+paginada percorre o arquivo de trás para frente, sem carregá-lo inteiro.
+"""
+
+import os
+import json
+import threading
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: só o lock entre threads
+    fcntl = None
+
+READ_BLOCK_SIZE = 64 * 1024
+
+
+def _reverse_lines(path: str) -> Iterator[bytes]:
+    """Lê as linhas de um arquivo da última para a primeira, em blocos"""
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        position = f.tell()
+        remainder = b''
+        while position > 0:
+            size = min(READ_BLOCK_SIZE, position)
+            position -= size
+            f.seek(position)
+            lines = (f.read(size) + remainder).split(b'\n')
+            # A primeira linha do bloco pode estar incompleta
+            remainder = lines.pop(0)
+            for line in reversed(lines):
+                if line.strip():
+                    yield line
+        if remainder.strip():
+            yield remainder
+
+
+def _forward_lines(path: str) -> Iterator[bytes]:
+    with open(path, 'rb') as f:
+        for line in f:
+            if line.strip():
+                yield line
+
+
+class ChatHistory:
+    def __init__(self, path: str = 'logs/chat_history.jsonl', max_bytes: int = 10 * 1024 * 1024,
+                 backup_count: int = 5, legacy_path: Optional[str] = None):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.lock_path = path + '.lock'
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+
+        if legacy_path and os.path.exists(legacy_path) and not os.path.exists(path):
+            self._migrate_legacy(legacy_path)
+
+    def _lock_file(self):
+        """Lock exclusivo entre processos (vários workers do servidor)"""
+        handle = open(self.lock_path, 'a')
+        if fcntl is not None:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+        return handle
+
+    def _migrate_legacy(self, legacy_path: str):
+        """Converte o chat_history.json antigo (lista JSON) para JSONL"""
+        try:
+            with open(legacy_path, 'r', encoding='utf-8') as f:
+                entries = json.load(f)
+        except Exception as e:
+            print(f"Erro ao migrar histórico antigo: {e}")
+            return
+
+        with self._lock:
+            handle = self._lock_file()
+            try:
+                if os.path.exists(self.path):
+                    return
+                temp_path = self.path + '.tmp'
+                with open(temp_path, 'w', encoding='utf-8') as f:
+                    for entry in entries:
+                        f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+                os.replace(temp_path, self.path)
+                os.replace(legacy_path, legacy_path + '.migrated')
+            finally:
+                handle.close()
+
+    def files(self) -> List[str]:
+        """Arquivos do histórico, do mais novo para o mais antigo"""
+        paths = [self.path] + [f"{self.path}.{i}" for i in range(1, self.backup_count + 1)]
+        return [path for path in paths if os.path.exists(path)]
+
+    def _rotate(self):
+        """Renomeia chat_history.jsonl -> .1 -> .2 ... descartando o mais antigo"""
+        oldest = f"{self.path}.{self.backup_count}"
+        if os.path.exists(oldest):
+            os.remove(oldest)
+        for i in range(self.backup_count - 1, 0, -1):
+            source = f"{self.path}.{i}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{i + 1}")
+        if self.backup_count > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+
+    def append(self, entry: Dict):
+        """Acrescenta uma conversa ao fim do histórico"""
+        line = (json.dumps(entry, ensure_ascii=False) + '\n').encode('utf-8')
+        with self._lock:
+            handle = self._lock_file()
+            try:
+                try:
+                    size = os.path.getsize(self.path)
+                except FileNotFoundError:
+                    size = 0
+                if size and size + len(line) > self.max_bytes:
+                    self._rotate()
+                with open(self.path, 'ab') as f:
+                    f.write(line)
+            finally:
+                handle.close()
+
+    def entries(self, newest_first: bool = True) -> Iterator[Dict]:
+        """Percorre o histórico sem carregá-lo na memória"""
+        files = self.files()
+        if not newest_first:
+            files.reverse()
+        read_lines = _reverse_lines if newest_first else _forward_lines
+        for path in files:
+            try:
+                for line in read_lines(path):
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        continue  # Linha corrompida ou sendo escrita
+            except FileNotFoundError:
+                continue  # Arquivo rotacionado durante a leitura
+
+    def page(self, limit: int = 50, offset: int = 0, model: Optional[str] = None,
+             pdf_context: Optional[str] = None, query: Optional[str] = None,
+             since: Optional[datetime] = None) -> Dict:
+        """Uma página do histórico (mais recentes primeiro), com filtros opcionais
+
+        Lê só até encontrar offset + limit conversas; como o arquivo é
+        percorrido do fim para o começo, o filtro por data para de ler
+        assim que passa da data pedida.
+        """
+        query = query.lower() if query else None
+        since_iso = since.isoformat() if since else None
+        matched = 0
+        results = []
+
+        for entry in self.entries():
+            if since_iso and entry.get('timestamp', '') < since_iso:
+                break
+            if model and entry.get('model') != model:
+                continue
+            if pdf_context and entry.get('pdf_context') != pdf_context \
+                    and pdf_context not in entry.get('pdf_contexts', ()):
+                continue
+            if query and query not in entry.get('user_message', '').lower() \
+                    and query not in entry.get('ai_response', '').lower():
+                continue
+
+            if matched >= offset:
+                if len(results) == limit:
+                    return {'history': results, 'next_offset': offset + limit}
+                results.append(entry)
+            matched += 1
+
+        return {'history': results, 'next_offset': None}
@@ -0,0 +1,185 @@
+"""
+Configuração dos testes (pytest)
+
+Os testes usam um servidor falso que imita a API do Ollama, para não
+depender de um modelo rodando. O test_pdf.py é um script de integração
+contra o servidor real e fica fora da coleta.
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+
+collect_ignore = ['test_pdf.py']
+
+
+class FakeOllama:
+    """Servidor HTTP local que responde como o Ollama"""
+
+    def __init__(self):
+        self.models = ['llama2:latest']
+        self.tokens = ['Olá', ',', ' tudo', ' bem', '?']
+        self.token_delay = 0
+        self.status = 200
+        self.delay = 0       # Atraso antes de responder (para testar timeouts)
+        self.fail_next = 0   # Quantas requisições seguintes respondem 503
+        self.connections = 0
+        self.requests = []
+        self.cancelled = threading.Event()
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self.server.daemon_threads = True
+        self.url = f'http://127.0.0.1:{self.server.server_port}'
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'  # Keep-alive, como o Ollama
+
+            def setup(self):
+                super().setup()
+                fake.connections += 1
+
+            def log_message(self, *args):
+                pass
+
+            def fail(self):
+                """Aplica o atraso e as falhas programadas; True se já respondeu"""
+                time.sleep(fake.delay)
+                if fake.fail_next:
+                    fake.fail_next -= 1
+                    self.send_json({'error': 'sobrecarregado'}, 503)
+                    return True
+                return False
+
+            def send_json(self, data, status=200):
+                body = json.dumps(data).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                fake.requests.append(('GET', self.path, None))
+                if self.fail():
+                    return
+                if self.path == '/api/tags':
+                    self.send_json({'models': [{'name': name} for name in fake.models]}, fake.status)
+                else:
+                    self.send_json({'error': 'not found'}, 404)
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length', 0))
+                payload = json.loads(self.rfile.read(length) or b'{}')
+                fake.requests.append(('POST', self.path, payload))
+                if self.fail():
+                    return
+                if self.path not in ('/api/generate', '/api/chat'):
+                    self.send_json({'status': 'success'}, fake.status)
+                elif fake.status != 200:
+                    self.send_json({'error': 'falha no modelo'}, fake.status)
+                elif not payload.get('stream', True):
+                    self.send_json(dict(self.text(''.join(fake.tokens)), done=True))
+                else:
+                    self.stream(payload)
+
+            def text(self, token):
+                """O /api/generate responde em "response", o /api/chat em message.content"""
+                if self.path == '/api/chat':
+                    return {'message': {'role': 'assistant', 'content': token}}
+                return {'response': token}
+
+            def stream(self, payload):
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/x-ndjson')
+                self.send_header('Connection', 'close')
+                self.end_headers()
+                self.close_connection = True
+                chunks = [dict(self.text(token), model=payload['model'], done=False) for token in fake.tokens]
+                chunks.append({'model': payload['model'], **self.text(''), 'done': True,
+                               'total_duration': 1000, 'eval_count': len(fake.tokens)})
+                try:
+                    for chunk in chunks:
+                        self.wfile.write(json.dumps(chunk).encode() + b'\n')
+                        self.wfile.flush()
+                        time.sleep(fake.token_delay)
+                except (BrokenPipeError, ConnectionResetError):
+                    fake.cancelled.set()
+
+        return Handler
+
+    def generate_requests(self):
+        return [payload for method, path, payload in self.requests if path == '/api/generate']
+
+    def chat_requests(self):
+        return [payload for method, path, payload in self.requests if path == '/api/chat']
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, args=(0.05,), daemon=True).start()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def ollama():
+    fake = FakeOllama()
+    fake.start()
+    yield fake
+    fake.stop()
+
+
+@pytest.fixture
+def chatbot(ollama, tmp_path, monkeypatch):
+    """Módulo app.py apontando para o Ollama falso e com histórico temporário"""
+    import app as chatbot_app
+    from chat_history import ChatHistory
+    from ollama_client import OllamaClient
+    from ttl_cache import TTLCache
+    monkeypatch.setattr(chatbot_app, 'ollama', OllamaClient(ollama.url, backoff=0))
+    monkeypatch.setattr(chatbot_app, 'ollama_cache', TTLCache(stale_ttl=chatbot_app.CACHE_STALE_TTL))
+    from response_cache import ResponseCache
+    monkeypatch.setattr(chatbot_app, 'response_cache', ResponseCache())
+    from admission import AdmissionController
+    monkeypatch.setattr(chatbot_app, 'admission', AdmissionController(
+        max_concurrent=chatbot_app.OLLAMA_MAX_CONCURRENT, max_queue=chatbot_app.CHAT_QUEUE_MAX,
+        queue_timeout=chatbot_app.CHAT_QUEUE_TIMEOUT, rate_limit=chatbot_app.CHAT_RATE_LIMIT))
+    # Resumos sem chamar o modelo (os testes que precisam passam summarize)
+    from conversation import ConversationStore
+    monkeypatch.setattr(chatbot_app, 'conversations', ConversationStore(
+        token_budget=chatbot_app.CONVERSATION_TOKEN_BUDGET, summary_tokens=chatbot_app.CONVERSATION_SUMMARY_TOKENS))
+
+    # PDFs e fila em pastas temporárias; a fila é processada pelo teste (run_next)
+    from pdf_processor import PDFProcessor
+    from job_queue import JobQueue
+    uploads = tmp_path / 'uploads'
+    monkeypatch.setitem(chatbot_app.app.config, 'UPLOAD_FOLDER', str(uploads))
+    monkeypatch.setattr(chatbot_app, 'pdf_processor', PDFProcessor(
+        upload_dir=str(uploads), cache_dir=str(tmp_path / 'cache'), ocr_workers=0))
+    from retrieval import Retriever
+    monkeypatch.setattr(chatbot_app, 'retriever', Retriever(index_dir=str(tmp_path / 'cache' / 'index')))
+    from pdf_collections import PDFCollections
+    monkeypatch.setattr(chatbot_app, 'pdf_collections', PDFCollections(str(tmp_path / 'cache' / 'collections.json')))
+    monkeypatch.setattr(chatbot_app, 'pdf_jobs', JobQueue(
+        str(tmp_path / 'cache' / 'jobs.db'), handler=chatbot_app.process_pdf_job, workers=0))
+    monkeypatch.setattr(chatbot_app, 'chat_history', ChatHistory(str(tmp_path / 'chat_history.jsonl')))
+    chatbot_app.app.config['TESTING'] = True
+    return chatbot_app
+
+
+@pytest.fixture
+def client(chatbot):
+    return chatbot.app.test_client()
+
+
+def parse_events(body):
+    """Converte o corpo text/event-stream em uma lista de (evento, dados)"""
+    events = []
+    for block in body.strip().split('\n\n'):
+        lines = dict(line.split(': ', 1) for line in block.split('\n'))
+        events.append((lines['event'], json.loads(lines['data'])))
+    return events
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Memória das conversas do Chatbot de IA Local
+Cada aba do navegador tem uma sessão com as últimas trocas de mensagens,
+enviadas ao modelo junto com a pergunta nova para que perguntas de
+continuação ("e como configuro isso?") façam sentido. Só as trocas mais
+recentes que cabem em um orçamento de tokens vão inteiras; as mais antigas
+viram um resumo curto, para o prompt não crescer a cada mensagem. As
+sessões ficam em memória, as menos usadas saem primeiro.
+"""
+
+import re
+import time
+import threading
+from collections import OrderedDict, deque
+from typing import Callable, Deque, Dict, List, Optional
+from retrieval import estimate_tokens
+
+
+class Session:
+    __slots__ = ('turns', 'summary', 'summarizing', 'generation', 'model', 'updated_at', 'lock')
+
+    def __init__(self):
+        self.turns: Deque[Dict] = deque()  # {'user', 'assistant', 'tokens'}
+        self.summary = ''
+        self.summarizing = False
+        # Incrementado a cada troca que vai para o resumo: um resumo feito
+        # pelo modelo antes disso já nasce desatualizado
+        self.generation = 0
+        self.model: Optional[str] = None  # Modelo da última troca, usado também no resumo
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+
+def _first_sentence(text: str, max_chars: int = 160) -> str:
+    sentence = re.split(r'(?<=[.!?])\s', text.strip(), maxsplit=1)[0]
+    return sentence if len(sentence) <= max_chars else sentence[:max_chars].rsplit(' ', 1)[0] + '...'
+
+
+class ConversationStore:
+    def __init__(self, max_sessions: int = 200, token_budget: int = 1000, summary_tokens: int = 200,
+                 summarize: Optional[Callable[[str, Optional[str]], str]] = None):
+        """
+        token_budget: tokens das trocas recentes enviadas inteiras
+        summary_tokens: tamanho máximo do resumo das trocas antigas
+        summarize(texto, modelo) -> resumo: opcional, roda em segundo plano com o
+        modelo da conversa; sem ele (ou até ele terminar) o resumo guarda a
+        primeira frase de cada troca
+        """
+        self.max_sessions = max_sessions
+        self.token_budget = token_budget
+        self.summary_tokens = summary_tokens
+        self.summarize = summarize
+        self._sessions: 'OrderedDict[str, Session]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _session(self, session_id: str, create: bool = True) -> Optional[Session]:
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None and create:
+                session = self._sessions[session_id] = Session()
+                while len(self._sessions) > self.max_sessions:
+                    self._sessions.popitem(last=False)
+            if session is not None:
+                self._sessions.move_to_end(session_id)
+            return session
+
+    def has_history(self, session_id: str) -> bool:
+        session = self._session(session_id, create=False)
+        return bool(session and (session.turns or session.summary))
+
+    def messages(self, session_id: str) -> List[Dict]:
+        """Mensagens anteriores no formato do /api/chat do Ollama (resumo + trocas recentes)"""
+        session = self._session(session_id, create=False)
+        if session is None:
+            return []
+        with session.lock:
+            messages = []
+            if session.summary:
+                messages.append({'role': 'system', 'content': f"Resumo da conversa até aqui: {session.summary}"})
+            for turn in session.turns:
+                messages.append({'role': 'user', 'content': turn['user']})
+                messages.append({'role': 'assistant', 'content': turn['assistant']})
+            return messages
+
+    def append(self, session_id: str, user: str, assistant: str, model: Optional[str] = None):
+        """Registra uma troca; as mais antigas que não cabem no orçamento vão para o resumo"""
+        session = self._session(session_id)
+        with session.lock:
+            if model:
+                session.model = model
+            session.turns.append({'user': user, 'assistant': assistant,
+                                  'tokens': estimate_tokens(user) + estimate_tokens(assistant)})
+            session.updated_at = time.monotonic()
+            folded = []
+            # A última troca fica sempre, mesmo se sozinha passar do orçamento
+            while len(session.turns) > 1 and sum(turn['tokens'] for turn in session.turns) > self.token_budget:
+                folded.append(session.turns.popleft())
+            if not folded:
+                return
+            session.generation += 1
+            notes = [f"Usuário perguntou: {_first_sentence(turn['user'])} "
+                     f"Assistente: {_first_sentence(turn['assistant'])}" for turn in folded]
+            session.summary = self._trim(' '.join(filter(None, [session.summary] + notes)))
+            start = self.summarize is not None and not session.summarizing
+            if start:
+                session.summarizing = True
+                text, generation, model = session.summary, session.generation, session.model
+
+        if start:
+            threading.Thread(target=self._summarize, args=(session, text, generation, model), daemon=True).start()
+
+    def _trim(self, summary: str) -> str:
+        """Mantém o resumo dentro de summary_tokens, descartando o começo (o mais antigo)"""
+        max_chars = self.summary_tokens * 4
+        if len(summary) <= max_chars:
+            return summary
+        return '...' + summary[-max_chars:].split(' ', 1)[-1]
+
+    def _summarize(self, session: Session, text: str, generation: int, model: Optional[str]):
+        try:
+            summary = self.summarize(text, model).strip()
+        except Exception as e:
+            print(f"Erro ao resumir conversa: {e}")
+            summary = ''
+        with session.lock:
+            session.summarizing = False
+            if summary and session.generation == generation:
+                session.summary = self._trim(summary)
+
+    def clear(self, session_id: str):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            sessions = list(self._sessions.values())
+        return {
+            'sessions': len(sessions),
+            'max_sessions': self.max_sessions,
+            'turns': sum(len(session.turns) for session in sessions),
+            'summarized': sum(1 for session in sessions if session.summary)
+        }
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Fila de processamento de PDFs do Chatbot de IA Local
+Os uploads viram tarefas gravadas em SQLite e processadas por threads em
+segundo plano, então a requisição responde na hora e o navegador acompanha
+o progresso em /api/jobs/<id>. As tarefas sobrevivem a um reinício (as que
+estavam em andamento voltam para a fila) e um mesmo arquivo (mesmo hash)
+não é processado duas vezes.
+"""
+
+import os
+import json
+import sqlite3
+import threading
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, Dict, Optional, Tuple
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    file_hash TEXT NOT NULL UNIQUE,
+    file_name TEXT NOT NULL,
+    file_path TEXT NOT NULL,
+    status TEXT NOT NULL,
+    progress_done INTEGER NOT NULL DEFAULT 0,
+    progress_total INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    result TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    created_at TEXT NOT NULL,
+    started_at TEXT,
+    finished_at TEXT
+);
+CREATE INDEX IF NOT EXISTS ix_jobs_status_created_at ON jobs (status, created_at);
+"""
+
+
+class JobFailed(Exception):
+    """Erro esperado no processamento (vira a mensagem de erro da tarefa)"""
+
+
+class JobQueue:
+    def __init__(self, db_path: str, handler: Callable[[Dict, Callable[[int, int], None]], Dict],
+                 workers: int = 1):
+        """
+        handler(job, progress) processa uma tarefa e retorna o resultado (um
+        dicionário salvo em JSON); progress(feitas, total) atualiza o progresso
+        """
+        self.db_path = db_path
+        self.handler = handler
+        self.workers = workers
+        self._wakeup = threading.Condition()
+        self._stopping = False
+        self._threads = []
+
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        with self._connect() as connection:
+            connection.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        """Conexão curta, com commit no fim (cada thread usa a sua)"""
+        connection = sqlite3.connect(self.db_path, timeout=30)
+        connection.row_factory = sqlite3.Row
+        try:
+            connection.execute('PRAGMA journal_mode = WAL')
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    @staticmethod
+    def _to_dict(row: sqlite3.Row) -> Dict:
+        job = {
+            'id': row['id'],
+            'status': row['status'],
+            'file_name': row['file_name'],
+            'file_hash': row['file_hash'],
+            'progress': {'done': row['progress_done'], 'total': row['progress_total']},
+            'error': row['error'],
+            'created_at': row['created_at'],
+            'started_at': row['started_at'],
+            'finished_at': row['finished_at']
+        }
+        if row['result']:
+            job['result'] = json.loads(row['result'])
+        return job
+
+    def submit(self, file_hash: str, file_name: str, file_path: str) -> Tuple[Dict, bool]:
+        """
+        Enfileira o processamento de um arquivo
+        Retorna (tarefa, criada). Se já existe uma tarefa para o mesmo hash,
+        ela é retornada em vez de criar outra; uma tarefa que falhou volta
+        para a fila com o arquivo novo.
+        """
+        now = datetime.now().isoformat()
+        with self._connect() as connection:
+            row = connection.execute('SELECT * FROM jobs WHERE file_hash = ?', (file_hash,)).fetchone()
+            if row is not None and row['status'] != FAILED:
+                return self._to_dict(row), False
+
+            if row is None:
+                job_id = uuid.uuid4().hex
+                connection.execute(
+                    'INSERT INTO jobs (id, file_hash, file_name, file_path, status, created_at) '
+                    'VALUES (?, ?, ?, ?, ?, ?)',
+                    (job_id, file_hash, file_name, file_path, QUEUED, now)
+                )
+            else:
+                job_id = row['id']
+                connection.execute(
+                    'UPDATE jobs SET file_name = ?, file_path = ?, status = ?, error = NULL, result = NULL, '
+                    'progress_done = 0, progress_total = 0, created_at = ?, started_at = NULL, '
+                    'finished_at = NULL WHERE id = ?',
+                    (file_name, file_path, QUEUED, now, job_id)
+                )
+            row = connection.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+
+        with self._wakeup:
+            self._wakeup.notify()
+        return self._to_dict(row), True
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self._connect() as connection:
+            row = connection.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        return self._to_dict(row) if row else None
+
+    def rekey(self, old_hash: str, new_hash: str):
+        """Passa a tarefa de um arquivo para outro hash (a de new_hash, se já existe, fica)"""
+        with self._connect() as connection:
+            connection.execute('UPDATE OR IGNORE jobs SET file_hash = ? WHERE file_hash = ?', (new_hash, old_hash))
+            connection.execute('DELETE FROM jobs WHERE file_hash = ?', (old_hash,))
+
+    def forget(self, file_hash: str):
+        """Remove a tarefa de um arquivo (ex.: quando o PDF é apagado)"""
+        with self._connect() as connection:
+            connection.execute('DELETE FROM jobs WHERE file_hash = ?', (file_hash,))
+
+    def _claim(self) -> Optional[Dict]:
+        """Pega a tarefa mais antiga da fila (atômico entre threads e processos)"""
+        with self._connect() as connection:
+            row = connection.execute(
+                'UPDATE jobs SET status = ?, started_at = ?, attempts = attempts + 1 '
+                'WHERE id = (SELECT id FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1) '
+                'AND status = ? RETURNING *',
+                (RUNNING, datetime.now().isoformat(), QUEUED, QUEUED)
+            ).fetchone()
+        if row is None:
+            return None
+        # O caminho do arquivo só interessa ao handler, não vai para a API
+        job = self._to_dict(row)
+        job['file_path'] = row['file_path']
+        return job
+
+    def _progress(self, job_id: str, done: int, total: int):
+        with self._connect() as connection:
+            connection.execute('UPDATE jobs SET progress_done = ?, progress_total = ? WHERE id = ?',
+                               (done, total, job_id))
+
+    def _finish(self, job_id: str, status: str, result: Optional[Dict] = None, error: Optional[str] = None):
+        with self._connect() as connection:
+            connection.execute(
+                'UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ? WHERE id = ?',
+                (status, json.dumps(result, ensure_ascii=False) if result is not None else None,
+                 error, datetime.now().isoformat(), job_id)
+            )
+
+    def run_next(self) -> bool:
+        """Processa uma tarefa da fila; retorna False se a fila estava vazia"""
+        job = self._claim()
+        if job is None:
+            return False
+
+        try:
+            result = self.handler(job, lambda done, total: self._progress(job['id'], done, total))
+        except JobFailed as e:
+            self._finish(job['id'], FAILED, error=str(e))
+        except Exception as e:
+            print(f"❌ Erro na tarefa {job['id']}: {e}")
+            self._finish(job['id'], FAILED, error=f'Erro ao processar PDF: {str(e)}')
+        else:
+            self._finish(job['id'], DONE, result=result)
+        return True
+
+    def recover(self) -> int:
+        """Devolve para a fila as tarefas que estavam rodando quando o servidor parou"""
+        with self._connect() as connection:
+            return connection.execute('UPDATE jobs SET status = ?, started_at = NULL WHERE status = ?',
+                                      (QUEUED, RUNNING)).rowcount
+
+    def _work(self):
+        while not self._stopping:
+            if self.run_next():
+                continue
+            with self._wakeup:
+                # Acorda com um novo upload ou, de tempos em tempos, para ver
+                # tarefas enfileiradas por outro processo
+                self._wakeup.wait(timeout=5)
+
+    def start(self):
+        """Retoma as tarefas pendentes e inicia as threads de processamento"""
+        recovered = self.recover()
+        if recovered:
+            print(f"🔁 {recovered} tarefas de PDF retomadas")
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f'pdf-jobs-{i}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: float = 5):
+        self._stopping = True
+        with self._wakeup:
+            self._wakeup.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
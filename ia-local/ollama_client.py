@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Cliente HTTP do Ollama para o Chatbot de IA Local
+Reaproveita conexões (requests.Session com pool e keep-alive), usa um
+timeout por operação, repete chamadas que falharam por problemas
+transitórios e tem um circuit breaker: depois de várias falhas seguidas
+as chamadas falham na hora, sem esperar timeouts, até o Ollama voltar.
+"""
+
+import json
+import threading
+import time
+from typing import Dict, Iterator, List, Optional, Tuple
+import requests
+from requests.adapters import HTTPAdapter
+
+# (conexão, leitura) em segundos. No streaming, a leitura vale entre tokens
+DEFAULT_TIMEOUTS = {
+    'tags': (2, 5),
+    'generate': (5, 60),
+    'stream': (5, 120),
+    'pull': (5, 300),
+    'embed': (5, 30)
+}
+
+
+class OllamaError(Exception):
+    """Erro ao falar com o Ollama"""
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class OllamaTimeout(OllamaError):
+    """O Ollama não respondeu dentro do timeout"""
+
+
+class OllamaUnavailable(OllamaError):
+    """O Ollama está fora do ar (conexão recusada ou circuito aberto)"""
+
+
+class CircuitBreaker:
+    """Abre o circuito após failure_threshold falhas seguidas
+
+    Com o circuito aberto as chamadas são recusadas até passar reset_timeout;
+    então uma chamada de teste é liberada (meio aberto): se funcionar o
+    circuito fecha, se falhar abre de novo.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return self.CLOSED
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def allow(self) -> bool:
+        """Indica se uma chamada pode ser feita agora"""
+        with self._lock:
+            state = self.state
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_running = False
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+
+class OllamaClient:
+    def __init__(self, host: str, timeouts: Optional[Dict[str, Tuple[float, float]]] = None,
+                 retries: int = 2, backoff: float = 0.2, failure_threshold: int = 3,
+                 reset_timeout: float = 30, pool_size: int = 10):
+        self.host = host.rstrip('/')
+        self.timeouts = dict(DEFAULT_TIMEOUTS, **(timeouts or {}))
+        self.retries = retries
+        self.backoff = backoff
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def _request(self, method: str, path: str, operation: str, idempotent: bool = False,
+                 **kwargs) -> requests.Response:
+        """Faz a requisição com timeout, novas tentativas e circuit breaker
+
+        Falhas de conexão sempre podem ser repetidas (a requisição não chegou
+        ao Ollama). Timeouts de leitura e erros 5xx só são repetidos em
+        operações idempotentes, para não gerar a mesma resposta duas vezes.
+        """
+        url = f"{self.host}{path}"
+        attempt = 0
+        while True:
+            if not self.breaker.allow():
+                raise OllamaUnavailable('Ollama indisponível (circuito aberto)')
+
+            retryable = False
+            try:
+                response = self.session.request(method, url, timeout=self.timeouts[operation], **kwargs)
+            except requests.exceptions.ConnectionError as e:
+                error, retryable = OllamaUnavailable(f'Erro de conexão com o Ollama: {e}'), True
+            except requests.exceptions.Timeout:
+                error, retryable = OllamaTimeout('Timeout - o Ollama demorou muito para responder'), idempotent
+            except requests.exceptions.RequestException as e:
+                # Outros erros (resposta truncada, URL inválida, redirecionamentos...)
+                # também contam como falha, senão uma chamada de teste do
+                # circuito meio aberto nunca terminaria
+                error = OllamaError(f'Erro na requisição ao Ollama: {e}')
+            else:
+                if response.status_code < 500:
+                    self.breaker.record_success()
+                    if response.status_code != 200:
+                        message = self._error_message(response)
+                        response.close()
+                        raise OllamaError(message, response.status_code)
+                    return response
+                error = OllamaError(self._error_message(response), response.status_code)
+                retryable = idempotent
+                response.close()
+
+            self.breaker.record_failure()
+            if not retryable or attempt >= self.retries:
+                raise error
+            time.sleep(self.backoff * (2 ** attempt))
+            attempt += 1
+
+    @staticmethod
+    def _error_message(response: requests.Response) -> str:
+        try:
+            return response.json().get('error') or f'Erro HTTP {response.status_code}'
+        except ValueError:
+            return f'Erro HTTP {response.status_code}'
+
+    def list_models(self) -> List[str]:
+        """Nomes dos modelos instalados no Ollama"""
+        response = self._request('GET', '/api/tags', 'tags', idempotent=True)
+        return [model['name'] for model in response.json().get('models', [])]
+
+    def is_healthy(self) -> bool:
+        """Verifica se o Ollama está respondendo"""
+        try:
+            self._request('GET', '/api/tags', 'tags', idempotent=True)
+            return True
+        except OllamaError:
+            return False
+
+    def generate(self, model: str, prompt: str) -> Dict:
+        """Gera a resposta completa (sem streaming)"""
+        payload = {'model': model, 'prompt': prompt, 'stream': False}
+        return self._request('POST', '/api/generate', 'generate', json=payload).json()
+
+    def generate_stream(self, model: str, prompt: str) -> Iterator[Dict]:
+        """Gera a resposta em streaming, um dicionário por linha do NDJSON
+
+        Fechar o gerador (por exemplo quando o cliente desconecta) fecha a
+        conexão com o Ollama, que então para de gerar.
+        """
+        payload = {'model': model, 'prompt': prompt, 'stream': True}
+        return self._stream('/api/generate', payload)
+
+    def chat(self, model: str, messages: List[Dict]) -> Dict:
+        """Resposta completa para uma conversa (lista de mensagens role/content)"""
+        payload = {'model': model, 'messages': messages, 'stream': False}
+        return self._request('POST', '/api/chat', 'generate', json=payload).json()
+
+    def chat_stream(self, model: str, messages: List[Dict]) -> Iterator[Dict]:
+        """Como generate_stream, mas para uma conversa; o texto vem em message.content"""
+        payload = {'model': model, 'messages': messages, 'stream': True}
+        return self._stream('/api/chat', payload)
+
+    def _stream(self, path: str, payload: Dict) -> Iterator[Dict]:
+        response = self._request('POST', path, 'stream', json=payload, stream=True)
+        try:
+            for line in response.iter_lines():
+                if line:
+                    yield json.loads(line)
+        except requests.exceptions.Timeout:
+            self.breaker.record_failure()
+            raise OllamaTimeout('Timeout - o modelo demorou muito para responder')
+        except requests.exceptions.ConnectionError as e:
+            self.breaker.record_failure()
+            raise OllamaUnavailable(f'Conexão com o Ollama interrompida: {e}')
+        except requests.exceptions.RequestException as e:
+            self.breaker.record_failure()
+            raise OllamaError(f'Erro ao ler a resposta do Ollama: {e}')
+        finally:
+            response.close()
+
+    def embed(self, model: str, text: str) -> List[float]:
+        """Embedding de um texto (o mesmo texto sempre gera o mesmo vetor, pode repetir)"""
+        payload = {'model': model, 'prompt': text}
+        return self._request('POST', '/api/embeddings', 'embed', idempotent=True, json=payload).json()['embedding']
+
+    def pull(self, model: str) -> Dict:
+        """Baixa um modelo (espera o download terminar)"""
+        payload = {'name': model, 'stream': False}
+        return self._request('POST', '/api/pull', 'pull', json=payload).json()
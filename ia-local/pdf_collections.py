@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Coleções de PDFs do Chatbot de IA Local
+Uma coleção dá nome a um conjunto de PDFs (ex.: as apostilas de um curso)
+para perguntar sobre todos eles de uma vez. As coleções ficam em um
+arquivo JSON pequeno, regravado de forma atômica a cada alteração.
+"""
+
+import os
+import json
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional
+
+
+class PDFCollections:
+    def __init__(self, path: str = 'cache/collections.json'):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._collections = self._load()
+
+    def _load(self) -> Dict[str, Dict]:
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"Erro ao carregar coleções: {e}")
+            return {}
+
+    def _save(self):
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._collections, f, ensure_ascii=False, indent=2)
+        os.replace(temp_path, self.path)
+
+    def all(self) -> List[Dict]:
+        with self._lock:
+            return [dict(collection, name=name) for name, collection in sorted(self._collections.items())]
+
+    def get(self, name: str) -> Optional[List[str]]:
+        """Hashes dos PDFs da coleção (None se ela não existe)"""
+        with self._lock:
+            collection = self._collections.get(name)
+            return list(collection['documents']) if collection else None
+
+    def save(self, name: str, documents: List[str]) -> Dict:
+        """Cria ou substitui a coleção (sem repetir PDFs, na ordem dada)"""
+        collection = {
+            'documents': list(dict.fromkeys(documents)),
+            'updated_at': datetime.now().isoformat()
+        }
+        with self._lock:
+            self._collections[name] = collection
+            self._save()
+        return dict(collection, name=name)
+
+    def delete(self, name: str) -> bool:
+        with self._lock:
+            if self._collections.pop(name, None) is None:
+                return False
+            self._save()
+            return True
+
+    def rename_document(self, old_hash: str, new_hash: str):
+        """Troca o hash de um PDF em todas as coleções"""
+        with self._lock:
+            changed = False
+            for collection in self._collections.values():
+                if old_hash in collection['documents']:
+                    collection['documents'] = list(dict.fromkeys(
+                        new_hash if doc_hash == old_hash else doc_hash for doc_hash in collection['documents']))
+                    changed = True
+            if changed:
+                self._save()
+
+    def remove_document(self, doc_hash: str):
+        """Tira um PDF apagado de todas as coleções"""
+        with self._lock:
+            changed = False
+            for collection in self._collections.values():
+                if doc_hash in collection['documents']:
+                    collection['documents'].remove(doc_hash)
+                    changed = True
+            if changed:
+                self._save()
@@ -6,185 +6,321 @@ Suporte a OCR para PDFs de imagem
 """
 
 import os
-import json
+import math
 import hashlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import datetime
 import PyPDF2
 import pdfplumber
 import pytesseract
 from pdf2image import convert_from_path
 from PIL import Image
-from typing import Dict, List, Optional
+from typing import Callable, Dict, List, Optional
+from pdf_store import PDFStore
+
+# Páginas com menos caracteres que isso (e com imagem) vão para o OCR
+MIN_PAGE_TEXT = 25
+
+# Configurar Tesseract para português
+OCR_CONFIG = '--oem 3 --psm 6 -l por+eng'
+# Resolução mínima aceitável quando o limite de memória obriga a reduzir o DPI
+OCR_MIN_DPI = 100
+
+# Hash do conteúdo dos PDFs: BLAKE2b de 16 bytes (32 caracteres hexadecimais,
+# o mesmo tamanho do MD5 usado antes), lido em blocos de 1 MiB. Documentos
+# processados antes continuam guardados pelo MD5 (sem hash_algorithm)
+HASH_ALGORITHM = 'blake2b'
+HASH_BUFFER_SIZE = 1024 * 1024
+
+
+def new_file_hash():
+    return hashlib.blake2b(digest_size=16)
+
+
+def save_and_hash(stream, file_path: str) -> str:
+    """Grava stream em file_path calculando o hash ao mesmo tempo (uma leitura só)"""
+    file_hash = new_file_hash()
+    with open(file_path, 'wb') as f:
+        for chunk in iter(lambda: stream.read(HASH_BUFFER_SIZE), b''):
+            file_hash.update(chunk)
+            f.write(chunk)
+    return file_hash.hexdigest()
+
+
+def _ocr_page(file_path: str, page_number: int, dpi: int, grayscale: bool) -> str:
+    """Converte uma única página em imagem, faz o OCR e libera a imagem
+
+    Função de módulo para poder rodar nos processos do pool.
+    """
+    images = convert_from_path(file_path, dpi=dpi, first_page=page_number,
+                               last_page=page_number, grayscale=grayscale)
+    try:
+        return pytesseract.image_to_string(images[0], config=OCR_CONFIG) if images else ''
+    finally:
+        for image in images:
+            image.close()
+
+
+def ocr_page_dpi(width: float, height: float, dpi: int, grayscale: bool, memory_bytes: float) -> int:
+    """DPI para que a imagem da página (width x height em pontos) caiba em memory_bytes"""
+    channels = 1 if grayscale else 3
+    square_inches = (width / 72) * (height / 72)
+    if square_inches <= 0:
+        return dpi
+    fitting_dpi = int(math.sqrt(memory_bytes / (square_inches * channels)))
+    return max(OCR_MIN_DPI, min(dpi, fitting_dpi))
 
 class PDFProcessor:
-    def __init__(self, upload_dir: str = 'uploads', cache_dir: str = 'cache', enable_ocr: bool = True):
+    def __init__(self, upload_dir: str = 'uploads', cache_dir: str = 'cache', enable_ocr: bool = True,
+                 ocr_workers: Optional[int] = None, ocr_dpi: int = 200, ocr_grayscale: bool = True,
+                 ocr_max_memory_mb: int = 512):
         self.upload_dir = upload_dir
         self.cache_dir = cache_dir
-        self.cache_file = os.path.join(cache_dir, 'pdf_cache.json')
+        self.cache_file = os.path.join(cache_dir, 'pdfs.db')
         self.enable_ocr = enable_ocr
         
+        # OCR: páginas em paralelo em um pool de processos (0 = no próprio processo).
+        # O limite de memória vale para as imagens de todas as páginas em
+        # processamento ao mesmo tempo: cada processo converte uma página
+        # por vez, e o DPI é reduzido se a página não couber na sua parte
+        self.ocr_workers = (os.cpu_count() or 1) if ocr_workers is None else ocr_workers
+        self.ocr_dpi = ocr_dpi
+        self.ocr_grayscale = ocr_grayscale
+        self.ocr_max_memory_mb = ocr_max_memory_mb
+        self._ocr_pool = None
+        
         # Criar diretórios se não existirem
         os.makedirs(upload_dir, exist_ok=True)
         os.makedirs(cache_dir, exist_ok=True)
         
-        # Carregar cache existente
-        self.cache = self._load_cache()
-    
-    def _load_cache(self) -> Dict:
-        """Carrega cache de PDFs processados"""
-        if os.path.exists(self.cache_file):
-            try:
-                with open(self.cache_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except:
-                return {}
-        return {}
-    
-    def _save_cache(self):
-        """Salva cache de PDFs processados"""
-        try:
-            with open(self.cache_file, 'w', encoding='utf-8') as f:
-                json.dump(self.cache, f, ensure_ascii=False, indent=2)
-        except Exception as e:
-            print(f"Erro ao salvar cache: {e}")
+        # Cache dos PDFs processados: metadados e texto (lido só quando usado)
+        # em SQLite; cada documento é gravado sozinho, sem regravar os outros
+        self.cache = PDFStore(self.cache_file, legacy_path=os.path.join(cache_dir, 'pdf_cache.json'))
     
     def _get_file_hash(self, file_path: str) -> str:
         """Gera hash do arquivo para cache"""
-        hash_md5 = hashlib.md5()
+        file_hash = new_file_hash()
         with open(file_path, "rb") as f:
-            for chunk in iter(lambda: f.read(4096), b""):
-                hash_md5.update(chunk)
-        return hash_md5.hexdigest()
+            for chunk in iter(lambda: f.read(HASH_BUFFER_SIZE), b""):
+                file_hash.update(chunk)
+        return file_hash.hexdigest()
     
-    def _extract_text_normal(self, file_path: str) -> str:
-        """Extrai texto usando métodos normais (PyPDF2 + pdfplumber)"""
-        text = ""
-        
-        # Tentar PyPDF2
+    def migrate_legacy_hashes(self) -> Dict[str, str]:
+        """
+        Passa os documentos guardados pelo MD5 para o hash atual (uma vez só:
+        os migrados ganham hash_algorithm). Cada arquivo é lido uma vez;
+        documentos cujo arquivo sumiu ficam como estão
+        Retorna {hash antigo: hash novo}
+        """
+        migrated = {}
+        for old_hash in self.cache.legacy_hashes():
+            data = self.cache.get(old_hash)
+            if data is None or not os.path.exists(data['file_path']):
+                continue
+            new_hash = self._get_file_hash(data['file_path'])
+            if self.cache.rekey(old_hash, new_hash, HASH_ALGORITHM):
+                migrated[old_hash] = new_hash
+        return migrated
+    
+    @staticmethod
+    def _has_images(resources, depth: int = 0) -> bool:
+        """Verifica se os recursos de uma página (ou de um Form XObject) têm imagens"""
+        if resources is None or depth > 3:
+            return False
+        xobjects = resources.get_object().get('/XObject')
+        if not xobjects:
+            return False
+        for xobject in xobjects.get_object().values():
+            xobject = xobject.get_object()
+            subtype = xobject.get('/Subtype')
+            if subtype == '/Image':
+                return True
+            if subtype == '/Form' and PDFProcessor._has_images(xobject.get('/Resources'), depth + 1):
+                return True
+        return False
+
+    def _read_pdf(self, file_path: str) -> Dict:
+        """
+        Lê o PDF uma única vez: metadados e, para cada página, o texto
+        extraível e se ela precisa de OCR (pouco texto, mas com imagem).
+        Usa PyPDF2; se ele não conseguir abrir o arquivo, tenta o pdfplumber.
+        """
         try:
             with open(file_path, 'rb') as file:
                 pdf_reader = PyPDF2.PdfReader(file)
+                info = pdf_reader.metadata or {}
+                pages = []
                 for page in pdf_reader.pages:
-                    page_text = page.extract_text()
-                    if page_text:
-                        text += page_text + "\n"
+                    try:
+                        page_text = page.extract_text() or ''
+                    except Exception as e:
+                        print(f"Erro PyPDF2 na página {len(pages) + 1}: {e}")
+                        page_text = ''
+                    needs_ocr = len(page_text.strip()) < MIN_PAGE_TEXT and self._has_images(page.get('/Resources'))
+                    pages.append({'text': page_text, 'needs_ocr': needs_ocr,
+                                  'width': float(page.mediabox.width), 'height': float(page.mediabox.height)})
+                return {
+                    'pages': pages,
+                    'title': info.get('/Title', '') or '',
+                    'author': info.get('/Author', '') or '',
+                    'subject': info.get('/Subject', '') or ''
+                }
         except Exception as e:
             print(f"Erro PyPDF2: {e}")
+
+        # PyPDF2 não conseguiu ler o arquivo, tentar pdfplumber
+        with pdfplumber.open(file_path) as pdf:
+            info = pdf.metadata or {}
+            pages = []
+            for page in pdf.pages:
+                page_text = page.extract_text() or ''
+                needs_ocr = len(page_text.strip()) < MIN_PAGE_TEXT and bool(page.images)
+                pages.append({'text': page_text, 'needs_ocr': needs_ocr,
+                              'width': float(page.width), 'height': float(page.height)})
+                page.flush_cache()
+            return {
+                'pages': pages,
+                'title': info.get('Title', '') or '',
+                'author': info.get('Author', '') or '',
+                'subject': info.get('Subject', '') or ''
+            }
+    
+    def _get_ocr_pool(self) -> ProcessPoolExecutor:
+        """Pool de processos do OCR, criado na primeira vez que é necessário"""
+        if self._ocr_pool is None:
+            self._ocr_pool = ProcessPoolExecutor(max_workers=self.ocr_workers)
+        return self._ocr_pool
+    
+    def close(self):
+        """Encerra o pool de processos do OCR"""
+        if self._ocr_pool is not None:
+            self._ocr_pool.shutdown(cancel_futures=True)
+            self._ocr_pool = None
+    
+    def _extract_text_with_ocr(self, file_path: str, pages: Dict[int, Dict],
+                               progress: Optional[Callable[[int, int], None]] = None) -> Dict[int, str]:
+        """
+        Extrai texto usando OCR (Tesseract) das páginas indicadas
+        pages: número da página (a partir de 1) -> {'width', 'height'} em pontos
+        Cada página é convertida em imagem, lida e descartada antes da próxima;
+        progress(feitas, total) é chamado a cada página concluída
+        """
+        if not self.enable_ocr or not pages:
+            return {}
         
-        # Se PyPDF2 não funcionou, tentar pdfplumber
-        if not text.strip():
-            try:
-                with pdfplumber.open(file_path) as pdf:
-                    for page in pdf.pages:
-                        page_text = page.extract_text()
-                        if page_text:
-                            text += page_text + "\n"
-            except Exception as e:
-                print(f"Erro pdfplumber: {e}")
+        print(f"🔄 Processando OCR para {os.path.basename(file_path)} ({len(pages)} páginas)...")
+        memory_per_page = self.ocr_max_memory_mb * 1024 * 1024 / max(1, self.ocr_workers)
+        tasks = {
+            number: ocr_page_dpi(size.get('width', 0), size.get('height', 0), self.ocr_dpi,
+                                 self.ocr_grayscale, memory_per_page)
+            for number, size in pages.items()
+        }
         
-        return text
-    
-    def _extract_text_with_ocr(self, file_path: str, max_pages: int = 10) -> str:
-        """Extrai texto usando OCR (Tesseract)"""
-        if not self.enable_ocr:
-            return ""
+        results = {}
+        total = len(tasks)
         
-        try:
-            print(f"🔄 Processando OCR para {os.path.basename(file_path)}...")
-            
-            # Converter PDF para imagens
-            images = convert_from_path(file_path, first_page=1, last_page=min(max_pages, 10))
-            
-            text = ""
-            total_pages = len(images)
-            
-            for i, image in enumerate(images):
-                print(f"  📄 Processando página {i+1}/{total_pages}...")
-                
-                # Configurar Tesseract para português
-                config = '--oem 3 --psm 6 -l por+eng'
-                
-                # Extrair texto da imagem
-                page_text = pytesseract.image_to_string(image, config=config)
-                
-                if page_text.strip():
-                    text += f"--- Página {i+1} ---\n{page_text.strip()}\n\n"
-                
-                # Limitar processamento para não sobrecarregar
-                if i >= max_pages - 1:
-                    text += f"\n[Processamento limitado a {max_pages} páginas para performance]"
-                    break
-            
-            print(f"✅ OCR concluído: {len(text)} caracteres extraídos")
-            return text
-            
-        except Exception as e:
-            print(f"❌ Erro no OCR: {e}")
-            return ""
-    
-    def _is_pdf_image_based(self, file_path: str) -> bool:
-        """Detecta se o PDF é baseado em imagem (sem texto extraível)"""
-        # Tentar extrair texto normal
-        normal_text = self._extract_text_normal(file_path)
+        def page_done(number, text):
+            results[number] = text
+            print(f"  📄 Página {number} concluída ({len(results)}/{total})")
+            if progress:
+                progress(len(results), total)
         
-        # Se não conseguiu extrair texto ou extraiu muito pouco, provavelmente é imagem
-        if not normal_text.strip() or len(normal_text.strip()) < 100:
-            return True
+        if self.ocr_workers == 0:
+            for number, dpi in tasks.items():
+                try:
+                    page_done(number, _ocr_page(file_path, number, dpi, self.ocr_grayscale))
+                except Exception as e:
+                    print(f"❌ Erro no OCR da página {number}: {e}")
+                    page_done(number, '')
+        else:
+            pool = self._get_ocr_pool()
+            futures = {
+                pool.submit(_ocr_page, file_path, number, dpi, self.ocr_grayscale): number
+                for number, dpi in tasks.items()
+            }
+            for future in as_completed(futures):
+                number = futures[future]
+                try:
+                    page_done(number, future.result())
+                except Exception as e:
+                    print(f"❌ Erro no OCR da página {number}: {e}")
+                    page_done(number, '')
         
-        return False
+        print(f"✅ OCR concluído: {sum(len(text) for text in results.values())} caracteres extraídos")
+        return {number: text for number, text in results.items() if text}
     
-    def extract_text_from_pdf(self, file_path: str) -> Dict:
+    def extract_text_from_pdf(self, file_path: str, progress: Optional[Callable[[int, int], None]] = None,
+                              file_name: Optional[str] = None, file_hash: Optional[str] = None) -> Dict:
         """
-        Extrai texto de um PDF usando múltiplos métodos
-        Detecta automaticamente se é PDF de texto ou imagem
+        Extrai texto de um PDF lendo o arquivo uma única vez
+        Páginas só com imagem passam pelo OCR; as demais usam o texto extraído
+        progress(feitas, total) acompanha as páginas do OCR
+        file_name: nome original (o arquivo é guardado com o nome do hash)
+        file_hash: hash já calculado no upload, para não ler o arquivo de novo
         Retorna dicionário com texto e metadados
         """
-        file_hash = self._get_file_hash(file_path)
+        file_name = file_name or os.path.basename(file_path)
+        file_hash = file_hash or self._get_file_hash(file_path)
         
         # Verificar cache
-        if file_hash in self.cache:
-            cached_data = self.cache[file_hash]
-            # Verificar se o arquivo ainda existe
-            if os.path.exists(cached_data['file_path']):
-                return cached_data
+        cached_data = self.cache.get(file_hash)
+        # Verificar se o arquivo ainda existe
+        if cached_data and os.path.exists(cached_data['file_path']):
+            return self.cache.load(file_hash)
         
         try:
-            # Extrair metadados primeiro
-            metadata = self._extract_metadata(file_path)
+            document = self._read_pdf(file_path)
+            pages = document['pages']
+            
+            # OCR apenas nas páginas que precisam
+            ocr_pages = [number for number, page in enumerate(pages, 1) if page['needs_ocr']]
+            ocr_texts = {}
+            if ocr_pages and self.enable_ocr:
+                print(f"📷 {len(ocr_pages)} de {len(pages)} páginas sem texto, usando OCR...")
+                ocr_texts = self._extract_text_with_ocr(
+                    file_path, {number: pages[number - 1] for number in ocr_pages}, progress)
             
-            # Detectar tipo de PDF
-            is_image_based = self._is_pdf_image_based(file_path)
+            # Montar o texto final na ordem das páginas, guardando onde cada uma começa
+            final_text = ""
+            page_offsets = []
+            for number, page in enumerate(pages, 1):
+                page_offsets.append(len(final_text))
+                if number in ocr_texts and ocr_texts[number].strip():
+                    final_text += f"--- Página {number} ---\n{ocr_texts[number].strip()}\n\n"
+                elif page['text']:
+                    final_text += page['text'] + "\n"
             
-            # Extrair texto baseado no tipo
-            if is_image_based and self.enable_ocr:
-                print(f"📷 PDF detectado como imagem, usando OCR...")
-                final_text = self._extract_text_with_ocr(file_path)
+            content_pages = sum(1 for page in pages if page['needs_ocr'] or page['text'].strip())
+            is_image_based = bool(ocr_pages) and len(ocr_pages) == content_pages
+            if not ocr_texts:
+                extraction_method = "normal"
+            elif is_image_based:
                 extraction_method = "ocr"
             else:
-                print(f"📄 PDF detectado como texto, extraindo normalmente...")
-                final_text = self._extract_text_normal(file_path)
-                extraction_method = "normal"
+                extraction_method = "mixed"
             
             # Preparar resultado
             result = {
                 'file_path': file_path,
-                'file_name': os.path.basename(file_path),
+                'file_name': file_name,
                 'file_size': os.path.getsize(file_path),
                 'text': final_text,
                 'text_length': len(final_text),
-                'pages': metadata.get('pages', 0),
-                'title': metadata.get('title', ''),
-                'author': metadata.get('author', ''),
-                'subject': metadata.get('subject', ''),
+                'pages': len(pages),
+                'page_offsets': page_offsets,
+                'ocr_pages': ocr_pages,
+                'title': document['title'],
+                'author': document['author'],
+                'subject': document['subject'],
                 'processed_at': datetime.now().isoformat(),
                 'file_hash': file_hash,
+                'hash_algorithm': HASH_ALGORITHM,
                 'extraction_method': extraction_method,
                 'is_image_based': is_image_based
             }
             
             # Salvar no cache
-            self.cache[file_hash] = result
-            self._save_cache()
+            self.cache.put(file_hash, result)
             
             return result
             
@@ -192,34 +328,17 @@ class PDFProcessor:
             return {
                 'error': f'Erro ao processar PDF: {str(e)}',
                 'file_path': file_path,
-                'file_name': os.path.basename(file_path)
+                'file_name': file_name
             }
     
-    def _extract_metadata(self, file_path: str) -> Dict:
-        """Extrai metadados do PDF"""
-        try:
-            with open(file_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                info = pdf_reader.metadata
-                
-                return {
-                    'pages': len(pdf_reader.pages),
-                    'title': info.get('/Title', ''),
-                    'author': info.get('/Author', ''),
-                    'subject': info.get('/Subject', ''),
-                    'creator': info.get('/Creator', ''),
-                    'producer': info.get('/Producer', '')
-                }
-        except:
-            return {'pages': 0}
-    
     def get_uploaded_pdfs(self) -> List[Dict]:
         """Lista todos os PDFs processados"""
         pdfs = []
-        for file_hash, data in self.cache.items():
+        # Só os metadados: o texto dos documentos não é lido
+        for data in self.cache.all():
             if os.path.exists(data['file_path']):
                 pdfs.append({
-                    'hash': file_hash,
+                    'hash': data['file_hash'],
                     'name': data['file_name'],
                     'size': data['file_size'],
                     'pages': data.get('pages', 0),
@@ -231,8 +350,7 @@ class PDFProcessor:
                     'is_image_based': data.get('is_image_based', False)
                 })
         
-        # Ordenar por data de processamento (mais recente primeiro)
-        pdfs.sort(key=lambda x: x['processed_at'], reverse=True)
+        # Já vêm ordenados por data de processamento (mais recente primeiro)
         return pdfs
     
     def get_pdf_context(self, file_hash: str, max_length: int = 2000) -> Optional[str]:
@@ -240,10 +358,10 @@ class PDFProcessor:
         Obtém contexto do PDF para usar no chat
         Limita o tamanho para não sobrecarregar o modelo
         """
-        if file_hash not in self.cache:
+        data = self.cache.load(file_hash)
+        if data is None:
             return None
         
-        data = self.cache[file_hash]
         text = data.get('text', '')
         
         if not text:
@@ -261,19 +379,19 @@ class PDFProcessor:
     
     def delete_pdf(self, file_hash: str) -> bool:
         """Remove PDF do cache e arquivo"""
-        if file_hash not in self.cache:
+        data = self.cache.get(file_hash)
+        if data is None:
             return False
         
         try:
-            file_path = self.cache[file_hash]['file_path']
+            file_path = data['file_path']
             
             # Remover arquivo
             if os.path.exists(file_path):
                 os.remove(file_path)
             
             # Remover do cache
-            del self.cache[file_hash]
-            self._save_cache()
+            self.cache.delete(file_hash)
             
             return True
         except Exception as e:
@@ -282,5 +400,4 @@ class PDFProcessor:
     
     def clear_cache(self):
         """Limpa todo o cache"""
-        self.cache = {}
-        self._save_cache() 
\ No newline at end of file
+        self.cache.clear() 
\ No newline at end of file
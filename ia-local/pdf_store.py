@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Armazenamento dos PDFs processados do Chatbot de IA Local
+Os metadados (nome, páginas, título...) ficam em uma tabela pequena e o
+texto extraído em outra, no mesmo banco SQLite: listar os PDFs não lê o
+texto de nenhum documento, e o texto de um PDF só é lido quando é usado.
+Cada upload ou remoção grava só aquele documento, em uma transação.
+O pdf_cache.json do formato antigo é importado na primeira execução.
+"""
+
+import os
+import json
+import sqlite3
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    hash TEXT PRIMARY KEY,
+    file_path TEXT NOT NULL,
+    processed_at TEXT NOT NULL DEFAULT '',
+    metadata TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_documents_processed_at ON documents (processed_at);
+CREATE TABLE IF NOT EXISTS texts (
+    hash TEXT PRIMARY KEY REFERENCES documents (hash) ON DELETE CASCADE,
+    text TEXT NOT NULL,
+    page_offsets TEXT
+);
+"""
+
+# Campos guardados na tabela de textos, fora dos metadados
+TEXT_FIELDS = ('text', 'page_offsets')
+
+
+class PDFStore:
+    def __init__(self, db_path: str = 'cache/pdfs.db', legacy_path: Optional[str] = None):
+        """legacy_path: pdf_cache.json antigo, importado e renomeado para .migrated"""
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        with self._connect() as connection:
+            connection.executescript(SCHEMA)
+
+        if legacy_path and os.path.exists(legacy_path):
+            self._migrate_legacy(legacy_path)
+
+    @contextmanager
+    def _connect(self):
+        """Conexão curta, com commit no fim (cada thread usa a sua)"""
+        connection = sqlite3.connect(self.db_path, timeout=30)
+        connection.row_factory = sqlite3.Row
+        try:
+            connection.execute('PRAGMA journal_mode = WAL')
+            connection.execute('PRAGMA foreign_keys = ON')
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    def _migrate_legacy(self, legacy_path: str):
+        """Importa o pdf_cache.json antigo (um dicionário hash -> dados com o texto)"""
+        try:
+            with open(legacy_path, 'r', encoding='utf-8') as f:
+                documents = json.load(f)
+        except Exception as e:
+            print(f"Erro ao migrar cache de PDFs antigo: {e}")
+            return
+
+        with self._connect() as connection:
+            for file_hash, data in documents.items():
+                self._put(connection, file_hash, data)
+        os.replace(legacy_path, legacy_path + '.migrated')
+        print(f"📦 {len(documents)} PDFs importados de {legacy_path}")
+
+    @staticmethod
+    def _put(connection: sqlite3.Connection, file_hash: str, data: Dict):
+        metadata = {key: value for key, value in data.items() if key not in TEXT_FIELDS}
+        connection.execute(
+            'INSERT OR REPLACE INTO documents (hash, file_path, processed_at, metadata) VALUES (?, ?, ?, ?)',
+            (file_hash, data['file_path'], data.get('processed_at', ''), json.dumps(metadata, ensure_ascii=False))
+        )
+        connection.execute(
+            'INSERT OR REPLACE INTO texts (hash, text, page_offsets) VALUES (?, ?, ?)',
+            (file_hash, data.get('text', ''), json.dumps(data.get('page_offsets')))
+        )
+
+    def put(self, file_hash: str, data: Dict):
+        """Grava (ou substitui) um documento: metadados e texto juntos, numa transação"""
+        with self._connect() as connection:
+            self._put(connection, file_hash, data)
+
+    def get(self, file_hash: str) -> Optional[Dict]:
+        """Metadados do documento, sem o texto (None se não existe)"""
+        with self._connect() as connection:
+            row = connection.execute('SELECT metadata FROM documents WHERE hash = ?', (file_hash,)).fetchone()
+        return json.loads(row['metadata']) if row else None
+
+    def load(self, file_hash: str) -> Optional[Dict]:
+        """Documento completo, com o texto e onde começa cada página"""
+        with self._connect() as connection:
+            row = connection.execute(
+                'SELECT documents.metadata, texts.text, texts.page_offsets FROM documents '
+                'LEFT JOIN texts ON texts.hash = documents.hash WHERE documents.hash = ?',
+                (file_hash,)
+            ).fetchone()
+        if row is None:
+            return None
+        data = json.loads(row['metadata'])
+        data['text'] = row['text'] or ''
+        data['page_offsets'] = json.loads(row['page_offsets']) if row['page_offsets'] else None
+        return data
+
+    def __contains__(self, file_hash: str) -> bool:
+        with self._connect() as connection:
+            return connection.execute('SELECT 1 FROM documents WHERE hash = ?', (file_hash,)).fetchone() is not None
+
+    def legacy_hashes(self) -> List[str]:
+        """Documentos guardados pelo MD5 (sem hash_algorithm nos metadados)"""
+        with self._connect() as connection:
+            rows = connection.execute(
+                "SELECT hash FROM documents WHERE json_extract(metadata, '$.hash_algorithm') IS NULL").fetchall()
+        return [row['hash'] for row in rows]
+
+    def rekey(self, old_hash: str, new_hash: str, hash_algorithm: str) -> bool:
+        """Passa um documento para outra chave, numa transação; False se ele não existe"""
+        data = self.load(old_hash)
+        if data is None:
+            return False
+        data.update(file_hash=new_hash, hash_algorithm=hash_algorithm)
+        with self._connect() as connection:
+            connection.execute('DELETE FROM documents WHERE hash = ?', (old_hash,))
+            self._put(connection, new_hash, data)
+        return True
+
+    def all(self) -> List[Dict]:
+        """Metadados de todos os documentos, do processado mais recentemente para o mais antigo"""
+        with self._connect() as connection:
+            rows = connection.execute(
+                'SELECT hash, metadata FROM documents ORDER BY processed_at DESC').fetchall()
+        return [dict(json.loads(row['metadata']), file_hash=row['hash']) for row in rows]
+
+    def delete(self, file_hash: str) -> bool:
+        with self._connect() as connection:
+            return connection.execute('DELETE FROM documents WHERE hash = ?', (file_hash,)).rowcount > 0
+
+    def clear(self):
+        with self._connect() as connection:
+            connection.execute('DELETE FROM documents')
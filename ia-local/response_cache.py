@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Cache de respostas do Chatbot de IA Local
+Em sala de aula as mesmas perguntas se repetem ("o que é internet?") e cada
+uma custa de 30 a 60 segundos de CPU. As respostas ficam em memória,
+indexadas pelo modelo, pelos PDFs usados e pela pergunta normalizada
+(minúsculas, sem acentos, pontuação e artigos), então pequenas variações da
+mesma pergunta também acertam. As demais palavras ficam: "quando" e "onde",
+ou "tem" e "não tem", pedem respostas diferentes. Entradas vencem pelo TTL e,
+passando do limite de entradas ou de bytes, as menos usadas saem primeiro.
+"""
+
+import re
+import time
+import hashlib
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional
+
+ARTICLES = {'a', 'o', 'as', 'os', 'um', 'uma', 'uns', 'umas'}
+
+_WORD = re.compile(r'\w+')
+
+
+def normalize_question(message: str) -> str:
+    """Pergunta normalizada: 'O que é a Internet?' e 'que e internet' viram 'que e internet'"""
+    text = ''.join(c for c in unicodedata.normalize('NFKD', message.lower()) if not unicodedata.combining(c))
+    return ' '.join(word for word in _WORD.findall(text) if word not in ARTICLES)
+
+
+class ResponseCache:
+    def __init__(self, ttl: float = 86400, max_entries: int = 500, max_bytes: int = 5 * 1024 * 1024):
+        """max_entries = 0 desativa o cache"""
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: 'OrderedDict[str, Dict]' = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'bypassed': 0, 'evictions': 0, 'expired': 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    @staticmethod
+    def key(message: str, model: str, documents: Iterable[str] = ()) -> Optional[str]:
+        """Chave da pergunta; None se a pergunta não tem nenhuma palavra"""
+        question = normalize_question(message)
+        if not question:
+            return None
+        raw = '\x00'.join([model, ','.join(sorted(documents)), question])
+        return hashlib.blake2b(raw.encode('utf-8'), digest_size=16).hexdigest()
+
+    def get(self, key: Optional[str]) -> Optional[Dict]:
+        """Resposta guardada para a chave (e a marca como usada recentemente)"""
+        if key is None or not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() >= entry['expires_at']:
+                self._remove(key)
+                self._stats['expired'] += 1
+                entry = None
+            if entry is None:
+                self._stats['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats['hits'] += 1
+            return entry['value']
+
+    def bypass(self):
+        """Registra uma consulta que pediu para não usar o cache"""
+        with self._lock:
+            self._stats['bypassed'] += 1
+
+    def put(self, key: Optional[str], value: Dict):
+        if key is None or not self.enabled:
+            return
+        size = len(value.get('response', '').encode('utf-8'))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = {'value': value, 'size': size, 'expires_at': time.monotonic() + self.ttl}
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self._stats['evictions'] += 1
+
+    def _remove(self, key: str):
+        self._bytes -= self._entries.pop(key)['size']
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict:
+        """Contadores, taxa de acerto e ocupação do cache"""
+        with self._lock:
+            lookups = self._stats['hits'] + self._stats['misses']
+            return dict(self._stats,
+                        hit_rate=round(self._stats['hits'] / lookups, 3) if lookups else 0.0,
+                        entries=len(self._entries), bytes=self._bytes,
+                        max_entries=self.max_entries, max_bytes=self.max_bytes)
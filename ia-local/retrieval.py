@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+"""
+Busca de trechos dos PDFs para o Chatbot de IA Local
+Cada PDF processado é dividido em trechos com sobreposição e indexado
+(BM25, busca por palavras). Na conversa, só os trechos mais relevantes para
+a pergunta vão para o prompt, dentro de um limite de tokens, em vez do
+começo do documento. Opcionalmente os trechos também recebem embeddings
+(pelo Ollama) e as duas buscas são combinadas.
+"""
+
+import os
+import re
+import json
+import math
+import bisect
+import threading
+import unicodedata
+from collections import Counter
+from itertools import zip_longest
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# Parâmetros do BM25
+BM25_K1 = 1.5
+BM25_B = 0.75
+# Constante da fusão por posição (reciprocal rank fusion) entre BM25 e embeddings
+RRF_K = 60
+
+STOPWORDS = set("""
+a o as os um uma uns umas de da do das dos e em no na nos nas ao aos à às
+para pra por pelo pela pelos pelas com sem que se é são ser foi era está
+estão como mas ou mais menos muito já não sim também qual quais quando onde
+quem sobre entre até este esta estes estas esse essa isso isto aquele aquela
+ele ela eles elas seu sua seus suas meu minha nosso nossa lhe me te nós vocês
+você há tem ter sua the of and to in is are for on with what how
+""".split())
+
+_WORD = re.compile(r'\w+')
+
+
+def _strip_accents(text: str) -> str:
+    return ''.join(c for c in unicodedata.normalize('NFKD', text) if not unicodedata.combining(c))
+
+
+def tokenize(text: str) -> List[str]:
+    """Palavras normalizadas: minúsculas, sem acento, sem stopwords e sem o plural em 's'"""
+    tokens = []
+    for word in _WORD.findall(text.lower()):
+        if word in STOPWORDS or len(word) < 2:
+            continue
+        word = _strip_accents(word)
+        if len(word) > 3 and word.endswith('s'):
+            word = word[:-1]
+        tokens.append(word)
+    return tokens
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimativa de tokens do modelo (~4 caracteres por token em português)"""
+    return len(text) // 4 + 1
+
+
+def split_chunks(text: str, page_offsets: Optional[List[int]] = None,
+                 chunk_words: int = 150, overlap_words: int = 30) -> List[Dict]:
+    """
+    Divide o texto em trechos de chunk_words palavras, repetindo overlap_words
+    palavras entre um trecho e o seguinte. Com page_offsets (onde começa cada
+    página no texto), cada trecho guarda a página em que começa.
+    """
+    words = [match.span() for match in re.finditer(r'\S+', text)]
+    if not words:
+        return []
+
+    step = max(1, chunk_words - overlap_words)
+    chunks = []
+    for first in range(0, len(words), step):
+        last = min(first + chunk_words, len(words)) - 1
+        start, end = words[first][0], words[last][1]
+        page = bisect.bisect_right(page_offsets, start) if page_offsets else None
+        chunks.append({'text': text[start:end], 'page': page})
+        if last == len(words) - 1:
+            break
+    return chunks
+
+
+def _cosine(a: List[float], b: List[float]) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+
+class Retriever:
+    def __init__(self, index_dir: str = 'cache/index', chunk_words: int = 150, overlap_words: int = 30,
+                 embed: Optional[Callable[[str], List[float]]] = None):
+        """
+        index_dir: um arquivo JSON por documento com os seus trechos
+        embed(texto) -> vetor: opcional, ativa a busca por embeddings
+        """
+        self.index_dir = index_dir
+        self.chunk_words = chunk_words
+        self.overlap_words = overlap_words
+        self.embed = embed
+        self._lock = threading.RLock()
+        self._loaded = False
+
+        # Índice invertido: termo -> {id do trecho: frequência}
+        self._postings: Dict[str, Dict[str, int]] = {}
+        self._chunks: Dict[str, Dict] = {}
+        self._documents: Dict[str, Dict] = {}
+        self._total_length = 0
+
+        os.makedirs(index_dir, exist_ok=True)
+
+    def _path(self, doc_hash: str) -> str:
+        return os.path.join(self.index_dir, f"{doc_hash}.json")
+
+    def _ensure_loaded(self):
+        """Carrega os índices salvos na primeira busca"""
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            for filename in os.listdir(self.index_dir):
+                if not filename.endswith('.json'):
+                    continue
+                try:
+                    with open(os.path.join(self.index_dir, filename), 'r', encoding='utf-8') as f:
+                        data = json.load(f)
+                    self._add_to_memory(filename[:-len('.json')], data['name'], data['chunks'])
+                except Exception as e:
+                    print(f"Erro ao carregar índice {filename}: {e}")
+            self._loaded = True
+
+    def _add_to_memory(self, doc_hash: str, name: str, chunks: List[Dict]):
+        self._remove_from_memory(doc_hash)
+        chunk_ids = []
+        for i, chunk in enumerate(chunks):
+            chunk_id = f"{doc_hash}:{i}"
+            terms = Counter(tokenize(chunk['text']))
+            self._chunks[chunk_id] = {
+                'doc': doc_hash,
+                'page': chunk.get('page'),
+                'text': chunk['text'],
+                'length': sum(terms.values()),
+                'embedding': chunk.get('embedding')
+            }
+            self._total_length += self._chunks[chunk_id]['length']
+            for term, frequency in terms.items():
+                self._postings.setdefault(term, {})[chunk_id] = frequency
+            chunk_ids.append(chunk_id)
+        self._documents[doc_hash] = {'name': name, 'chunks': chunk_ids}
+
+    def _remove_from_memory(self, doc_hash: str):
+        document = self._documents.pop(doc_hash, None)
+        if not document:
+            return
+        for chunk_id in document['chunks']:
+            chunk = self._chunks.pop(chunk_id)
+            self._total_length -= chunk['length']
+            for term in set(tokenize(chunk['text'])):
+                postings = self._postings.get(term)
+                if postings is not None:
+                    postings.pop(chunk_id, None)
+                    if not postings:
+                        del self._postings[term]
+
+    def add_document(self, doc_hash: str, name: str, text: str,
+                     page_offsets: Optional[List[int]] = None) -> int:
+        """Divide o documento em trechos, indexa e salva; retorna o número de trechos"""
+        chunks = split_chunks(text, page_offsets, self.chunk_words, self.overlap_words)
+        if self.embed is not None:
+            try:
+                for chunk in chunks:
+                    chunk['embedding'] = self.embed(chunk['text'])
+            except Exception as e:
+                print(f"Erro ao gerar embeddings de {name}: {e}")
+                for chunk in chunks:
+                    chunk.pop('embedding', None)
+
+        # Gravação atômica: o índice nunca fica pela metade
+        temp_path = self._path(doc_hash) + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({'name': name, 'chunks': chunks}, f, ensure_ascii=False)
+        os.replace(temp_path, self._path(doc_hash))
+
+        self._ensure_loaded()
+        with self._lock:
+            self._add_to_memory(doc_hash, name, chunks)
+        return len(chunks)
+
+    def remove_document(self, doc_hash: str):
+        self._ensure_loaded()
+        with self._lock:
+            self._remove_from_memory(doc_hash)
+        if os.path.exists(self._path(doc_hash)):
+            os.remove(self._path(doc_hash))
+
+    def rename_document(self, old_hash: str, new_hash: str):
+        """Passa o índice de um documento para outro hash, sem dividir o texto de novo"""
+        if not os.path.exists(self._path(old_hash)):
+            return
+        self._ensure_loaded()
+        with self._lock:
+            with open(self._path(old_hash), 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            os.replace(self._path(old_hash), self._path(new_hash))
+            self._remove_from_memory(old_hash)
+            self._add_to_memory(new_hash, data['name'], data['chunks'])
+
+    def has_document(self, doc_hash: str) -> bool:
+        self._ensure_loaded()
+        return doc_hash in self._documents
+
+    def _bm25(self, query_terms: List[str], documents: Optional[set]) -> Dict[str, float]:
+        total_chunks = len(self._chunks)
+        average_length = self._total_length / total_chunks if total_chunks else 0
+        scores: Dict[str, float] = {}
+        for term in set(query_terms):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (total_chunks - len(postings) + 0.5) / (len(postings) + 0.5))
+            for chunk_id, frequency in postings.items():
+                chunk = self._chunks[chunk_id]
+                if documents is not None and chunk['doc'] not in documents:
+                    continue
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * chunk['length'] / (average_length or 1))
+                scores[chunk_id] = scores.get(chunk_id, 0.0) + idf * frequency * (BM25_K1 + 1) / (frequency + norm)
+        return scores
+
+    def _embedding_ranking(self, query: str, documents: Optional[set]) -> List[str]:
+        if self.embed is None:
+            return []
+        try:
+            query_vector = self.embed(query)
+        except Exception as e:
+            print(f"Erro no embedding da pergunta: {e}")
+            return []
+        scored = [
+            (_cosine(query_vector, chunk['embedding']), chunk_id)
+            for chunk_id, chunk in self._chunks.items()
+            if chunk.get('embedding') and (documents is None or chunk['doc'] in documents)
+        ]
+        scored.sort(reverse=True)
+        return [chunk_id for score, chunk_id in scored if score > 0]
+
+    def search(self, query: str, top_k: int = 5, documents: Optional[Iterable[str]] = None,
+               per_document: bool = False) -> List[Dict]:
+        """
+        Trechos mais relevantes para a pergunta (opcionalmente só de alguns
+        documentos). Com per_document, top_k vale para cada documento.
+        """
+        self._ensure_loaded()
+        documents = set(documents) if documents is not None else None
+        with self._lock:
+            bm25 = self._bm25(tokenize(query), documents)
+            ranking = sorted(bm25, key=lambda chunk_id: (-bm25[chunk_id], chunk_id))
+            dense = self._embedding_ranking(query, documents)
+            if dense:
+                # Combina as duas ordens: quem aparece bem nas duas sobe
+                fused: Dict[str, float] = {}
+                for order in (ranking, dense):
+                    for position, chunk_id in enumerate(order):
+                        fused[chunk_id] = fused.get(chunk_id, 0.0) + 1 / (RRF_K + position + 1)
+                ranking = sorted(fused, key=lambda chunk_id: (-fused[chunk_id], chunk_id))
+                scores = fused
+            else:
+                scores = bm25
+
+            if per_document:
+                taken: Counter = Counter()
+                kept = []
+                for chunk_id in ranking:
+                    doc_hash = self._chunks[chunk_id]['doc']
+                    if taken[doc_hash] < top_k:
+                        taken[doc_hash] += 1
+                        kept.append(chunk_id)
+                ranking = kept
+            else:
+                ranking = ranking[:top_k]
+            return [self._result(chunk_id, scores[chunk_id]) for chunk_id in ranking]
+
+    def _result(self, chunk_id: str, score: float) -> Dict:
+        chunk = self._chunks[chunk_id]
+        return {
+            'doc': chunk['doc'],
+            'name': self._documents[chunk['doc']]['name'],
+            'page': chunk['page'],
+            'text': chunk['text'],
+            'score': round(score, 4)
+        }
+
+    def leading_chunks(self, doc_hash: str, count: int) -> List[Dict]:
+        """Primeiros trechos do documento (quando a pergunta não casa com nada)"""
+        self._ensure_loaded()
+        with self._lock:
+            document = self._documents.get(doc_hash)
+            if not document:
+                return []
+            return [self._result(chunk_id, 0.0) for chunk_id in document['chunks'][:count]]
+
+    def select_chunks(self, query: str, documents: List[str], token_budget: int,
+                      top_k: int = 8) -> List[Dict]:
+        """
+        Trechos relevantes que cabem em token_budget, na ordem de relevância
+        Com vários documentos a busca é uma só sobre os trechos de todos e o
+        orçamento é compartilhado, alternando entre os documentos que têm
+        trechos relevantes.
+        """
+        results = self.search(query, top_k=top_k, documents=documents, per_document=len(documents) > 1)
+        if not results:
+            # Começo de cada documento, alternando entre eles
+            leading = [self.leading_chunks(doc_hash, top_k) for doc_hash in documents]
+            results = [chunk for group in zip_longest(*leading) for chunk in group if chunk]
+        elif len(documents) > 1:
+            results = self._fair_share(results, top_k)
+
+        selected, used = [], 0
+        for result in results:
+            cost = estimate_tokens(result['text'])
+            if used + cost > token_budget:
+                continue
+            selected.append(result)
+            used += cost
+        return selected
+
+    @staticmethod
+    def _fair_share(results: List[Dict], top_k: int) -> List[Dict]:
+        """
+        Até top_k resultados alternando entre os documentos (o melhor de cada
+        um, depois o segundo melhor...), para que o orçamento de tokens não
+        fique todo com um só; documentos com poucos trechos relevantes
+        deixam as vagas para os outros
+        """
+        by_document: Dict[str, List[Dict]] = {}
+        for result in results:
+            by_document.setdefault(result['doc'], []).append(result)
+        interleaved = [result for group in zip_longest(*by_document.values()) for result in group if result]
+        return interleaved[:top_k]
+
+def format_context(chunks: List[Dict]) -> Tuple[str, List[Dict]]:
+    """Monta o contexto do prompt com os trechos e a lista de fontes (arquivo e página)"""
+    parts, sources = [], []
+    for chunk in chunks:
+        where = f"{chunk['name']}, p. {chunk['page']}" if chunk['page'] else chunk['name']
+        parts.append(f"[{where}]\n{chunk['text']}")
+        source = {'doc': chunk['doc'], 'name': chunk['name'], 'page': chunk['page']}
+        if source not in sources:
+            sources.append(source)
+    return '\n\n'.join(parts), sources
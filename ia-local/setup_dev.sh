@@ -115,7 +115,7 @@ echo ""
 echo "🔧 Comandos úteis:"
 echo "   - Desativar venv: deactivate"
 echo "   - Reinstalar dependências: pip install -r requirements.txt"
-echo "   - Ver logs: tail -f logs/chat_history.json"
+echo "   - Ver logs: tail -f logs/chat_history.jsonl"
 echo ""
 echo "📚 Documentação:"
 echo "   - README.md: Documentação geral"
@@ -10,6 +10,7 @@ class ChatbotUI {
         this.exportButton = document.getElementById('export-chat');
         this.clearPdfsButton = document.getElementById('clear-pdfs');
         this.loadingOverlay = document.getElementById('loading-overlay');
+        this.loadingText = document.getElementById('loading-text');
         this.connectionStatus = document.getElementById('connection-status');
         this.connectionText = document.getElementById('connection-text');
         this.modelInfo = document.getElementById('model-info');
@@ -28,7 +29,8 @@ class ChatbotUI {
         this.progressFill = document.getElementById('progress-fill');
         this.progressText = document.getElementById('progress-text');
         
-        this.activePdfHash = null;
+        this.activePdfHashes = [];  // PDFs usados como contexto (um ou vários)
+        this.sessionId = this.newSessionId();  // Memória da conversa no servidor
         this.pdfs = [];
         
         this.setupEventListeners();
@@ -178,7 +180,7 @@ class ChatbotUI {
             const imageBased = pdf.is_image_based ? ' (Imagem)' : '';
             
             return `
-                <div class="pdf-item ${pdf.hash === this.activePdfHash ? 'active' : ''}" data-hash="${pdf.hash}">
+                <div class="pdf-item ${this.activePdfHashes.includes(pdf.hash) ? 'active' : ''}" data-hash="${pdf.hash}">
                     <div class="pdf-item-header">
                         <div>
                             <div class="pdf-item-title">
@@ -208,33 +210,40 @@ class ChatbotUI {
             item.addEventListener('click', (e) => {
                 if (!e.target.closest('.pdf-action-btn')) {
                     const hash = item.dataset.hash;
-                    this.setActivePDF(hash);
+                    this.toggleActivePDF(hash);
                 }
             });
         });
     }
 
-    setActivePDF(hash) {
-        this.activePdfHash = hash;
-        this.renderPDFList();
-        this.updatePDFStatus();
-        
-        // Add system message about active PDF
+    toggleActivePDF(hash) {
+        // Clicar em um PDF o adiciona ou remove do contexto da conversa
         const pdf = this.pdfs.find(p => p.hash === hash);
-        if (pdf) {
-            const methodInfo = pdf.extraction_method === 'ocr' ? ' (processado com OCR)' : '';
-            this.addMessage(`📄 PDF ativo: "${pdf.name}"${methodInfo} - Agora a IA responderá baseada neste documento.`, 'system');
+        if (this.activePdfHashes.includes(hash)) {
+            this.activePdfHashes = this.activePdfHashes.filter(h => h !== hash);
+            if (pdf) {
+                this.addMessage(`📄 PDF "${pdf.name}" removido do contexto.`, 'system');
+            }
+        } else {
+            this.activePdfHashes.push(hash);
+            if (pdf) {
+                const methodInfo = pdf.extraction_method === 'ocr' ? ' (processado com OCR)' : '';
+                const total = this.activePdfHashes.length;
+                const scope = total > 1 ? `nestes ${total} documentos` : 'neste documento';
+                this.addMessage(`📄 PDF ativo: "${pdf.name}"${methodInfo} - Agora a IA responderá baseada ${scope}.`, 'system');
+            }
         }
+        this.renderPDFList();
+        this.updatePDFStatus();
     }
 
     updatePDFStatus() {
-        if (this.activePdfHash) {
-            const activePdf = this.pdfs.find(pdf => pdf.hash === this.activePdfHash);
-            if (activePdf) {
-                this.pdfStatus.style.display = 'block';
-                this.pdfInfo.textContent = `PDF ativo: ${activePdf.name}`;
-                this.pdfStatus.querySelector('.status-content').classList.add('active');
-            }
+        const activePdfs = this.pdfs.filter(pdf => this.activePdfHashes.includes(pdf.hash));
+        if (activePdfs.length) {
+            const label = activePdfs.length > 1 ? 'PDFs ativos' : 'PDF ativo';
+            this.pdfStatus.style.display = 'block';
+            this.pdfInfo.textContent = `${label}: ${activePdfs.map(pdf => pdf.name).join(', ')}`;
+            this.pdfStatus.querySelector('.status-content').classList.add('active');
         } else {
             this.pdfStatus.style.display = 'none';
             this.pdfStatus.querySelector('.status-content').classList.remove('active');
@@ -290,21 +299,25 @@ class ChatbotUI {
         this.showLoading();
         
         const formData = new FormData();
-        formData.append('pdf', file);
+        formData.append('pdf_file', file);
         
         try {
-            const response = await fetch('/api/pdfs', {
+            const response = await fetch('/api/upload-pdf', {
                 method: 'POST',
                 body: formData
             });
             
             const data = await response.json();
+            this.hideLoading();
             
-            if (response.ok) {
+            if (!response.ok) {
+                this.addMessage(`❌ Erro ao carregar PDF: ${data.error}`, 'system');
+            } else if (data.job) {
+                // O processamento continua em segundo plano
+                await this.waitForPDFJob(data.job, file.name);
+            } else {
                 this.addMessage(`✅ PDF "${file.name}" carregado com sucesso!`, 'system');
                 await this.loadPDFs();
-            } else {
-                this.addMessage(`❌ Erro ao carregar PDF: ${data.error}`, 'system');
             }
         } catch (error) {
             this.addMessage('❌ Erro de conexão ao carregar PDF', 'system');
@@ -313,6 +326,37 @@ class ChatbotUI {
         }
     }
 
+    async waitForPDFJob(job, fileName) {
+        // Acompanha a tarefa de processamento até terminar
+        const statusMessage = this.addMessage(`⏳ Processando "${fileName}"...`, 'system');
+        const statusBody = statusMessage.querySelector('.message-body');
+        
+        while (job.status === 'queued' || job.status === 'running') {
+            if (job.status === 'queued') {
+                statusBody.textContent = `⏳ "${fileName}" aguardando na fila...`;
+            } else if (job.progress.total > 0) {
+                statusBody.textContent = `📷 OCR de "${fileName}": página ${job.progress.done} de ${job.progress.total}`;
+            } else {
+                statusBody.textContent = `⏳ Processando "${fileName}"...`;
+            }
+            await new Promise(resolve => setTimeout(resolve, 1000));
+            
+            const response = await fetch(`/api/jobs/${job.id}`);
+            if (!response.ok) {
+                statusBody.textContent = '❌ Tarefa de processamento não encontrada';
+                return;
+            }
+            job = (await response.json()).job;
+        }
+        
+        if (job.status === 'done') {
+            statusBody.textContent = `✅ PDF "${fileName}" carregado com sucesso!`;
+            await this.loadPDFs();
+        } else {
+            statusBody.textContent = `❌ Erro ao carregar PDF: ${job.error}`;
+        }
+    }
+
     async deletePDF(hash) {
         if (!confirm('Tem certeza que deseja remover este PDF?')) {
             return;
@@ -329,8 +373,8 @@ class ChatbotUI {
                 this.addMessage(`✅ ${data.message}`, 'system');
                 
                 // Remove from active if it was active
-                if (this.activePdfHash === hash) {
-                    this.activePdfHash = null;
+                if (this.activePdfHashes.includes(hash)) {
+                    this.activePdfHashes = this.activePdfHashes.filter(h => h !== hash);
                     this.updatePDFStatus();
                 }
                 
@@ -356,7 +400,7 @@ class ChatbotUI {
                 });
             }
 
-            this.activePdfHash = null;
+            this.activePdfHashes = [];
             this.updatePDFStatus();
             this.loadPDFs();
             this.addMessage('✅ Todos os PDFs foram removidos.', 'system');
@@ -380,7 +424,7 @@ class ChatbotUI {
         this.showLoading();
         
         try {
-            const response = await fetch('/api/chat', {
+            const response = await fetch('/api/chat/stream', {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json',
@@ -388,17 +432,48 @@ class ChatbotUI {
                 body: JSON.stringify({
                     message: message,
                     model: selectedModel,
-                    pdf_context: this.activePdfHash
+                    pdf_context: this.activePdfHashes,
+                    session_id: this.sessionId
                 })
             });
 
-            const data = await response.json();
-            
-            if (response.ok) {
-                this.addMessage(data.response, 'ai');
-            } else {
-                this.addMessage(`Erro: ${data.error}`, 'system');
+            if (!response.ok) {
+                const data = await response.json();
+                if (response.status === 429 && data.retry_after) {
+                    // Fila cheia ou muitas mensagens seguidas
+                    this.addMessage(`⏳ ${data.error} (tente de novo em ${data.retry_after}s)`, 'system');
+                } else {
+                    this.addMessage(`Erro: ${data.error}`, 'system');
+                }
+                return;
             }
+
+            // Os tokens aparecem na mensagem da IA conforme chegam
+            let aiMessage = null;
+            let text = '';
+            await this.readEventStream(response, (event, data) => {
+                if (event === 'queue') {
+                    this.loadingText.textContent = `Aguardando na fila: posição ${data.position}`;
+                } else if (event === 'token') {
+                    if (!aiMessage) {
+                        this.hideLoading();
+                        aiMessage = this.addMessage('', 'ai');
+                    }
+                    text += data.token;
+                    aiMessage.querySelector('.message-body').innerHTML = this.formatMessage(text);
+                    this.scrollToBottom();
+                } else if (event === 'done' && aiMessage && data.sources && data.sources.length) {
+                    // Fontes: arquivo e página dos trechos do PDF usados
+                    const sources = data.sources.map(source =>
+                        source.page ? `${source.name}, p. ${source.page}` : source.name);
+                    const footer = document.createElement('div');
+                    footer.className = 'message-sources';
+                    footer.textContent = `📄 Fontes: ${sources.join('; ')}`;
+                    aiMessage.querySelector('.message-body').appendChild(footer);
+                } else if (event === 'error') {
+                    this.addMessage(`Erro: ${data.error}`, 'system');
+                }
+            });
         } catch (error) {
             this.addMessage('Erro de conexão. Verifique se o servidor está rodando.', 'system');
         } finally {
@@ -406,6 +481,33 @@ class ChatbotUI {
         }
     }
 
+    async readEventStream(response, onEvent) {
+        // Lê uma resposta text/event-stream e chama onEvent(evento, dados) a cada evento
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+
+            let boundary;
+            while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                const block = buffer.slice(0, boundary);
+                buffer = buffer.slice(boundary + 2);
+
+                let event = 'message';
+                let data = '';
+                for (const line of block.split('\n')) {
+                    if (line.startsWith('event:')) event = line.slice(6).trim();
+                    else if (line.startsWith('data:')) data += line.slice(5).trim();
+                }
+                if (data) onEvent(event, JSON.parse(data));
+            }
+        }
+    }
+
     addMessage(content, type) {
         const messageDiv = document.createElement('div');
         messageDiv.className = `message ${type}`;
@@ -441,6 +543,7 @@ class ChatbotUI {
         
         // Scroll para a última mensagem com animação suave
         this.scrollToBottom();
+        return messageDiv;
     }
 
     formatMessage(message) {
@@ -481,6 +584,14 @@ class ChatbotUI {
         }
     }
 
+    newSessionId() {
+        // crypto.randomUUID só existe em HTTPS ou localhost; na rede local o servidor é HTTP
+        if (window.crypto && crypto.randomUUID) {
+            return crypto.randomUUID();
+        }
+        return Date.now().toString(36) + Math.random().toString(36).slice(2);
+    }
+
     clearChat() {
         if (confirm('Tem certeza que deseja limpar todo o histórico de conversas?')) {
             // Manter apenas a mensagem de boas-vindas
@@ -489,19 +600,21 @@ class ChatbotUI {
             if (welcomeMessage) {
                 this.chatMessages.appendChild(welcomeMessage);
             }
+            // O modelo também esquece a conversa
+            fetch(`/api/conversations/${encodeURIComponent(this.sessionId)}`, { method: 'DELETE' }).catch(() => {});
+            this.sessionId = this.newSessionId();
         }
     }
 
     async exportChat() {
         try {
-            const response = await fetch('/api/history');
+            const response = await fetch('/api/history?limit=1');
             const data = await response.json();
             
             if (data.history && data.history.length > 0) {
-                const chatText = data.history.map(entry => {
-                    const timestamp = new Date(entry.timestamp).toLocaleString('pt-BR');
-                    return `[${timestamp}] Usuário: ${entry.user_message}\n[${timestamp}] IA: ${entry.ai_response}\n\n`;
-                }).join('');
+                // O servidor gera o texto completo, sem enviar o histórico em JSON
+                const exportResponse = await fetch('/api/history/export');
+                const chatText = await exportResponse.text();
                 
                 const blob = new Blob([chatText], { type: 'text/plain;charset=utf-8' });
                 const url = URL.createObjectURL(blob);
@@ -523,6 +636,7 @@ class ChatbotUI {
     }
 
     showLoading() {
+        this.loadingText.textContent = 'Processando sua mensagem...';
         this.loadingOverlay.classList.remove('hidden');
     }
 
@@ -0,0 +1,121 @@
+import threading
+import time
+import pytest
+import admission as admission_module
+from admission import AdmissionController, QueueFull, QueueTimeout, RateLimited
+from conftest import parse_events
+
+
+def test_fifo_queue_with_bounded_concurrency():
+    controller = AdmissionController(max_concurrent=1, max_queue=5)
+    first, second, third = (controller.enter(f'aluno{i}') for i in range(3))
+
+    assert [controller.position(t) for t in (first, second, third)] == [0, 1, 2]
+    controller.release(first)
+    assert controller.wait(second, 0) and controller.position(third) == 1
+    assert not controller.wait(third, 0.01)
+
+    # Quem desiste sai da fila sem ocupar vaga
+    fourth = controller.enter('aluno3')
+    controller.release(third)
+    assert controller.position(fourth) == 1
+    controller.release(second)
+    assert controller.wait(fourth, 0)
+
+    stats = controller.stats()
+    assert (stats['running'], stats['queued'], stats['cancelled'], stats['completed']) == (1, 0, 1, 2)
+
+
+def test_full_queue_is_rejected():
+    controller = AdmissionController(max_concurrent=1, max_queue=1)
+    controller.enter()
+    controller.enter()
+    with pytest.raises(QueueFull) as error:
+        controller.enter()
+    assert error.value.retry_after >= 1
+    assert controller.stats()['rejected_full'] == 1
+
+
+def test_queue_timeout():
+    controller = AdmissionController(max_concurrent=1, queue_timeout=0.05)
+    controller.enter()
+    with pytest.raises(QueueTimeout):
+        with controller.slot():
+            pass
+    assert controller.stats()['timeouts'] == 1 and controller.stats()['queued'] == 0
+
+
+def test_rate_limit_per_client(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(admission_module.time, 'monotonic', lambda: now[0])
+    controller = AdmissionController(rate_limit=2, rate_window=60)
+
+    controller.check_rate('a')
+    controller.check_rate('a')
+    controller.check_rate('b')
+    now[0] += 10
+    with pytest.raises(RateLimited) as error:
+        controller.check_rate('a')
+    assert error.value.retry_after == pytest.approx(50)
+    now[0] += 50
+    controller.check_rate('a')
+
+
+def test_concurrency_never_exceeds_limit():
+    controller = AdmissionController(max_concurrent=2, max_queue=20)
+    running, peak, lock = [0], [0], threading.Lock()
+
+    def work():
+        with controller.slot():
+            with lock:
+                running[0] += 1
+                peak[0] = max(peak[0], running[0])
+            time.sleep(0.01)
+            with lock:
+                running[0] -= 1
+
+    threads = [threading.Thread(target=work) for _ in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert peak[0] == 2 and controller.stats()['completed'] == 10
+
+
+def test_busy_server_answers_429(client, chatbot, ollama):
+    chatbot.admission = AdmissionController(max_concurrent=1, max_queue=0)
+    held = chatbot.admission.enter()
+
+    response = client.post('/api/chat', json={'message': 'Olá'})
+    assert response.status_code == 429
+    assert int(response.headers['Retry-After']) >= 1
+    assert client.post('/api/chat/stream', json={'message': 'Olá'}).status_code == 429
+    assert ollama.generate_requests() == []
+
+    chatbot.admission.release(held)
+    assert client.post('/api/chat', json={'message': 'Olá'}).status_code == 200
+
+
+def test_rate_limited_client_answers_429(client, chatbot):
+    chatbot.admission = AdmissionController(rate_limit=2)
+    assert client.post('/api/chat', json={'message': 'primeira'}).status_code == 200
+    assert client.post('/api/chat', json={'message': 'segunda'}).status_code == 200
+    response = client.post('/api/chat', json={'message': 'terceira'})
+    assert response.status_code == 429 and 'aguarde' in response.get_json()['error']
+
+
+def test_cached_answer_does_not_wait_in_line(client, chatbot, ollama):
+    client.post('/api/chat', json={'message': 'O que é internet?'})
+    chatbot.admission = AdmissionController(max_concurrent=1, max_queue=0)
+    chatbot.admission.enter()
+    assert client.post('/api/chat', json={'message': 'o que e internet'}).get_json()['cached'] is True
+
+
+def test_stream_reports_queue_position(client, chatbot):
+    held = chatbot.admission.enter()
+    threading.Timer(0.2, chatbot.admission.release, args=(held,)).start()
+
+    events = parse_events(client.post('/api/chat/stream', json={'message': 'Oi'}).get_data(as_text=True))
+    assert events[0] == ('queue', {'position': 1})
+    assert events[-1][0] == 'done'
+    assert chatbot.admission.stats()['running'] == 0
@@ -0,0 +1,98 @@
+import json
+import threading
+from datetime import datetime, timedelta
+from chat_history import ChatHistory
+
+
+def entry(i, model='llama2', pdf_context='', when=None):
+    when = when or datetime(2025, 1, 1) + timedelta(minutes=i)
+    return {'timestamp': when.isoformat(), 'user_message': f'Pergunta {i}',
+            'ai_response': f'Resposta {i}', 'model': model, 'pdf_context': pdf_context}
+
+
+def test_append_only_writes_one_line_per_entry(tmp_path):
+    store = ChatHistory(str(tmp_path / 'chat.jsonl'))
+    for i in range(3):
+        store.append(entry(i))
+
+    lines = (tmp_path / 'chat.jsonl').read_text(encoding='utf-8').splitlines()
+    assert [json.loads(line)['user_message'] for line in lines] == ['Pergunta 0', 'Pergunta 1', 'Pergunta 2']
+    assert [e['user_message'] for e in store.entries()] == ['Pergunta 2', 'Pergunta 1', 'Pergunta 0']
+
+
+def test_rotation_keeps_limited_backups(tmp_path):
+    store = ChatHistory(str(tmp_path / 'chat.jsonl'), max_bytes=1000, backup_count=2)
+    for i in range(100):
+        store.append(entry(i))
+
+    assert len(store.files()) == 3
+    assert all(len(open(path, 'rb').read()) <= 1000 for path in store.files())
+    entries = list(store.entries())
+    # As mais antigas foram descartadas, as mais recentes continuam em ordem
+    assert entries[0]['user_message'] == 'Pergunta 99'
+    numbers = [int(e['user_message'].split()[1]) for e in entries]
+    assert numbers == sorted(numbers, reverse=True) and len(numbers) < 100
+
+
+def test_page_filters_and_offsets(tmp_path):
+    store = ChatHistory(str(tmp_path / 'chat.jsonl'), max_bytes=2000)
+    for i in range(60):
+        store.append(entry(i, model='mistral' if i % 3 == 0 else 'llama2', pdf_context='abc' if i % 2 else ''))
+
+    page = store.page(limit=10)
+    assert [e['user_message'] for e in page['history']][:2] == ['Pergunta 59', 'Pergunta 58']
+    assert page['next_offset'] == 10
+    last = store.page(limit=10, offset=55)
+    assert [e['user_message'] for e in last['history']] == [f'Pergunta {i}' for i in range(4, -1, -1)]
+    assert last['next_offset'] is None
+
+    mistral = store.page(limit=100, model='mistral')['history']
+    assert len(mistral) == 20 and all(e['model'] == 'mistral' for e in mistral)
+    assert len(store.page(limit=100, model='mistral', pdf_context='abc')['history']) == 10
+    assert [e['user_message'] for e in store.page(query='pergunta 42')['history']] == ['Pergunta 42']
+
+    since = datetime(2025, 1, 1) + timedelta(minutes=50)
+    assert len(store.page(limit=100, since=since)['history']) == 10
+
+
+def test_concurrent_appends_are_not_lost(tmp_path):
+    store = ChatHistory(str(tmp_path / 'chat.jsonl'), max_bytes=20000, backup_count=50)
+
+    def writer(n):
+        for i in range(50):
+            store.append(entry(n * 1000 + i))
+
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(list(store.entries())) == 400
+
+
+def test_legacy_json_history_is_migrated(tmp_path):
+    legacy = tmp_path / 'chat_history.json'
+    legacy.write_text(json.dumps([entry(0), entry(1)]), encoding='utf-8')
+
+    store = ChatHistory(str(tmp_path / 'chat_history.jsonl'), legacy_path=str(legacy))
+
+    assert [e['user_message'] for e in store.entries()] == ['Pergunta 1', 'Pergunta 0']
+    assert not legacy.exists()
+
+
+def test_history_endpoint_paginates(client, chatbot):
+    for i in range(5):
+        chatbot.chat_history.append(entry(i, model='mistral' if i == 2 else 'llama2'))
+
+    data = client.get('/api/history?limit=2').get_json()
+    assert [e['user_message'] for e in data['history']] == ['Pergunta 4', 'Pergunta 3']
+    assert data['next_offset'] == 2
+    data = client.get('/api/history?limit=2&offset=4').get_json()
+    assert [e['user_message'] for e in data['history']] == ['Pergunta 0']
+    assert data['next_offset'] is None
+    assert len(client.get('/api/history?model=mistral').get_json()['history']) == 1
+    assert client.get('/api/history?limit=abc').status_code == 400
+
+    text = client.get('/api/history/export').get_data(as_text=True)
+    assert text.index('Pergunta 0') < text.index('Pergunta 4')
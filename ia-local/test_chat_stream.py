@@ -0,0 +1,79 @@
+import time
+from conftest import parse_events
+from ollama_client import OllamaTimeout
+
+
+def test_stream_relays_tokens_as_server_sent_events(client, chatbot, ollama):
+    response = client.post('/api/chat/stream', json={'message': 'Oi', 'model': 'llama2'})
+
+    assert response.status_code == 200
+    assert response.mimetype == 'text/event-stream'
+    assert response.headers['Cache-Control'] == 'no-cache'
+    events = parse_events(response.get_data(as_text=True))
+    assert [data['token'] for event, data in events if event == 'token'] == ollama.tokens
+    assert events[-1][0] == 'done'
+    assert events[-1][1]['stats']['eval_count'] == len(ollama.tokens)
+    assert ollama.generate_requests()[0]['stream'] is True
+
+    # A resposta completa vai para o histórico no fim do streaming
+    history = list(chatbot.chat_history.entries())
+    assert len(history) == 1
+    assert history[0]['ai_response'] == 'Olá, tudo bem?'
+    assert history[0]['timestamp'] == events[-1][1]['timestamp']
+
+
+def test_stream_rejects_empty_message(client, ollama):
+    response = client.post('/api/chat/stream', json={'message': '  '})
+    assert response.status_code == 400
+    assert ollama.generate_requests() == []
+
+
+def test_stream_reports_model_errors(client, chatbot, ollama):
+    ollama.status = 500
+    events = parse_events(client.post('/api/chat/stream', json={'message': 'Oi'}).get_data(as_text=True))
+    assert [event for event, data in events] == ['error']
+    assert list(chatbot.chat_history.entries()) == []
+
+
+def test_stream_reports_errors_while_building_the_prompt(client, chatbot, ollama, monkeypatch):
+    chatbot.retriever.add_document('doc', 'guia.pdf', 'A antena setorial aponta para o morro. ' * 50, [0])
+
+    # Embedding fora do ar: a busca segue só por palavras
+    def failing_embed(text):
+        raise OllamaTimeout('Timeout - o Ollama demorou muito para responder')
+    chatbot.retriever.embed = failing_embed
+    events = parse_events(client.post('/api/chat/stream', json={
+        'message': 'Para onde aponta a antena?', 'pdf_context': 'doc'}).get_data(as_text=True))
+    assert events[-1][0] == 'done' and events[-1][1]['sources']
+
+    # Erro do Ollama ao montar o prompt: o cliente recebe o evento de erro
+    def failing_select(*args, **kwargs):
+        failing_embed('')
+    monkeypatch.setattr(chatbot.retriever, 'select_chunks', failing_select)
+    events = parse_events(client.post('/api/chat/stream', json={
+        'message': 'Para onde aponta a antena?', 'pdf_context': 'doc', 'cache': False}).get_data(as_text=True))
+    assert events == [('error', {'error': 'Timeout - o modelo demorou muito para responder'})]
+    assert len(ollama.generate_requests()) == 1
+    assert chatbot.admission.stats()['running'] == 0
+
+
+def test_client_disconnect_cancels_generation(client, chatbot, ollama):
+    ollama.tokens = ['palavra '] * 200
+    ollama.token_delay = 0.01
+
+    response = client.post('/api/chat/stream', json={'message': 'Conte uma história'}, buffered=False)
+    stream = iter(response.response)
+    first = next(stream)
+    assert b'event: token' in (first if isinstance(first, bytes) else first.encode())
+    response.close()  # O navegador fechou a aba
+
+    assert ollama.cancelled.wait(timeout=5)
+    time.sleep(0.05)
+    assert list(chatbot.chat_history.entries()) == []
+
+
+def test_blocking_chat_still_works(client, chatbot, ollama):
+    response = client.post('/api/chat', json={'message': 'Oi'})
+    assert response.get_json()['response'] == 'Olá, tudo bem?'
+    assert ollama.generate_requests()[0]['stream'] is False
+    assert len(list(chatbot.chat_history.entries())) == 1
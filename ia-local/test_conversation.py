@@ -0,0 +1,107 @@
+import threading
+import time
+from conftest import parse_events
+from conversation import ConversationStore
+
+
+def test_old_turns_become_summary_within_budget():
+    store = ConversationStore(token_budget=30, summary_tokens=50)
+    store.append('s', 'O que é uma rede mesh? Quero entender.', 'Uma rede onde os nós repassam o tráfego. ' * 3)
+    assert [m['role'] for m in store.messages('s')] == ['user', 'assistant']
+
+    store.append('s', 'E o roteador?', 'Usa OpenWrt.')
+    messages = store.messages('s')
+    assert [m['role'] for m in messages] == ['system', 'user', 'assistant']
+    assert 'O que é uma rede mesh?' in messages[0]['content'] and 'Quero entender' not in messages[0]['content']
+    assert messages[1]['content'] == 'E o roteador?'
+
+    # A última troca fica mesmo passando do orçamento; o resumo não cresce sem limite
+    for i in range(20):
+        store.append('s', f'Pergunta {i} ' + 'palavra ' * 40, 'Resposta.')
+    messages = store.messages('s')
+    assert len(messages) == 3 and messages[1]['content'].startswith('Pergunta 19')
+    assert len(messages[0]['content']) <= 50 * 4 + 40
+
+
+def test_summary_from_model_runs_in_background():
+    started, finish = threading.Event(), threading.Event()
+    calls = []
+
+    def summarize(text, model):
+        calls.append((text, model))
+        started.set()
+        finish.wait(5)
+        return 'Falamos sobre redes mesh.'
+
+    store = ConversationStore(token_budget=10, summarize=summarize)
+    store.append('s', 'O que é uma rede mesh?', 'Uma rede onde os nós repassam o tráfego.')
+    store.append('s', 'E o roteador?', 'Usa OpenWrt.', model='mistral')
+    assert started.wait(5)
+    # Enquanto o modelo resume, vale o resumo simples
+    assert 'rede mesh' in store.messages('s')[0]['content']
+
+    finish.set()
+    for _ in range(100):
+        if store.messages('s')[0]['content'].endswith('Falamos sobre redes mesh.'):
+            break
+        time.sleep(0.01)
+    assert store.messages('s')[0]['content'] == 'Resumo da conversa até aqui: Falamos sobre redes mesh.'
+    assert len(calls) == 1 and calls[0][1] == 'mistral'
+
+
+def test_summary_uses_the_conversation_model(client, chatbot, ollama, monkeypatch):
+    monkeypatch.setattr(chatbot, 'conversations', ConversationStore(token_budget=10,
+                                                                    summarize=chatbot.summarize_conversation))
+    for message in ('O que é uma rede mesh?', 'E o roteador?'):
+        client.post('/api/chat', json={'message': message, 'session_id': 's', 'model': 'mistral'})
+
+    for _ in range(100):
+        if ollama.generate_requests():
+            break
+        time.sleep(0.01)
+    summary_request = ollama.generate_requests()[0]
+    assert summary_request['prompt'].startswith(chatbot.SUMMARY_PROMPT)
+    assert summary_request['model'] == 'mistral'
+
+
+def test_sessions_are_evicted_lru():
+    store = ConversationStore(max_sessions=2)
+    store.append('a', 'oi', 'olá')
+    store.append('b', 'oi', 'olá')
+    store.messages('a')
+    store.append('c', 'oi', 'olá')
+    assert store.has_history('a') and store.has_history('c') and not store.has_history('b')
+    store.clear('a')
+    assert store.stats()['sessions'] == 1
+
+
+def test_follow_up_sends_previous_turns(client, chatbot, ollama):
+    first = client.post('/api/chat', json={'message': 'O que é internet?', 'session_id': 'aba1'}).get_json()
+    assert first['response'] == 'Olá, tudo bem?'
+
+    ollama.tokens = ['É uma rede.']
+    events = parse_events(client.post('/api/chat/stream', json={'message': 'E como funciona?',
+                                                               'session_id': 'aba1'}).get_data(as_text=True))
+    assert events[-1][0] == 'done' and events[0][1]['token'] == 'É uma rede.'
+
+    messages = ollama.chat_requests()[-1]['messages']
+    assert messages == [{'role': 'user', 'content': 'O que é internet?'},
+                        {'role': 'assistant', 'content': 'Olá, tudo bem?'},
+                        {'role': 'user', 'content': 'E como funciona?'}]
+    assert ollama.generate_requests() == []
+    assert chatbot.conversations.messages('aba1')[-1]['content'] == 'É uma rede.'
+
+    # Sem session_id cada mensagem continua sozinha
+    client.post('/api/chat', json={'message': 'E como funciona?'})
+    assert ollama.generate_requests()[-1]['prompt'] == 'E como funciona?'
+
+
+def test_cache_is_skipped_mid_conversation(client, chatbot, ollama):
+    client.post('/api/chat', json={'message': 'O que é internet?'})
+    # Primeira mensagem da sessão pode vir do cache (e entra na memória)
+    assert client.post('/api/chat', json={'message': 'O que é internet?', 'session_id': 's'}).get_json()['cached']
+    response = client.post('/api/chat', json={'message': 'O que é internet?', 'session_id': 's'}).get_json()
+    assert response['cached'] is False and len(ollama.chat_requests()) == 1
+
+    client.delete('/api/conversations/s')
+    assert not chatbot.conversations.has_history('s')
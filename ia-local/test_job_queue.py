@@ -0,0 +1,191 @@
+import hashlib
+import io
+import os
+import threading
+import time
+from bench_pdf import make_pdf
+from job_queue import JobFailed, JobQueue
+
+
+def pdf_bytes(tmp_path, kinds=('text', 'text'), name='apostila.pdf', title='Apostila'):
+    path = str(tmp_path / name)
+    make_pdf(path, list(kinds), title=title)
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def upload(client, content, filename='apostila.pdf'):
+    return client.post('/api/upload-pdf', data={'pdf_file': (io.BytesIO(content), filename)},
+                       content_type='multipart/form-data')
+
+
+def test_upload_returns_job_and_processes_in_background(client, chatbot, tmp_path):
+    response = upload(client, pdf_bytes(tmp_path))
+
+    assert response.status_code == 202
+    job = response.get_json()['job']
+    assert (job['status'], job['file_name']) == ('queued', 'apostila.pdf')
+    assert client.get('/api/pdfs').get_json()['pdfs'] == []
+
+    assert chatbot.pdf_jobs.run_next()
+    job = client.get(f"/api/jobs/{job['id']}").get_json()['job']
+    assert job['status'] == 'done'
+    assert (job['result']['title'], job['result']['pages']) == ('Apostila', 2)
+    assert [pdf['hash'] for pdf in client.get('/api/pdfs').get_json()['pdfs']] == [job['file_hash']]
+
+
+def test_same_file_is_processed_once(client, chatbot, tmp_path):
+    content = pdf_bytes(tmp_path)
+    first = upload(client, content).get_json()['job']
+    second = upload(client, content, filename='copia.pdf').get_json()['job']
+
+    assert second['id'] == first['id']
+    assert os.listdir(chatbot.app.config['UPLOAD_FOLDER']) == [f"{first['file_hash']}.pdf"]
+    assert chatbot.pdf_jobs.run_next()
+    assert not chatbot.pdf_jobs.run_next()
+
+    # Depois de processado, responde na hora com os dados do PDF
+    response = upload(client, content)
+    assert response.status_code == 200
+    assert response.get_json()['pdf']['hash'] == first['file_hash']
+
+
+def test_different_files_with_same_name_are_kept(client, chatbot, tmp_path):
+    upload(client, pdf_bytes(tmp_path, title='Primeira'))
+    upload(client, pdf_bytes(tmp_path, kinds=('text',), title='Segunda'))
+    assert len(os.listdir(chatbot.app.config['UPLOAD_FOLDER'])) == 2
+
+    while chatbot.pdf_jobs.run_next():
+        pass
+    pdfs = client.get('/api/pdfs').get_json()['pdfs']
+    assert sorted(pdf['title'] for pdf in pdfs) == ['Primeira', 'Segunda']
+    assert [pdf['name'] for pdf in pdfs] == ['apostila.pdf', 'apostila.pdf']
+
+
+def test_file_is_in_place_before_the_job_is_queued(client, chatbot, tmp_path, monkeypatch):
+    submitted = []
+    original = chatbot.pdf_jobs.submit
+
+    def submit(file_hash, file_name, file_path):
+        # Um worker pode abrir o arquivo assim que a tarefa existe
+        submitted.append(os.path.exists(file_path))
+        return original(file_hash, file_name, file_path)
+
+    monkeypatch.setattr(chatbot.pdf_jobs, 'submit', submit)
+    assert upload(client, pdf_bytes(tmp_path)).status_code == 202
+    assert submitted == [True]
+
+
+def test_pdfs_processed_before_blake2_are_migrated_once(client, chatbot, tmp_path):
+    content = pdf_bytes(tmp_path)
+    legacy_hash = hashlib.md5(content).hexdigest()
+    new_hash = hashlib.blake2b(content, digest_size=16).hexdigest()
+    uploads = tmp_path / 'uploads'
+    uploads.mkdir(exist_ok=True)
+    legacy_path = uploads / 'apostila.pdf'
+    legacy_path.write_bytes(content)
+    chatbot.pdf_processor.cache.put(legacy_hash, {
+        'file_path': str(legacy_path), 'file_name': 'apostila.pdf', 'file_size': len(content),
+        'text': 'roteador mesh', 'text_length': 13, 'pages': 2, 'title': 'Apostila', 'author': '',
+        'file_hash': legacy_hash, 'processed_at': '2024-01-01T00:00:00'
+    })
+    chatbot.retriever.add_document(legacy_hash, 'apostila.pdf', 'roteador mesh')
+    chatbot.pdf_collections.save('curso', [legacy_hash])
+    job, _ = chatbot.pdf_jobs.submit(legacy_hash, 'apostila.pdf', str(legacy_path))
+
+    assert chatbot.migrate_legacy_hashes() == {legacy_hash: new_hash}
+    assert chatbot.pdf_processor.cache.load(new_hash)['text'] == 'roteador mesh'
+    assert legacy_hash not in chatbot.pdf_processor.cache
+    assert chatbot.retriever.has_document(new_hash) and not chatbot.retriever.has_document(legacy_hash)
+    assert chatbot.pdf_collections.get('curso') == [new_hash]
+    assert chatbot.pdf_jobs.get(job['id'])['file_hash'] == new_hash
+    assert chatbot.migrate_legacy_hashes() == {}
+
+    # O upload do mesmo arquivo é achado pelo hash calculado na gravação
+    response = upload(client, content, filename='copia.pdf')
+    assert response.status_code == 200
+    assert response.get_json()['pdf']['hash'] == new_hash
+    assert sorted(os.listdir(uploads)) == ['apostila.pdf']
+
+
+def test_failed_job_reports_error_and_can_be_retried(client, chatbot, tmp_path):
+    content = b'%PDF-1.4 corrompido'
+    job = upload(client, content, filename='quebrado.pdf').get_json()['job']
+    chatbot.pdf_jobs.run_next()
+
+    job = client.get(f"/api/jobs/{job['id']}").get_json()['job']
+    assert job['status'] == 'failed'
+    assert 'Erro ao processar PDF' in job['error']
+
+    retry = upload(client, content, filename='quebrado.pdf')
+    assert retry.status_code == 202
+    assert retry.get_json()['job']['status'] == 'queued'
+
+
+def test_unknown_job_returns_404(client):
+    assert client.get('/api/jobs/inexistente').status_code == 404
+
+
+def test_jobs_survive_restart(tmp_path):
+    db_path = str(tmp_path / 'jobs.db')
+    processed = []
+
+    def handler(job, progress):
+        processed.append(job['file_name'])
+        return {'ok': True}
+
+    queue = JobQueue(db_path, handler)
+    waiting, _ = queue.submit('hash-a', 'a.pdf', '/tmp/a.pdf')
+    interrupted, _ = queue.submit('hash-b', 'b.pdf', '/tmp/b.pdf')
+    queue._claim()  # O servidor "caiu" no meio desta tarefa
+
+    restarted = JobQueue(db_path, handler)
+    assert restarted.recover() == 1
+    while restarted.run_next():
+        pass
+
+    assert sorted(processed) == ['a.pdf', 'b.pdf']
+    assert restarted.get(interrupted['id'])['status'] == 'done'
+    assert restarted.get(waiting['id'])['status'] == 'done'
+
+
+def test_progress_and_errors_are_recorded(tmp_path):
+    def handler(job, progress):
+        for page in range(1, 4):
+            progress(page, 3)
+        raise JobFailed('Sem texto')
+
+    queue = JobQueue(str(tmp_path / 'jobs.db'), handler)
+    job, _ = queue.submit('hash', 'a.pdf', '/tmp/a.pdf')
+    queue.run_next()
+
+    job = queue.get(job['id'])
+    assert job['progress'] == {'done': 3, 'total': 3}
+    assert (job['status'], job['error']) == ('failed', 'Sem texto')
+
+
+def test_worker_threads_respect_concurrency_limit(tmp_path):
+    running, peak = [], []
+    lock = threading.Lock()
+
+    def handler(job, progress):
+        with lock:
+            running.append(job['id'])
+            peak.append(len(running))
+        time.sleep(0.05)
+        with lock:
+            running.remove(job['id'])
+        return {}
+
+    queue = JobQueue(str(tmp_path / 'jobs.db'), handler, workers=2)
+    queue.start()
+    try:
+        jobs = [queue.submit(f'hash-{i}', f'{i}.pdf', f'/tmp/{i}.pdf')[0] for i in range(6)]
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline and any(queue.get(job['id'])['status'] != 'done' for job in jobs):
+            time.sleep(0.02)
+    finally:
+        queue.stop()
+
+    assert all(queue.get(job['id'])['status'] == 'done' for job in jobs)
+    assert max(peak) == 2
@@ -0,0 +1,128 @@
+import socket
+import time
+import pytest
+import requests
+from ollama_client import CircuitBreaker, OllamaClient, OllamaError, OllamaTimeout, OllamaUnavailable
+
+
+def unused_url():
+    """URL de uma porta local sem ninguém escutando"""
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        port = s.getsockname()[1]
+    return f'http://127.0.0.1:{port}'
+
+
+def test_connections_are_reused(ollama):
+    client = OllamaClient(ollama.url)
+    for _ in range(5):
+        assert client.list_models() == ['llama2:latest']
+    assert client.generate('llama2', 'Oi')['response'] == 'Olá, tudo bem?'
+    assert ollama.connections == 1
+
+
+def test_idempotent_calls_retry_server_errors(ollama):
+    client = OllamaClient(ollama.url, retries=2, backoff=0)
+    ollama.fail_next = 2
+    assert client.list_models() == ['llama2:latest']
+    assert len(ollama.requests) == 3
+    assert client.breaker.state == CircuitBreaker.CLOSED
+
+
+def test_generate_is_not_retried_after_reaching_ollama(ollama):
+    client = OllamaClient(ollama.url, retries=2, backoff=0)
+    ollama.fail_next = 1
+    with pytest.raises(OllamaError) as error:
+        client.generate('llama2', 'Oi')
+    assert error.value.status_code == 503
+    assert len(ollama.generate_requests()) == 1
+
+
+def test_client_errors_raise_without_retrying(ollama):
+    client = OllamaClient(ollama.url, retries=2, backoff=0)
+    ollama.status = 404
+    with pytest.raises(OllamaError) as error:
+        client.pull('inexistente')
+    assert error.value.status_code == 404
+    assert len(ollama.requests) == 1
+    assert client.breaker.failures == 0
+
+
+def test_per_operation_timeout(ollama):
+    client = OllamaClient(ollama.url, timeouts={'tags': (1, 0.2)}, retries=0)
+    ollama.delay = 1
+    started = time.monotonic()
+    with pytest.raises(OllamaTimeout):
+        client.list_models()
+    assert time.monotonic() - started < 0.9
+
+
+def test_circuit_opens_and_fails_fast():
+    client = OllamaClient(unused_url(), retries=0, failure_threshold=3, reset_timeout=60)
+    for _ in range(3):
+        with pytest.raises(OllamaUnavailable):
+            client.list_models()
+    assert client.breaker.state == CircuitBreaker.OPEN
+
+    started = time.monotonic()
+    assert client.is_healthy() is False
+    with pytest.raises(OllamaUnavailable, match='circuito aberto'):
+        client.generate('llama2', 'Oi')
+    assert time.monotonic() - started < 0.05
+
+
+def test_half_open_circuit_closes_after_success(ollama):
+    client = OllamaClient(ollama.url, retries=0, failure_threshold=2, reset_timeout=0.1)
+    ollama.fail_next = 2
+    for _ in range(2):
+        with pytest.raises(OllamaError):
+            client.list_models()
+    assert client.breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(OllamaUnavailable):
+        client.list_models()
+
+    time.sleep(0.15)
+    assert client.breaker.state == CircuitBreaker.HALF_OPEN
+    assert client.list_models() == ['llama2:latest']
+    assert client.breaker.state == CircuitBreaker.CLOSED
+
+
+def test_unexpected_error_in_half_open_trial_settles_the_circuit(ollama, monkeypatch):
+    client = OllamaClient(ollama.url, retries=0, failure_threshold=1, reset_timeout=0.1)
+    ollama.fail_next = 1
+    with pytest.raises(OllamaError):
+        client.list_models()
+    time.sleep(0.15)
+
+    # A chamada de teste falha com um erro que não é de conexão nem timeout
+    original = client.session.request
+    def broken(*args, **kwargs):
+        raise requests.exceptions.ChunkedEncodingError('resposta truncada')
+    monkeypatch.setattr(client.session, 'request', broken)
+    with pytest.raises(OllamaError, match='resposta truncada'):
+        client.list_models()
+    assert client.breaker.state == CircuitBreaker.OPEN
+
+    # Passado o reset_timeout, uma nova chamada de teste é liberada e fecha o circuito
+    monkeypatch.setattr(client.session, 'request', original)
+    time.sleep(0.15)
+    assert client.list_models() == ['llama2:latest']
+    assert client.breaker.state == CircuitBreaker.CLOSED
+
+
+def test_generate_stream_yields_chunks(ollama):
+    client = OllamaClient(ollama.url)
+    chunks = list(client.generate_stream('llama2', 'Oi'))
+    assert ''.join(chunk['response'] for chunk in chunks) == 'Olá, tudo bem?'
+    assert chunks[-1]['done'] is True
+
+
+def test_app_degrades_when_ollama_is_down(client, chatbot, monkeypatch):
+    monkeypatch.setattr(chatbot, 'ollama', OllamaClient(unused_url(), retries=0, failure_threshold=1))
+
+    assert client.get('/api/models').get_json() == {'models': []}
+    health = client.get('/api/health').get_json()
+    assert (health['ollama'], health['circuit']) == ('disconnected', 'open')
+    response = client.post('/api/chat', json={'message': 'Oi'})
+    assert response.status_code == 503
+    assert client.get('/').status_code == 200
@@ -0,0 +1,172 @@
+import hashlib
+import io
+import PyPDF2
+import pytest
+from PIL import Image
+import pdf_processor
+from bench_pdf import make_pdf
+from pdf_processor import PDFProcessor, ocr_page_dpi
+
+
+def processor(tmp_path, **kwargs):
+    return PDFProcessor(upload_dir=str(tmp_path), cache_dir=str(tmp_path / 'cache'), **kwargs)
+
+
+def fake_ocr(calls):
+    def ocr(self, file_path, pages, progress=None):
+        calls.append(sorted(pages))
+        return {number: f'texto da imagem {number}' for number in pages}
+    return ocr
+
+
+def test_mixed_pdf_is_read_once_and_only_image_pages_go_to_ocr(tmp_path, monkeypatch):
+    path = str(tmp_path / 'misto.pdf')
+    make_pdf(path, ['text', 'image', 'blank', 'text', 'image'], title='Apostila')
+
+    readers = []
+    original = PyPDF2.PdfReader
+    monkeypatch.setattr(pdf_processor.PyPDF2, 'PdfReader', lambda *a, **k: readers.append(1) or original(*a, **k))
+    ocr_calls = []
+    monkeypatch.setattr(PDFProcessor, '_extract_text_with_ocr', fake_ocr(ocr_calls))
+
+    result = processor(tmp_path).extract_text_from_pdf(path)
+
+    assert len(readers) == 1
+    assert ocr_calls == [[2, 5]]
+    assert (result['pages'], result['ocr_pages']) == (5, [2, 5])
+    assert (result['extraction_method'], result['is_image_based']) == ('mixed', False)
+    assert (result['title'], result['author']) == ('Apostila', 'Rede Comunitária')
+
+    # Cada página começa no offset registrado, na ordem do documento
+    text, offsets = result['text'], result['page_offsets']
+    assert len(offsets) == 5 and offsets == sorted(offsets)
+    assert text[offsets[0]:].startswith('1.0 A rede')
+    assert text[offsets[1]:].startswith('--- Página 2 ---\ntexto da imagem 2')
+    assert text[offsets[3]:].startswith('4.0 A rede')
+
+
+def test_text_pdf_skips_ocr(tmp_path, monkeypatch):
+    path = str(tmp_path / 'texto.pdf')
+    make_pdf(path, ['text'] * 3)
+    ocr_calls = []
+    monkeypatch.setattr(PDFProcessor, '_extract_text_with_ocr', fake_ocr(ocr_calls))
+
+    result = processor(tmp_path).extract_text_from_pdf(path)
+
+    assert ocr_calls == []
+    assert (result['extraction_method'], result['ocr_pages']) == ('normal', [])
+    assert '3.39 A rede' in result['text']
+
+
+def test_scanned_pdf_is_image_based(tmp_path, monkeypatch):
+    path = str(tmp_path / 'escaneado.pdf')
+    make_pdf(path, ['image'] * 3)
+    monkeypatch.setattr(PDFProcessor, '_extract_text_with_ocr', fake_ocr([]))
+
+    result = processor(tmp_path).extract_text_from_pdf(path)
+
+    assert (result['extraction_method'], result['is_image_based']) == ('ocr', True)
+    assert result['ocr_pages'] == [1, 2, 3]
+
+
+def test_ocr_disabled_keeps_page_decisions(tmp_path):
+    path = str(tmp_path / 'escaneado.pdf')
+    make_pdf(path, ['text', 'image'])
+
+    result = processor(tmp_path, enable_ocr=False).extract_text_from_pdf(path)
+
+    assert result['ocr_pages'] == [2]
+    assert result['extraction_method'] == 'normal'
+
+
+class FakeRasterizer:
+    """Substitui o pdf2image e o Tesseract (que não estão instalados nos testes)"""
+
+    def __init__(self, monkeypatch):
+        self.calls = []
+        self.images = []
+        monkeypatch.setattr(pdf_processor, 'convert_from_path', self.convert)
+        monkeypatch.setattr(pdf_processor.pytesseract, 'image_to_string', self.ocr)
+
+    def convert(self, file_path, dpi, first_page, last_page, grayscale):
+        self.calls.append((first_page, last_page, dpi, grayscale))
+        image = Image.new('L' if grayscale else 'RGB', (10, 10))
+        image.info['page'] = first_page
+        self.images.append(image)
+        return [image]
+
+    def ocr(self, image, config):
+        return f"texto escaneado {image.info['page']}"
+
+
+def test_ocr_covers_every_scanned_page_one_at_a_time(tmp_path, monkeypatch):
+    path = str(tmp_path / 'apostila.pdf')
+    make_pdf(path, ['image'] * 15)
+    raster = FakeRasterizer(monkeypatch)
+    progress = []
+
+    result = processor(tmp_path, ocr_workers=0, ocr_dpi=150).extract_text_from_pdf(
+        path, progress=lambda done, total: progress.append((done, total)))
+
+    # Sem o antigo limite de 10 páginas
+    assert [call[:2] for call in raster.calls] == [(n, n) for n in range(1, 16)]
+    assert all(call[2:] == (150, True) for call in raster.calls)
+    assert '--- Página 15 ---\ntexto escaneado 15' in result['text']
+    assert progress == [(n, 15) for n in range(1, 16)]
+    # Cada imagem é liberada logo depois do OCR
+    for image in raster.images:
+        with pytest.raises(ValueError):
+            image.getpixel((0, 0))
+
+
+def test_ocr_runs_in_process_pool(tmp_path, monkeypatch):
+    path = str(tmp_path / 'escaneado.pdf')
+    make_pdf(path, ['image', 'text', 'image', 'image'])
+    FakeRasterizer(monkeypatch)
+    pdfs = processor(tmp_path, ocr_workers=2)
+    try:
+        result = pdfs.extract_text_from_pdf(path)
+    finally:
+        pdfs.close()
+
+    assert result['ocr_pages'] == [1, 3, 4]
+    assert all(f'texto escaneado {n}' in result['text'] for n in (1, 3, 4))
+    assert result['extraction_method'] == 'mixed'
+
+
+def test_memory_ceiling_lowers_dpi(tmp_path, monkeypatch):
+    a4 = (595, 842)
+    # Uma página A4 em cinza a 200 DPI ocupa ~3.9MB
+    assert ocr_page_dpi(*a4, dpi=200, grayscale=True, memory_bytes=8 * 1024 * 1024) == 200
+    assert ocr_page_dpi(*a4, dpi=200, grayscale=False, memory_bytes=8 * 1024 * 1024) == 170
+    assert ocr_page_dpi(*a4, dpi=200, grayscale=True, memory_bytes=1024) == pdf_processor.OCR_MIN_DPI
+
+    path = str(tmp_path / 'escaneado.pdf')
+    make_pdf(path, ['image'])
+    raster = FakeRasterizer(monkeypatch)
+    # 4MB divididos entre 4 processos: cada página precisa caber em 1MB (~104 DPI)
+    pdfs = processor(tmp_path, ocr_workers=4, ocr_max_memory_mb=4)
+    monkeypatch.setattr(pdfs, '_get_ocr_pool', lambda: InlinePool())
+    pdfs.extract_text_from_pdf(path)
+    assert raster.calls[0][2] == 104
+
+
+class InlinePool:
+    """Executa as tarefas na hora, no próprio processo"""
+
+    def submit(self, func, *args):
+        from concurrent.futures import Future
+        future = Future()
+        future.set_result(func(*args))
+        return future
+
+
+def test_upload_is_hashed_while_saved(tmp_path):
+    content = b'%PDF-1.4 ' + bytes(range(256)) * 10000  # Maior que o bloco de leitura
+    path = str(tmp_path / 'salvo.pdf')
+
+    file_hash = pdf_processor.save_and_hash(io.BytesIO(content), path)
+    with open(path, 'rb') as f:
+        assert f.read() == content
+    assert file_hash == hashlib.blake2b(content, digest_size=16).hexdigest()
+    assert processor(tmp_path)._get_file_hash(path) == file_hash
@@ -0,0 +1,65 @@
+import json
+import os
+from pdf_store import PDFStore
+
+
+def document(file_hash, processed_at='2024-01-01T10:00:00', text='Texto do PDF'):
+    return {
+        'file_hash': file_hash,
+        'file_path': f'/uploads/{file_hash}.pdf',
+        'file_name': f'{file_hash}.pdf',
+        'text': text,
+        'text_length': len(text),
+        'page_offsets': [0, 5],
+        'pages': 2,
+        'processed_at': processed_at
+    }
+
+
+def test_metadata_without_text_and_lazy_load(tmp_path):
+    store = PDFStore(str(tmp_path / 'pdfs.db'))
+    store.put('a', document('a', text='x' * 100000))
+
+    metadata = store.get('a')
+    assert metadata['file_name'] == 'a.pdf' and metadata['text_length'] == 100000
+    assert 'text' not in metadata and 'page_offsets' not in metadata
+
+    full = store.load('a')
+    assert full['text'] == 'x' * 100000 and full['page_offsets'] == [0, 5]
+    assert store.get('b') is None and store.load('b') is None
+    assert 'a' in store and 'b' not in store
+
+
+def test_all_is_ordered_and_delete_is_incremental(tmp_path):
+    path = str(tmp_path / 'pdfs.db')
+    store = PDFStore(path)
+    store.put('velho', document('velho', '2024-01-01T10:00:00'))
+    store.put('novo', document('novo', '2024-02-01T10:00:00'))
+
+    assert [pdf['file_hash'] for pdf in store.all()] == ['novo', 'velho']
+    assert all('text' not in pdf for pdf in store.all())
+
+    assert store.delete('velho')
+    assert not store.delete('velho')
+    reopened = PDFStore(path)
+    assert [pdf['file_hash'] for pdf in reopened.all()] == ['novo']
+    assert reopened.load('novo')['text'] == 'Texto do PDF'
+
+
+def test_put_replaces_document(tmp_path):
+    store = PDFStore(str(tmp_path / 'pdfs.db'))
+    store.put('a', document('a', text='primeira versão'))
+    store.put('a', document('a', text='segunda versão'))
+    assert store.load('a')['text'] == 'segunda versão'
+    assert len(store.all()) == 1
+
+
+def test_legacy_json_cache_is_migrated(tmp_path):
+    legacy = tmp_path / 'pdf_cache.json'
+    legacy.write_text(json.dumps({'a': document('a'), 'b': document('b', '2024-03-01T10:00:00')}))
+
+    store = PDFStore(str(tmp_path / 'pdfs.db'), legacy_path=str(legacy))
+    assert [pdf['file_hash'] for pdf in store.all()] == ['b', 'a']
+    assert store.load('a')['text'] == 'Texto do PDF'
+    assert not legacy.exists()
+    assert os.path.exists(str(legacy) + '.migrated')
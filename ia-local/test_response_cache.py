@@ -0,0 +1,101 @@
+import response_cache as response_cache_module
+from conftest import parse_events
+from response_cache import ResponseCache, normalize_question
+
+
+def test_trivial_variations_share_the_key():
+    assert normalize_question('O que é a Internet?') == normalize_question('que e internet') == 'que e internet'
+    key = ResponseCache.key('O que é internet?', 'llama2')
+    assert key == ResponseCache.key('o que e a INTERNET', 'llama2')
+    assert key != ResponseCache.key('O que é internet?', 'mistral')
+    assert key != ResponseCache.key('O que é internet?', 'llama2', ['pdf'])
+    assert ResponseCache.key('pdf a, pdf b', 'llama2', ['a', 'b']) == ResponseCache.key('pdf a, pdf b', 'llama2', ['b', 'a'])
+    # Sem nenhuma palavra não há chave (e nada é guardado)
+    assert ResponseCache.key('?!', 'llama2') is None
+
+
+def test_interrogatives_and_negation_change_the_key():
+    assert ResponseCache.key('Quando foi criada a internet?', 'llama2') != \
+        ResponseCache.key('Onde foi criada a internet?', 'llama2')
+    assert ResponseCache.key('O roteador tem wifi?', 'llama2') != \
+        ResponseCache.key('O roteador não tem wifi?', 'llama2')
+
+
+def test_lru_eviction_by_entries_and_bytes():
+    cache = ResponseCache(max_entries=2, max_bytes=10)
+    cache.put('a', {'response': 'aaa'})
+    cache.put('b', {'response': 'bbb'})
+    cache.get('a')
+    cache.put('c', {'response': 'ccc'})
+    assert cache.get('b') is None
+    assert cache.get('a') and cache.get('c')
+
+    cache.put('d', {'response': 'dddddddd'})  # 3 + 8 bytes > 10
+    assert cache.get('a') is None and cache.get('d')
+    cache.put('grande', {'response': 'x' * 11})  # Maior que o cache inteiro
+    assert cache.get('grande') is None
+    assert cache.stats()['evictions'] == 3
+
+
+def test_entries_expire(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(response_cache_module.time, 'monotonic', lambda: now[0])
+    cache = ResponseCache(ttl=60)
+    cache.put('a', {'response': 'resposta'})
+    now[0] += 59
+    assert cache.get('a')
+    now[0] += 2
+    assert cache.get('a') is None
+
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['expired'], stats['entries']) == (1, 1, 1, 0)
+    assert stats['hit_rate'] == 0.5
+
+
+def test_disabled_cache_stores_nothing():
+    cache = ResponseCache(max_entries=0)
+    cache.put('a', {'response': 'resposta'})
+    assert cache.get('a') is None and cache.stats()['entries'] == 0
+
+
+def test_repeated_question_skips_the_model(client, chatbot, ollama):
+    first = client.post('/api/chat', json={'message': 'O que é internet?'}).get_json()
+    second = client.post('/api/chat', json={'message': 'o que e a internet'}).get_json()
+
+    assert len(ollama.generate_requests()) == 1
+    assert (first['cached'], second['cached']) == (False, True)
+    assert second['response'] == first['response'] == 'Olá, tudo bem?'
+    assert chatbot.chat_history.page(limit=1)['history'][0]['cached'] is True
+
+    # Streaming também usa o cache
+    events = parse_events(client.post('/api/chat/stream', json={'message': 'O que é a Internet?!'}).get_data(as_text=True))
+    assert [event for event, data in events] == ['token', 'done']
+    assert events[0][1]['token'] == 'Olá, tudo bem?' and events[1][1]['cached'] is True
+    assert len(ollama.generate_requests()) == 1
+
+    stats = client.get('/api/cache/stats').get_json()['responses']
+    assert (stats['hits'], stats['misses'], stats['entries']) == (2, 1, 1)
+
+
+def test_bypass_regenerates_and_replaces(client, chatbot, ollama):
+    client.post('/api/chat', json={'message': 'O que é internet?'})
+    ollama.tokens = ['Nova', ' resposta']
+    response = client.post('/api/chat', json={'message': 'O que é internet?', 'cache': False}).get_json()
+
+    assert response['cached'] is False and response['response'] == 'Nova resposta'
+    assert len(ollama.generate_requests()) == 2
+    assert client.post('/api/chat', json={'message': 'O que é internet?'}).get_json()['response'] == 'Nova resposta'
+    assert chatbot.response_cache.stats()['bypassed'] == 1
+
+
+def test_stream_answer_is_cached_only_when_complete(client, chatbot, ollama):
+    events = parse_events(client.post('/api/chat/stream', json={'message': 'Como instalar a antena?'}).get_data(as_text=True))
+    assert events[-1][1]['cached'] is False
+
+    response = client.post('/api/chat', json={'message': 'como instalar antena'}).get_json()
+    assert response['cached'] is True and response['response'] == 'Olá, tudo bem?'
+
+    ollama.status = 500
+    client.post('/api/chat/stream', json={'message': 'Pergunta com erro'})
+    ollama.status = 200
+    assert client.post('/api/chat', json={'message': 'Pergunta com erro'}).get_json()['cached'] is False
@@ -0,0 +1,157 @@
+from conftest import parse_events
+from retrieval import Retriever, format_context, split_chunks, tokenize
+
+TOPICS = {
+    1: 'A instalação do servidor começa pela escolha do hardware e do sistema operacional.',
+    2: 'O roteador mesh distribui o sinal sem fio entre as casas da comunidade.',
+    3: 'A antena setorial aponta para o morro e precisa de alinhamento cuidadoso.',
+    4: 'O backup dos dados é feito toda semana em um disco externo criptografado.'
+}
+
+
+def document(repeat=20):
+    """Texto com um assunto por página e os deslocamentos de cada página"""
+    text, offsets = '', []
+    for page in sorted(TOPICS):
+        offsets.append(len(text))
+        text += ' '.join([TOPICS[page]] * repeat) + '\n'
+    return text, offsets
+
+
+def test_tokenize_normalizes_words():
+    assert tokenize('As Antenas do roteador e a CONFIGURAÇÃO') == ['antena', 'roteador', 'configuracao']
+
+
+def test_chunks_overlap_and_keep_page():
+    text, offsets = document()
+    chunks = split_chunks(text, offsets, chunk_words=50, overlap_words=10)
+
+    assert len(chunks) > len(TOPICS)
+    assert chunks[0]['page'] == 1 and chunks[-1]['page'] == 4
+    first, second = chunks[0]['text'].split(), chunks[1]['text'].split()
+    assert first[-10:] == second[:10]
+
+
+def test_search_finds_later_page(tmp_path):
+    retriever = Retriever(index_dir=str(tmp_path), chunk_words=50, overlap_words=10)
+    text, offsets = document()
+    retriever.add_document('doc', 'guia.pdf', text, offsets)
+
+    results = retriever.search('Como fazer o backup do disco?', top_k=3)
+    assert results and all(result['page'] == 4 for result in results)
+    assert 'backup' in results[0]['text']
+
+
+def test_select_chunks_respects_budget(tmp_path):
+    retriever = Retriever(index_dir=str(tmp_path), chunk_words=50, overlap_words=10)
+    text, offsets = document()
+    retriever.add_document('doc', 'guia.pdf', text, offsets)
+
+    chunks = retriever.select_chunks('antena roteador backup servidor', ['doc'], token_budget=200, top_k=20)
+    assert chunks
+    assert sum(len(chunk['text']) // 4 + 1 for chunk in chunks) <= 200
+
+    # Sem nenhuma palavra em comum, usa o começo do documento
+    fallback = retriever.select_chunks('xyzzy', ['doc'], token_budget=200)
+    assert fallback[0]['page'] == 1
+
+
+def test_index_persists_and_remove(tmp_path):
+    text, offsets = document()
+    Retriever(index_dir=str(tmp_path)).add_document('doc', 'guia.pdf', text, offsets)
+
+    reloaded = Retriever(index_dir=str(tmp_path))
+    assert reloaded.has_document('doc')
+    assert reloaded.search('antena setorial')[0]['page'] == 3
+
+    reloaded.remove_document('doc')
+    assert not reloaded.has_document('doc')
+    assert reloaded.search('antena setorial') == []
+    assert not Retriever(index_dir=str(tmp_path)).has_document('doc')
+
+
+def test_embeddings_are_fused_with_bm25(tmp_path):
+    # Embedding "semântico" falso: wifi e mesh apontam na mesma direção
+    def embed(text):
+        text = text.lower()
+        return [1.0 if 'mesh' in text or 'wifi' in text else 0.0, 1.0 if 'backup' in text else 0.0, 0.1]
+
+    retriever = Retriever(index_dir=str(tmp_path), chunk_words=50, overlap_words=10, embed=embed)
+    text, offsets = document()
+    retriever.add_document('doc', 'guia.pdf', text, offsets)
+
+    # Nenhuma palavra da pergunta aparece no texto; só os embeddings acham
+    results = retriever.search('wifi', top_k=2)
+    assert results and results[0]['page'] == 2
+
+
+def test_format_context_cites_file_and_page():
+    context, sources = format_context([
+        {'doc': 'a', 'name': 'guia.pdf', 'page': 3, 'text': 'antena'},
+        {'doc': 'a', 'name': 'guia.pdf', 'page': 3, 'text': 'mais antena'}
+    ])
+    assert context.startswith('[guia.pdf, p. 3]\nantena')
+    assert sources == [{'doc': 'a', 'name': 'guia.pdf', 'page': 3}]
+
+
+def test_chat_prompt_uses_relevant_chunk(client, chatbot, ollama):
+    text, offsets = document(repeat=200)
+    chatbot.retriever.add_document('doc', 'guia.pdf', text, offsets)
+
+    response = client.post('/api/chat', json={'message': 'Onde aponta a antena setorial?', 'pdf_context': 'doc'})
+    assert response.status_code == 200
+    assert {'doc': 'doc', 'name': 'guia.pdf', 'page': 3} in response.get_json()['sources']
+
+    prompt = ollama.generate_requests()[-1]['prompt']
+    assert 'antena setorial aponta para o morro' in prompt
+    assert '[guia.pdf, p. 3]' in prompt
+    assert len(prompt) < 6000
+
+    events = parse_events(client.post('/api/chat/stream', json={
+        'message': 'Como é feito o backup?', 'pdf_context': 'doc'}).get_data(as_text=True))
+    assert events[-1][0] == 'done'
+    assert events[-1][1]['sources'][0]['page'] == 4
+
+
+def add_course(chatbot):
+    """Duas apostilas indexadas (e no cache do processador, como depois de um upload)"""
+    text, offsets = document(repeat=100)
+    other = 'A horta comunitária usa compostagem e irrigação por gotejamento. ' * 300
+    for doc_hash, name, content, pages in (('redes', 'redes.pdf', text, offsets), ('horta', 'horta.pdf', other, [0])):
+        chatbot.retriever.add_document(doc_hash, name, content, pages)
+        chatbot.pdf_processor.cache.put(doc_hash, {'file_path': name, 'file_name': name, 'text': content})
+
+
+def test_chat_searches_several_pdfs_with_shared_budget(client, chatbot, ollama):
+    add_course(chatbot)
+
+    response = client.post('/api/chat', json={'message': 'Como funciona a irrigação da horta e a antena?',
+                                              'pdf_context': ['redes', 'horta']})
+    sources = response.get_json()['sources']
+    assert {source['doc'] for source in sources} == {'redes', 'horta'}
+
+    prompt = ollama.generate_requests()[-1]['prompt']
+    assert 'Trechos dos PDFs' in prompt and '[horta.pdf, p. 1]' in prompt
+    assert len(prompt) // 4 < chatbot.CONTEXT_TOKEN_BUDGET + 200
+
+    entry = chatbot.chat_history.page(limit=1)['history'][0]
+    assert entry['pdf_contexts'] == ['redes', 'horta']
+    assert chatbot.chat_history.page(pdf_context='horta')['history'] == [entry]
+
+
+def test_collections(client, chatbot, ollama):
+    add_course(chatbot)
+    assert client.put('/api/collections/curso', json={'documents': ['redes', 'xyz']}).status_code == 404
+    assert client.put('/api/collections/curso', json={'documents': ['redes', 'horta']}).status_code == 200
+    assert [c['name'] for c in client.get('/api/collections').get_json()['collections']] == ['curso']
+
+    response = client.post('/api/chat', json={'message': 'compostagem', 'collection': 'curso'})
+    assert response.get_json()['sources'][0]['doc'] == 'horta'
+    assert chatbot.chat_history.page(limit=1)['history'][0]['collection'] == 'curso'
+    assert client.post('/api/chat', json={'message': 'oi', 'collection': 'outro'}).status_code == 404
+
+    # Apagar um PDF o tira da coleção
+    chatbot.pdf_collections.remove_document('horta')
+    assert chatbot.pdf_collections.get('curso') == ['redes']
+    assert client.delete('/api/collections/curso').status_code == 200
+    assert client.delete('/api/collections/curso').status_code == 404
@@ -0,0 +1,106 @@
+import threading
+import time
+from ttl_cache import TTLCache
+
+
+class Loader:
+    """Loader que conta as chamadas e pode demorar ou falhar"""
+
+    def __init__(self, delay=0):
+        self.calls = 0
+        self.delay = delay
+        self.error = None
+
+    def __call__(self):
+        self.calls += 1
+        time.sleep(self.delay)
+        if self.error:
+            raise self.error
+        return f'valor {self.calls}'
+
+
+def wait_refresh(cache, key):
+    deadline = time.monotonic() + 2
+    while cache.is_refreshing(key) and time.monotonic() < deadline:
+        time.sleep(0.005)
+
+
+def test_hits_within_ttl():
+    cache, loader = TTLCache(ttl=60), Loader()
+    assert [cache.get('models', loader) for _ in range(3)] == ['valor 1'] * 3
+    assert loader.calls == 1
+    assert cache.stats()['models'] == {'hits': 2, 'stale_hits': 0, 'misses': 1, 'refreshes': 0, 'errors': 0}
+
+
+def test_stale_value_is_served_while_refreshing():
+    cache, loader = TTLCache(ttl=0.05, stale_ttl=60), Loader(delay=0.1)
+    cache.get('models', loader)
+    time.sleep(0.06)
+
+    started = time.monotonic()
+    assert cache.get('models', loader) == 'valor 1'  # Não espera o loader
+    assert time.monotonic() - started < 0.05
+    assert cache.get('models', loader) == 'valor 1'  # Uma atualização por vez
+    wait_refresh(cache, 'models')
+
+    assert cache.get('models', loader) == 'valor 2'
+    assert loader.calls == 2
+    assert cache.stats()['models']['refreshes'] == 1
+
+
+def test_failed_refresh_keeps_stale_value():
+    cache, loader = TTLCache(ttl=0.01, stale_ttl=60), Loader()
+    cache.get('health', loader)
+    time.sleep(0.02)
+    loader.error = RuntimeError('Ollama fora do ar')
+
+    assert cache.get('health', loader) == 'valor 1'
+    wait_refresh(cache, 'health')
+    assert cache.get('health', loader) == 'valor 1'
+    assert cache.stats()['health']['errors'] >= 1
+
+
+def test_expired_value_is_loaded_once_for_concurrent_requests():
+    cache, loader = TTLCache(ttl=60, stale_ttl=0), Loader(delay=0.05)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get('models', loader))) for _ in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == ['valor 1'] * 20
+    assert loader.calls == 1
+
+
+def test_invalidate_discards_in_flight_refresh():
+    cache, loader = TTLCache(ttl=0.01, stale_ttl=60), Loader(delay=0.05)
+    cache.get('models', loader)
+    time.sleep(0.02)
+    cache.get('models', loader)  # Começa a atualizar com dados de antes da invalidação
+    cache.invalidate('models')
+    wait_refresh(cache, 'models')
+
+    assert cache.get('models', loader) == 'valor 3'
+
+
+def test_page_refresh_storm_hits_ollama_once(client, ollama):
+    for _ in range(20):
+        assert client.get('/').status_code == 200
+        client.get('/api/models')
+    for _ in range(20):
+        client.get('/api/health')
+
+    tags = [path for method, path, payload in ollama.requests if path == '/api/tags']
+    assert len(tags) == 2  # Uma para a lista de modelos, outra para o health
+    stats = client.get('/api/cache/stats').get_json()['ollama']
+    assert stats['models']['misses'] == 1 and stats['models']['hits'] == 39
+    assert stats['health']['misses'] == 1
+
+
+def test_download_model_invalidates_model_list(client, ollama):
+    assert client.get('/api/models').get_json()['models'] == ['llama2:latest']
+    ollama.models.append('mistral:latest')
+    assert client.get('/api/models').get_json()['models'] == ['llama2:latest']
+
+    assert client.post('/api/download-model', json={'model': 'mistral'}).status_code == 200
+    assert client.get('/api/models').get_json()['models'] == ['llama2:latest', 'mistral:latest']
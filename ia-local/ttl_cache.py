@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Cache com tempo de validade (TTL) para o Chatbot de IA Local
+Usado para a lista de modelos e o estado do Ollama, que mudam pouco mas
+eram consultados a cada carregamento de página. Depois do TTL o valor
+antigo ainda é servido por um tempo (stale-while-revalidate) enquanto uma
+thread busca o novo; só a primeira consulta, ou uma muito atrasada, espera
+pelo Ollama. Consultas simultâneas do mesmo valor fazem uma única chamada.
+"""
+
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+
+class _Entry:
+    __slots__ = ('value', 'expires_at', 'stale_until')
+
+    def __init__(self, value: Any, ttl: float, stale_ttl: float):
+        now = time.monotonic()
+        self.value = value
+        self.expires_at = now + ttl
+        self.stale_until = now + ttl + stale_ttl
+
+
+class TTLCache:
+    def __init__(self, ttl: float = 60, stale_ttl: float = 300):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._entries: Dict[str, _Entry] = {}
+        self._key_locks: Dict[str, threading.Lock] = {}
+        self._refreshing = set()
+        # Incrementado a cada invalidação: uma busca iniciada antes dela
+        # não pode guardar um valor que já se sabe desatualizado
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    def _count(self, key: str, name: str):
+        with self._lock:
+            counters = self._stats.setdefault(key, {'hits': 0, 'stale_hits': 0, 'misses': 0,
+                                                    'refreshes': 0, 'errors': 0})
+            counters[name] += 1
+
+    def _key_lock(self, key: str) -> threading.Lock:
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def _store(self, key: str, value: Any, ttl: Optional[float], generation: int):
+        with self._lock:
+            if generation == self._generation:
+                self._entries[key] = _Entry(value, self.ttl if ttl is None else ttl, self.stale_ttl)
+
+    def get(self, key: str, loader: Callable[[], Any], ttl: Optional[float] = None) -> Any:
+        """Valor em cache para key, usando loader() para buscá-lo quando preciso
+
+        Se loader() levantar uma exceção na busca síncrona ela é repassada e
+        nada é guardado; na atualização em segundo plano o valor antigo
+        continua sendo servido.
+        """
+        entry = self._entries.get(key)
+        now = time.monotonic()
+        if entry is not None and now < entry.expires_at:
+            self._count(key, 'hits')
+            return entry.value
+        if entry is not None and now < entry.stale_until:
+            self._count(key, 'stale_hits')
+            self._refresh_in_background(key, loader, ttl)
+            return entry.value
+
+        # Sem valor utilizável: só uma thread chama o loader, as outras esperam
+        with self._key_lock(key):
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() < entry.expires_at:
+                self._count(key, 'hits')
+                return entry.value
+            self._count(key, 'misses')
+            generation = self._generation
+            value = loader()
+            self._store(key, value, ttl, generation)
+            return value
+
+    def _refresh_in_background(self, key: str, loader: Callable[[], Any], ttl: Optional[float]):
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        generation = self._generation
+
+        def refresh():
+            try:
+                value = loader()
+                self._store(key, value, ttl, generation)
+                self._count(key, 'refreshes')
+            except Exception as e:
+                self._count(key, 'errors')
+                print(f"Erro ao atualizar cache ({key}): {e}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=refresh, daemon=True).start()
+
+    def invalidate(self, key: Optional[str] = None):
+        """Descarta um valor (ou todos); a próxima consulta busca de novo"""
+        with self._lock:
+            self._generation += 1
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def is_refreshing(self, key: str) -> bool:
+        with self._lock:
+            return key in self._refreshing
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Contadores por chave: hits, stale_hits, misses, refreshes e errors"""
+        with self._lock:
+            return {key: dict(counters) for key, counters in self._stats.items()}